@@ -0,0 +1,248 @@
+import asyncio
+import importlib
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+
+from config.fusion_settings import load_settings, use_settings
+from utils.auth import authenticate_user
+from utils.adaptive_limiter import request_flow
+from utils.metrics import render_metrics, stage_seconds, state_transitions
+from utils.upstream_guard import UpstreamOverloaded
+
+# Conversation flow module per mode; only the one an app runs is imported
+FLOWS = {"guided": "guided_flow", "assisted": "assisted_flow"}
+# Recorded turns name the module serving the mode (see benchmarks/replay.py)
+APP_NAMES = {"guided": "app", "assisted": "app_1"}
+
+
+# ---------------- REQUEST ----------------
+class SupplierAgentRequest(BaseModel):
+    message: str
+    sessionId: Optional[str] = None
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Turns still running after their client went away
+_detached_turns = set()
+
+
+def create_app(mode=None, settings=None):
+    """
+    The supplier agent serving one conversation flow: "guided" asks for one
+    field at a time, "assisted" extracts fields from free text with Gemini
+    and also streams turns on /supplier-agent/stream. Both share sessions,
+    metrics, bulk import, the jobs API and the background workers.
+
+    `settings` default to the environment after loading any .env file.
+    The rest of the agent reads them when first imported, so apps created
+    later in the same process share the first one's components.
+    """
+    settings = settings or load_settings()
+    if mode:
+        settings = replace(settings, agent_mode=mode)
+    if settings.agent_mode not in FLOWS:
+        raise ValueError(
+            f"Unknown agent mode {settings.agent_mode!r}; expected one of {list(FLOWS)}"
+        )
+    use_settings(settings)
+
+    from bulk_import import router as bulk_router
+    from fusion_client import close_fusion_client, get_fusion_stats
+    from lov_cache import lov_cache
+    from supplier_index import supplier_index
+    from supplier_outbox import supplier_outbox, router as jobs_router
+    from supplier_prechecks import supplier_prechecks
+    from utils.profiling import ProfilingMiddleware, profile_note
+    from utils.session_store import create_session_store, new_session_id, SessionConflict
+    from utils.traffic_recorder import TrafficRecorder, TrafficRecorderMiddleware, record_turn
+    flow = importlib.import_module(FLOWS[settings.agent_mode])
+
+    @asynccontextmanager
+    async def lifespan(app):
+        lov_cache.start()
+        supplier_index.start()
+        supplier_outbox.start()
+
+        # Heavy clients are built on first use; build the flow's now on a
+        # thread, so the pod serves straight away and the first turn that
+        # needs them usually finds them ready
+        warming = set()
+        warm_up = getattr(flow, "warm_up", None)
+        if warm_up:
+            warming.add(asyncio.get_running_loop().run_in_executor(None, warm_up))
+
+        yield
+
+        await lov_cache.stop()
+        await supplier_index.stop()
+        await supplier_outbox.stop()
+        await supplier_prechecks.stop()
+        await close_fusion_client()
+        await asyncio.gather(*warming, return_exceptions=True)
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(bulk_router)
+    app.include_router(jobs_router)
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+    if settings.traffic_record_path:
+        app.add_middleware(TrafficRecorderMiddleware, app_name=APP_NAMES[settings.agent_mode],
+                           recorder=TrafficRecorder(settings.traffic_record_path))
+
+    # ---------------- SESSION ----------------
+    sessions = create_session_store()
+
+    def open_session(session_id):
+        active_session, version = sessions.load(session_id)
+        if active_session is None:
+            active_session = flow.new_session()
+            session_id, version = new_session_id(), 0
+        request_flow.set(f"session:{session_id}")
+        return active_session, session_id, version
+
+    def save_turn(session_id, active_session, version):
+        supplier_prechecks.sync(session_id, active_session)
+        sessions.save(session_id, active_session, version)
+
+    def note_turn(session_id, version, user_input, state, active_session, reply):
+        state_transitions.inc(state, active_session["state"])
+        profile_note(sessionId=session_id, fromState=state, session=active_session)
+        record_turn(sessionId=session_id, newSession=version == 0, message=user_input,
+                    fromState=state, toState=active_session["state"],
+                    session=active_session, reply=reply)
+
+    @app.get("/")
+    def read_root():
+        return {"status": "Supplier Agent is running.", "mode": settings.agent_mode}
+
+    @app.get("/fusion/stats")
+    def fusion_stats(username: str = Depends(authenticate_user)):
+        return get_fusion_stats()
+
+    @app.get("/metrics")
+    def metrics(username: str = Depends(authenticate_user)):
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.exception_handler(UpstreamOverloaded)
+    async def upstream_overloaded(request: Request, exc: UpstreamOverloaded):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"{exc.upstream} is busy. Please retry shortly."},
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+
+    # =========================================================
+    # MAIN ENDPOINT
+    # =========================================================
+    @app.post("/supplier-agent")
+    async def supplier_agent(
+        payload: SupplierAgentRequest,
+        username: str = Depends(authenticate_user)
+    ):
+        user_input = payload.message.strip().strip("{}")
+        active_session, session_id, version = open_session(payload.sessionId)
+
+        state = active_session["state"]
+        with stage_seconds.time("turn"):
+            reply = await flow.handle_message(active_session, user_input, session_id)
+
+            try:
+                save_turn(session_id, active_session, version)
+            except SessionConflict:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Session was updated by another request. Please retry."
+                )
+        note_turn(session_id, version, user_input, state, active_session, reply)
+
+        reply["sessionId"] = session_id
+        return reply
+
+    # =========================================================
+    # STREAMING ENDPOINT (server-sent events)
+    # =========================================================
+    message_events = getattr(flow, "message_events", None)
+    if message_events is None:
+        return app
+
+    @app.post("/supplier-agent/stream")
+    async def supplier_agent_stream(payload: SupplierAgentRequest,
+                                    username: str = Depends(authenticate_user)):
+        """
+        Same conversation as /supplier-agent, sent as events while the turn
+        runs: "ack" straight away, then "fields" once extraction is done,
+        "validation" once the LOVs are checked, and finally "reply" (the body
+        /supplier-agent would have returned) or "error".
+        """
+        user_input = payload.message.strip().strip("{}")
+        active_session, session_id, version = open_session(payload.sessionId)
+
+        return StreamingResponse(
+            stream_turn(active_session, user_input, session_id, version),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    async def stream_turn(active_session, user_input, session_id, version):
+        events = asyncio.Queue()
+
+        async def run():
+            state = active_session["state"]
+            started = time.perf_counter()
+            try:
+                reply = None
+                async for event, data in message_events(active_session, user_input, session_id):
+                    if event == "reply":
+                        reply = data
+                    else:
+                        events.put_nowait((event, data))
+
+                # Saved before the reply goes out, so the client's next turn
+                # always sees this one
+                save_turn(session_id, active_session, version)
+                stage_seconds.observe(time.perf_counter() - started, "turn")
+                note_turn(session_id, version, user_input, state, active_session, reply)
+
+                reply["sessionId"] = session_id
+                events.put_nowait(("reply", reply))
+
+            except UpstreamOverloaded as exc:
+                events.put_nowait(("error", {
+                    "status": 503,
+                    "detail": f"{exc.upstream} is busy. Please retry shortly.",
+                    "retryAfter": exc.retry_after
+                }))
+            except SessionConflict:
+                events.put_nowait(("error", {
+                    "status": 409,
+                    "detail": "Session was updated by another request. Please retry."
+                }))
+            except Exception:
+                logging.exception("Streaming turn failed for session %s", session_id)
+                events.put_nowait(("error", {"status": 500, "detail": "Internal error."}))
+            finally:
+                events.put_nowait(None)
+
+        # The turn runs on its own task so it still completes (and is saved)
+        # if the client disconnects halfway through the stream
+        turn = asyncio.create_task(run())
+        _detached_turns.add(turn)
+        turn.add_done_callback(_detached_turns.discard)
+
+        yield sse_event("ack", {"sessionId": session_id, "state": active_session["state"]})
+
+        while (item := await events.get()) is not None:
+            yield sse_event(*item)
+
+    return app
@@ -0,0 +1,266 @@
+from utils.session_manager import init_session, reset_session, get_missing_fields
+from config.fusion_settings import DEFAULT_VALUES, REQUIRED_FIELDS
+from fusion_validator import reject_invalid
+from utils.normalizer import normalize_lov_fields
+from supplier_index import supplier_index, describe_duplicates
+from supplier_outbox import supplier_outbox
+from supplier_prechecks import supplier_prechecks
+from bulk_import import check_rows
+
+from gemini_agent import extract_supplier_payload, extract_supplier_list, get_gemini_client
+from utils.supplier_list import looks_like_supplier_list
+
+
+def new_session():
+    return {"state": "INIT", "session": {}}
+
+
+def warm_up():
+    """Build the Gemini client ahead of the first turn that needs it."""
+    get_gemini_client()
+
+
+async def handle_message(active_session, raw_input, session_id):
+    reply = None
+    async for event, data in message_events(active_session, raw_input, session_id):
+        if event == "reply":
+            reply = data
+    return reply
+
+
+async def message_events(active_session, raw_input, session_id):
+    """
+    One conversation turn as (event, data) stages; the last is always
+    ("reply", body).
+    """
+    intent_input = raw_input.lower()
+
+    # -------------------------------------------------
+    # GLOBAL RESTART
+    # -------------------------------------------------
+    if "create supplier" in intent_input:
+        session = init_session()
+        # A default Fusion no longer lists is asked for like any other field
+        reject_invalid(session, DEFAULT_VALUES)
+        reset_session(active_session, state="COLLECTING", session=session)
+        yield "reply", {
+            "reply": (
+                "Sure — let’s create a supplier.\n"
+                "Provide details in any order."
+            )
+        }
+        return
+
+    # -------------------------------------------------
+    # INIT
+    # -------------------------------------------------
+    if active_session["state"] == "INIT":
+        yield "reply", {"reply": 'Say "create supplier" to begin.'}
+        return
+
+    # -------------------------------------------------
+    # COLLECTING
+    # -------------------------------------------------
+    if active_session["state"] == "COLLECTING":
+
+        # A pasted list or table of vendors becomes one batch
+        if looks_like_supplier_list(raw_input):
+            async for event in batch_events(active_session, raw_input):
+                yield event
+            return
+
+        session = active_session["session"]
+
+        # Only ask for what is still missing; after an edit everything
+        # is filled, so any field may be the one being corrected
+        extracted = await extract_supplier_payload(
+            raw_input, get_missing_fields(session) or None
+        )
+
+        for k, v in extracted.items():
+            session[k] = v.strip() if isinstance(v, str) else v
+
+        # Check only what this message changed; rejected values are cleared
+        # so the next extraction asks Gemini for just those fields
+        normalize_lov_fields(session, extracted)
+        errors = reject_invalid(session, extracted)
+
+        missing = [f for f in REQUIRED_FIELDS if not session.get(f)]
+
+        yield "fields", {"extracted": extracted, "missing": missing}
+        if extracted:
+            yield "validation", {"valid": not errors, "errors": errors}
+
+        if missing:
+
+            collected_list = "\n".join(
+                f"- {k}: {v}" for k, v in session.items() if v
+            )
+
+            missing_lines = []
+            for field in missing:
+                if field in DEFAULT_VALUES:
+                    missing_lines.append(
+                        f"- {field} (default: {DEFAULT_VALUES[field]})"
+                    )
+                else:
+                    missing_lines.append(f"- {field}")
+
+            missing_text = "\n".join(missing_lines)
+
+            issues = "".join(
+                f"Issue with {message}. Please correct.\n" for message in errors.values()
+            )
+
+            yield "reply", {
+                "reply": (
+                    (issues + "\n" if issues else "")
+                    + "Here’s what I have so far:\n\n"
+                    + (collected_list if collected_list else "No details captured yet.")
+                    + "\n\nI still need the following details:\n"
+                    + missing_text
+                )
+            }
+            return
+
+        active_session["state"] = "CONFIRM"
+
+        summary = "\n".join(
+            f"{f}: {session.get(f)}"
+            for f in REQUIRED_FIELDS
+        )
+
+        duplicates = supplier_index.find_duplicates(session)
+        active_session["duplicates"] = [d["SupplierId"] for d in duplicates]
+        if duplicates:
+            summary += "\n\n" + describe_duplicates(duplicates)
+
+        yield "reply", {
+            "reply": f"Confirm supplier creation:\n{summary}\n\nYes / Edit / Cancel",
+            "duplicates": duplicates
+        }
+        return
+
+    # -------------------------------------------------
+    # BATCH CONFIRM
+    # -------------------------------------------------
+    if active_session["state"] == "BATCH_CONFIRM":
+
+        if intent_input == "yes":
+
+            # The outbox workers send these to Fusion in concurrent batches
+            jobs = [
+                await supplier_outbox.enqueue(session_id, payload)
+                for payload in active_session["batch"]
+            ]
+
+            reset_session(active_session, state="INIT", session={})
+
+            yield "reply", {
+                "reply": f"{len(jobs)} supplier creations submitted",
+                "jobs": [{"jobId": j["jobId"], "status": j["status"]} for j in jobs]
+            }
+            return
+
+        if intent_input == "cancel":
+            reset_session(active_session, state="INIT", session={})
+            yield "reply", {"reply": "Cancelled."}
+            return
+
+        yield "reply", {"reply": "Reply Yes / Cancel"}
+        return
+
+    # -------------------------------------------------
+    # CONFIRM
+    # -------------------------------------------------
+    if active_session["state"] == "CONFIRM":
+
+        session = active_session["session"]
+
+        if intent_input == "yes":
+
+            # The Fusion lookups started while the user was typing may
+            # have found a supplier the summary did not mention
+            new = await supplier_prechecks.new_duplicates(session_id, active_session)
+            if new:
+                yield "reply", {
+                    "reply": describe_duplicates(new) + "\n\nYes / Edit / Cancel",
+                    "duplicates": new
+                }
+                return
+
+            job = await supplier_outbox.enqueue(session_id, session)
+
+            reset_session(active_session, state="INIT", session={})
+
+            yield "reply", {
+                "reply": "Supplier creation submitted",
+                "jobId": job["jobId"],
+                "status": job["status"]
+            }
+            return
+
+        if intent_input == "edit":
+            active_session["state"] = "COLLECTING"
+            yield "reply", {"reply": "Tell me updated values."}
+            return
+
+        if intent_input == "cancel":
+            reset_session(active_session, state="INIT", session={})
+            yield "reply", {"reply": "Cancelled."}
+            return
+
+        yield "reply", {"reply": "Reply Yes / Edit / Cancel"}
+
+
+async def batch_events(active_session, raw_input):
+    """
+    Several suppliers pasted at once: extract them all, put each through
+    the bulk import row checks and ask for a single confirmation.
+    """
+    suppliers = await extract_supplier_list(raw_input)
+    results, ready = check_rows(enumerate(suppliers, 1))
+
+    yield "suppliers", {"extracted": suppliers, "ready": len(ready)}
+
+    if not suppliers:
+        yield "reply", {"reply": "I could not find any suppliers in that list."}
+        return
+
+    problems = {}
+    for result in results:
+        if result["status"] == "INVALID":
+            problems[result["row"]] = "; ".join(result["errors"])
+        elif "duplicateOfRow" in result:
+            problems[result["row"]] = f"same supplier as {result['duplicateOfRow']}"
+        else:
+            problems[result["row"]] = describe_duplicates(result["duplicates"])
+
+    summary = "\n".join(
+        f"{n}. {supplier.get('Supplier') or '(no name)'}: {problems.get(n, 'ready')}"
+        for n, supplier in enumerate(suppliers, 1)
+    )
+
+    if not ready:
+        yield "reply", {
+            "reply": (
+                f"None of these can be created yet:\n{summary}\n\n"
+                "Please correct them and paste the list again."
+            )
+        }
+        return
+
+    reset_session(
+        active_session,
+        state="BATCH_CONFIRM",
+        session={},
+        batch=[payload for _, payload in ready]
+    )
+
+    yield "reply", {
+        "reply": (
+            f"Found {len(suppliers)} suppliers:\n{summary}\n\n"
+            f"Create the {len(ready)} ready? Yes / Cancel"
+        ),
+        "problems": results
+    }
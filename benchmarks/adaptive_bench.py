@@ -0,0 +1,114 @@
+"""
+Fixed vs adaptive Fusion concurrency against a stub that throttles.
+
+The stub Fusion serves CAPACITY requests at a time and answers anything
+beyond that with 429 + Retry-After. A bulk load pushes single-supplier
+POSTs at BULK_CONCURRENCY while one interactive session makes a lookup
+every 100ms; we report bulk throughput, throttles and the session's
+latency.
+
+Run from the repo root:
+    python -m benchmarks.adaptive_bench [rows]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+import bulk_import
+from benchmarks.fake_fusion import FakeFusion
+from config.fusion_settings import SUPPLIER_ENDPOINT
+from fusion_client import FusionClient, set_fusion_client
+from supplier_index import supplier_index
+from utils.adaptive_limiter import request_flow
+
+CAPACITY = 12
+LATENCY = 0.05
+RETRY_AFTER = 1
+BULK_CONCURRENCY = 32
+
+CONFIGS = {
+    "fixed 4": dict(initial_in_flight=4, min_in_flight=4, max_in_flight=4),
+    "fixed 32": dict(initial_in_flight=32, min_in_flight=32, max_in_flight=32),
+    "adaptive 1-32": dict(initial_in_flight=4, min_in_flight=1, max_in_flight=32)
+}
+
+
+async def rows(count):
+    for n in range(count):
+        yield n + 1, {
+            "Supplier": f"Adaptive Supplier {n}",
+            "TaxpayerCountry": "United States",
+            "TaxpayerId": f"12-{n:07d}",
+            "DUNSNumber": f"{n:09d}"
+        }
+
+
+async def interactive(client, stop):
+    request_flow.set("session:bench")
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(SUPPLIER_ENDPOINT, params={"q": "Supplier='Nobody'"})
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.1)
+    return latencies
+
+
+async def run(count, settings):
+    supplier_index.close()
+    supplier_index._path = None
+
+    fake = FakeFusion(0, latency=LATENCY, capacity=CAPACITY,
+                      throttle_retry_after=RETRY_AFTER)
+    client = FusionClient(base_url="https://fusion.test", transport=fake.transport(),
+                          max_connections=64, max_queue=1000, **settings)
+    set_fusion_client(client)
+
+    stop = asyncio.Event()
+    session = asyncio.create_task(interactive(client, stop))
+
+    started = time.perf_counter()
+    summary = {}
+    async for line in bulk_import.run_bulk(rows(count), concurrency=BULK_CONCURRENCY,
+                                           batch_size=1):
+        if line.startswith('{"summary"'):
+            summary = json.loads(line)["summary"]
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    latencies = sorted(await session)
+    metrics = client.metrics()
+    await client.aclose()
+
+    return {
+        "seconds": elapsed,
+        "rows_per_second": count / elapsed,
+        "created": summary.get("CREATED"),
+        "failed": summary.get("FAILED"),
+        "throttled": fake.throttled,
+        "final_window": metrics["window"],
+        "session_p50_ms": statistics.median(latencies) * 1000,
+        "session_max_ms": latencies[-1] * 1000
+    }
+
+
+async def main(count):
+    print(f"{count} rows, Fusion capacity {CAPACITY}, {LATENCY * 1000:.0f}ms,"
+          f" 429 Retry-After {RETRY_AFTER}s")
+    print(f"{'config':>14} {'seconds':>8} {'rows/s':>7} {'created':>8} {'failed':>7}"
+          f" {'429s':>6} {'window':>7} {'sess p50':>9} {'sess max':>9}")
+
+    for name, settings in CONFIGS.items():
+        r = await run(count, settings)
+        print(
+            f"{name:>14} {r['seconds']:>8.2f} {r['rows_per_second']:>7.0f}"
+            f" {r['created']:>8} {r['failed']:>7} {r['throttled']:>6}"
+            f" {r['final_window']:>7} {r['session_p50_ms']:>8.0f}ms"
+            f" {r['session_max_ms']:>8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
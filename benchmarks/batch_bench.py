@@ -0,0 +1,78 @@
+"""
+Bulk creation throughput: one POST per supplier vs Fusion batch requests.
+
+Rows go through the real bulk pipeline (run_bulk) against the stub Fusion,
+which charges LATENCY per HTTP round trip and CREATE_LATENCY per supplier.
+
+Run from the repo root:
+    python -m benchmarks.batch_bench [rows] [failure %]
+"""
+import asyncio
+import json
+import sys
+import time
+
+import bulk_import
+from benchmarks.fake_fusion import FakeFusion
+from fusion_client import FusionClient, set_fusion_client
+from supplier_index import supplier_index
+
+LATENCY = 0.05
+CREATE_LATENCY = 0.005
+BATCH_SIZES = [1, 10, 25, 50]
+
+
+def make_rows(count, failure_percent):
+    every = int(100 / failure_percent) if failure_percent else 0
+
+    async def rows():
+        for n in range(count):
+            name = f"FAIL {n}" if every and n % every == 0 else f"Bench Supplier {n}"
+            yield n + 1, {
+                "Supplier": name,
+                "TaxpayerCountry": "United States",
+                "TaxpayerId": f"12-{n:07d}",
+                "DUNSNumber": f"{n:09d}"
+            }
+
+    return rows()
+
+
+async def run(count, batch_size, failure_percent):
+    # Fresh, empty in-memory duplicate index for every run
+    supplier_index.close()
+    supplier_index._path = None
+
+    fake = FakeFusion(0, latency=LATENCY, create_latency=CREATE_LATENCY)
+    client = FusionClient(base_url="https://fusion.test", transport=fake.transport())
+    set_fusion_client(client)
+
+    started = time.perf_counter()
+    summary = None
+    async for line in bulk_import.run_bulk(make_rows(count, failure_percent),
+                                           batch_size=batch_size):
+        summary = json.loads(line).get("summary", summary)
+    elapsed = time.perf_counter() - started
+
+    await client.aclose()
+    return elapsed, fake.requests, summary
+
+
+async def main(count, failure_percent):
+    print(f"{count} rows, {failure_percent}% rejected,"
+          f" {LATENCY * 1000:.0f}ms round trip + {CREATE_LATENCY * 1000:.0f}ms per create")
+    print(f"{'batch':>6} {'seconds':>8} {'rows/s':>8} {'requests':>9} {'created':>8} {'failed':>7}")
+
+    for batch_size in BATCH_SIZES:
+        elapsed, requests, summary = await run(count, batch_size, failure_percent)
+        print(
+            f"{batch_size:>6} {elapsed:>8.2f} {count / elapsed:>8.0f} {requests:>9}"
+            f" {summary['CREATED']:>8} {summary['FAILED']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    ))
@@ -0,0 +1,171 @@
+"""
+Cold-start benchmark: how long a fresh process takes to serve its first
+turn, per agent mode, so autoscaled pods can be sized for quick startup.
+
+Each run starts a new interpreter with empty state files and times, in
+that process: importing the app factory, create_app(), the startup
+hooks, the first GET / and the first "create supplier" turn, plus peak
+RSS and whether google.genai had been imported by then. The parent also
+times the whole run from spawning the interpreter to the first turn's
+answer. A discarded warm-up run per mode writes the .pyc files first.
+The JSON result goes to stdout (or --out), a table to stderr.
+
+Run from the repo root:
+    python -m benchmarks.cold_start --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["guided", "assisted"]
+STAGES = ["import_s", "create_app_s", "startup_s", "first_request_s", "first_turn_s"]
+
+
+async def probe(mode):
+    """One cold start, in this (fresh) process; prints its timings as JSON."""
+    timings = {}
+    started = time.perf_counter()
+
+    from agent_app import create_app
+    timings["import_s"] = time.perf_counter() - started
+
+    t = time.perf_counter()
+    app = create_app(mode)
+    timings["create_app_s"] = time.perf_counter() - t
+
+    import httpx
+
+    auth = (os.environ["AGENT_USERNAME"], os.environ["AGENT_PASSWORD"])
+    t = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup_s"] = time.perf_counter() - t
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold") as client:
+            t = time.perf_counter()
+            (await client.get("/")).raise_for_status()
+            timings["first_request_s"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            response = await client.post(
+                "/supplier-agent", json={"message": "create supplier"}, auth=auth
+            )
+            response.raise_for_status()
+            timings["first_turn_s"] = time.perf_counter() - t
+
+        timings["genai_imported"] = "google.genai" in sys.modules
+        timings["peak_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        )
+        print(json.dumps(timings), flush=True)
+
+
+def cold_start(mode):
+    """Spawn one probe with fresh state files; its timings plus the parent's wall time."""
+    scratch = tempfile.mkdtemp(prefix="supplier-cold-")
+    env = dict(
+        os.environ,
+        AGENT_USERNAME="bench",
+        AGENT_PASSWORD="bench",
+        GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "bench"),
+        SESSION_BACKEND="memory",
+        OUTBOX_PATH=os.path.join(scratch, "outbox.db"),
+        SUPPLIER_INDEX_PATH=os.path.join(scratch, "index.db"),
+        LOV_SNAPSHOT_PATH=os.path.join(scratch, "lov.json"),
+        FUSION_BASE_URL=""
+    )
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.cold_start", "--probe", mode],
+        stdout=subprocess.PIPE, env=env, text=True
+    )
+    line = process.stdout.readline()
+    ready = time.perf_counter() - started
+    process.wait()
+    if process.returncode or not line:
+        raise RuntimeError(f"{mode} probe exited with {process.returncode}")
+
+    timings = json.loads(line)
+    timings["process_to_first_turn_s"] = ready
+    return timings
+
+
+def summarize(samples):
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2)
+    }
+
+
+def run_mode(mode, runs):
+    cold_start(mode)
+    samples = [cold_start(mode) for _ in range(runs)]
+    return {
+        "runs": runs,
+        "stages": {
+            stage: summarize([s[stage] for s in samples])
+            for stage in STAGES + ["process_to_first_turn_s"]
+        },
+        "genai_imported": sum(s["genai_imported"] for s in samples),
+        "peak_rss_mb": max(s["peak_rss_mb"] for s in samples)
+    }
+
+
+def print_table(results):
+    for mode, r in results.items():
+        total = r["stages"]["process_to_first_turn_s"]
+        print(
+            f"{mode}: first turn {total['p50_ms']:.0f}ms after spawn (p50 of {r['runs']}),"
+            f" google.genai imported in {r['genai_imported']}/{r['runs']},"
+            f" peak RSS {r['peak_rss_mb']} MB",
+            file=sys.stderr
+        )
+        for stage in STAGES:
+            t = r["stages"][stage]
+            print(f"  {stage:>16}: p50 {t['p50_ms']:>8.2f}ms  max {t['max_ms']:>8.2f}ms",
+                  file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=MODES + ["both"], default="both")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    parser.add_argument("--probe", choices=MODES, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(args):
+    # Imported here so a probe process loads nothing it is timing
+    from benchmarks.load_test import current_commit
+
+    modes = MODES if args.mode == "both" else [args.mode]
+    results = {mode: run_mode(mode, args.runs) for mode in modes}
+
+    report = {
+        "commit": current_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "probe")},
+        "results": results
+    }
+    print_table(results)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.probe:
+        asyncio.run(probe(args.probe))
+    else:
+        main(args)
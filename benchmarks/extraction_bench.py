@@ -0,0 +1,100 @@
+"""
+Share of turns served by the rule-based extractor, and the latency it saves.
+
+Gemini is replaced by a stub that charges a simulated, log-normally
+distributed latency instead of sleeping, so the run takes seconds.
+
+Run from the repo root:
+    GEMINI_API_KEY=dummy python -m benchmarks.extraction_bench
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+import types
+
+import gemini_agent
+from utils.extraction_cache import ExtractionCache
+
+TURNS = 5_000
+
+# Median ~1.2s with a long tail, roughly what gemini-2.5-flash shows us
+LLM_MEDIAN_SECONDS = 1.2
+LLM_SIGMA = 0.45
+
+CORPUS = [
+    # Structured, fully handled by rules
+    "Supplier: Acme, DUNS 123456789, TaxpayerId 12-3456789, country US",
+    "Supplier: Globex Ltd; Tax ID: 98-7654321; country USA; supplier type services",
+    "supplier name = Initech, Inc., org type corp, taxpayer country United States",
+    "DUNS 555666777",
+    "123456789",
+    "12-3456789",
+    "Taxpayer ID: 45-1234567, DUNS number: 111222333",
+    "country: US",
+    # Free text, needs the model
+    "The vendor is Initech and they are based in Germany",
+    "we want to onboard Stark Industries, a corporation from the US",
+    "their tax number is on the invoice, it's 12 345 6789",
+    "Supplier: Wayne Enterprises, based in Gotham, DUNS 987654321"
+]
+
+
+class SimulatedModels:
+    def __init__(self):
+        self.calls = 0
+        self.charged = 0.0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        self.charged = random.lognormvariate(0, LLM_SIGMA) * LLM_MEDIAN_SECONDS
+        return types.SimpleNamespace(text=json.dumps({"Supplier": "Stub"}))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(extract):
+    models = SimulatedModels()
+    gemini_agent.set_gemini_client(types.SimpleNamespace(
+        aio=types.SimpleNamespace(models=models)
+    ))
+    # Keep the result cache out of the measurement
+    gemini_agent.extraction_cache = ExtractionCache(max_entries=0, path=None)
+
+    latencies = []
+    for _ in range(TURNS):
+        message = random.choice(CORPUS)
+        models.charged = 0.0
+
+        started = time.perf_counter()
+        await extract(message)
+        latencies.append(time.perf_counter() - started + models.charged)
+
+    return models.calls, latencies
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    _, baseline = asyncio.run(run(gemini_agent.extract_with_llm))
+
+    random.seed(7)
+    llm_calls, fast_path = asyncio.run(run(gemini_agent.extract_supplier_payload))
+
+    print(f"turns:                    {TURNS}")
+    print(f"served without LLM:       {1 - llm_calls / TURNS:.1%}")
+    for label, samples in (("LLM only", baseline), ("rules first", fast_path)):
+        print(
+            f"{label:<12} p50 {percentile(samples, 50) * 1000:8.1f} ms"
+            f"   p99 {percentile(samples, 99) * 1000:8.1f} ms"
+            f"   mean {statistics.mean(samples) * 1000:8.1f} ms"
+        )
+
+    rule_only = [
+        s for s in fast_path if s < 0.05
+    ]
+    if rule_only:
+        print(f"rule-only turns p99:      {percentile(rule_only, 99) * 1e6:.0f} us")
@@ -0,0 +1,253 @@
+"""
+In-process stand-in for the Fusion suppliers resource.
+
+Suppliers are generated from their id rather than stored, so a million of
+them cost no memory; only suppliers edited through `touch()` are kept.
+Plug it into a FusionClient with `transport=FakeFusion(n).transport()`.
+
+`latency` is added to every HTTP round trip and `create_latency` to every
+supplier created, so batch and single-post costs can be compared. Names
+starting with "FAIL" are rejected with a 400, like a Fusion validation
+error; by default such a part rolls back its whole batch.
+
+With `capacity` set, requests beyond that many in flight are answered
+429 with `throttle_retry_after` (when given) as Retry-After. `jitter`
+spreads latencies log-normally around their mean and `error_rate` answers
+that share of requests with a 503.
+"""
+import asyncio
+import json
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from config.fusion_settings import SUPPLIER_ENDPOINT, BATCH_ENDPOINT
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+_SINCE = re.compile(r"LastUpdateDate >= '([^']+)'")
+_NAMED = re.compile(r"Supplier='((?:[^']|'')*)'")
+_GENERATED = re.compile(r"Supplier (\d+) Inc")
+_KEYED = re.compile(r"(DUNSNumber|TaxpayerId)='([^']*)'")
+
+
+def sample_latency(mean, jitter=0.0):
+    """`mean` seconds, scattered log-normally (sigma `jitter`) when jitter > 0."""
+    if not mean or not jitter:
+        return mean
+    # Median below the mean so the average stays at `mean`
+    return mean * random.lognormvariate(-jitter ** 2 / 2, jitter)
+
+
+def timestamp(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).isoformat()
+
+
+def seconds_since_epoch(value):
+    return int((datetime.fromisoformat(value) - EPOCH).total_seconds())
+
+
+class FakeFusion:
+    """Supplier i has id i + 1 and was last updated i seconds after EPOCH."""
+
+    def __init__(self, suppliers, latency=0.0, create_latency=0.0,
+                 atomic_batches=True, capacity=None, throttle_retry_after=None,
+                 jitter=0.0, error_rate=0.0):
+        self.suppliers = suppliers
+        self.clock = suppliers
+        self.edited = {}
+        # DUNS number and taxpayer id of the suppliers created through the
+        # API, and the supplier holding each (field, value)
+        self.keys = {}
+        self.keyed = {}
+        self.requests = 0
+        self.latency = latency
+        self.create_latency = create_latency
+        self.atomic_batches = atomic_batches
+        self.capacity = capacity
+        self.throttle_retry_after = throttle_retry_after
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.active = 0
+        self.throttled = 0
+        self.errors = 0
+
+    @staticmethod
+    def duns(i):
+        return f"{i:09d}"
+
+    @staticmethod
+    def taxpayer_id(i):
+        return f"{i // 10_000_000 % 100:02d}-{i % 10_000_000:07d}"
+
+    def supplier(self, i):
+        updated, name = self.edited.get(i, (i, f"Supplier {i} Inc"))
+        return {
+            "SupplierId": i + 1,
+            "SupplierNumber": str(100000 + i),
+            "Supplier": name,
+            "DUNSNumber": self.duns(i),
+            "TaxpayerId": self.taxpayer_id(i),
+            "LastUpdateDate": timestamp(updated),
+            **self.keys.get(i, {})
+        }
+
+    def touch(self, i, name=None):
+        """Edit supplier i now, optionally renaming it."""
+        self.clock += 1
+        current = self.supplier(i)["Supplier"]
+        self.edited[i] = (self.clock, name or current)
+
+    def _ids_since(self, since):
+        start = max(0, seconds_since_epoch(since))
+        base = (i for i in range(start, self.suppliers) if i not in self.edited)
+        edited = sorted(
+            (updated, i) for i, (updated, _) in self.edited.items() if updated >= start
+        )
+        # Unedited rows are already in LastUpdateDate order, and every edit
+        # is newer than all of them
+        return list(base) + [i for _, i in edited]
+
+    def _named(self, name):
+        edited = [i for i, (_, current) in self.edited.items() if current == name]
+        generated = _GENERATED.fullmatch(name)
+        if generated and int(generated.group(1)) < self.suppliers:
+            edited.append(int(generated.group(1)))
+        return [i for i in edited if self.supplier(i)["Supplier"] == name][:1]
+
+    def _keyed(self, field, value):
+        if (field, value) in self.keyed:
+            return [self.keyed[field, value]]
+        digits = value.replace("-", "")
+        if not digits.isdigit():
+            return []
+        i = int(digits)
+        if i >= self.suppliers or self.supplier(i)[field] != value:
+            return []
+        return [i]
+
+    def _list(self, params):
+        limit = int(params.get("limit", 25))
+        offset = int(params.get("offset", 0))
+        order = params.get("orderBy", "SupplierId")
+
+        since = _SINCE.search(params.get("q", ""))
+        named = _NAMED.search(params.get("q", ""))
+        keyed = _KEYED.search(params.get("q", ""))
+        if keyed:
+            page = self._keyed(*keyed.groups())
+            has_more = False
+        elif named:
+            page = self._named(named.group(1).replace("''", "'"))
+            has_more = False
+        elif since:
+            ids = self._ids_since(since.group(1))
+            page = ids[offset:offset + limit]
+            has_more = offset + limit < len(ids)
+        elif order == "LastUpdateDate:desc":
+            newest = max(
+                [(updated, i) for i, (updated, _) in self.edited.items()]
+                + [(self.suppliers - 1, self.suppliers - 1)]
+            )[1] if self.suppliers else None
+            page = [newest] if newest is not None else []
+            has_more = False
+        else:
+            page = range(offset, min(offset + limit, self.suppliers))
+            has_more = offset + limit < self.suppliers
+
+        return {
+            "items": [self.supplier(i) for i in page],
+            "count": len(page),
+            "hasMore": has_more,
+            "limit": limit,
+            "offset": offset
+        }
+
+    @staticmethod
+    def rejection(payload):
+        if not str(payload.get("Supplier") or "FAIL").startswith("FAIL"):
+            return None
+        return {"title": "Bad Request", "detail": "Supplier name is invalid."}
+
+    def create(self, payload):
+        i = self.suppliers
+        self.suppliers += 1
+        self.edited[i] = (self.clock, payload.get("Supplier"))
+        self.keys[i] = {
+            field: payload[field] for field in ("DUNSNumber", "TaxpayerId")
+            if payload.get(field)
+        }
+        self.keyed.update(((field, value), i) for field, value in self.keys[i].items())
+        return self.supplier(i)
+
+    def _batch(self, parts):
+        rejected = {
+            part["id"]: self.rejection(part.get("payload", {}))
+            for part in parts
+        }
+        failed = any(rejected.values())
+        if failed and self.atomic_batches:
+            # The batch is one transaction: nothing is created
+            return 400, [
+                {**part, "exception": rejected[part["id"]]}
+                for part in parts if rejected[part["id"]]
+            ]
+
+        return 200, [
+            {**part, "exception": rejected[part["id"]]} if rejected[part["id"]]
+            else {**part, "payload": self.create(part["payload"])}
+            for part in parts
+        ]
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.capacity is not None and self.active >= self.capacity:
+            self.throttled += 1
+            headers = {}
+            if self.throttle_retry_after is not None:
+                headers["Retry-After"] = str(self.throttle_retry_after)
+            return httpx.Response(429, json={"title": "Too Many Requests"}, headers=headers)
+
+        self.active += 1
+        try:
+            return await self._handle(request)
+        finally:
+            self.active -= 1
+
+    async def _handle(self, request):
+        if self.latency:
+            await asyncio.sleep(sample_latency(self.latency, self.jitter))
+
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, json={"title": "Service Unavailable"})
+
+        if request.method == "POST" and request.url.path == BATCH_ENDPOINT:
+            parts = json.loads(request.content)["parts"]
+            if self.create_latency:
+                await asyncio.sleep(self.create_latency * len(parts))
+            status, parts = self._batch(parts)
+            return httpx.Response(status, json={"parts": parts})
+
+        if request.url.path != SUPPLIER_ENDPOINT:
+            return httpx.Response(404)
+
+        if request.method == "GET":
+            body = self._list(request.url.params)
+            return httpx.Response(200, content=json.dumps(body).encode(),
+                                  headers={"Content-Type": "application/json"})
+
+        if request.method == "POST":
+            payload = json.loads(request.content)
+            if self.create_latency:
+                await asyncio.sleep(self.create_latency)
+            rejection = self.rejection(payload)
+            if rejection:
+                return httpx.Response(400, json=rejection)
+            return httpx.Response(201, json=self.create(payload))
+
+        return httpx.Response(405)
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
@@ -0,0 +1,64 @@
+"""
+In-process stand-in for the Gemini client used by gemini_agent.
+
+Install it with `gemini_agent.set_gemini_client(FakeGemini(...))`.
+Register the fields a message should yield with `expect(message, fields)`;
+a call returns those of them the request's response schema asks for, as JSON,
+after `latency` seconds (scattered by `jitter`, as in FakeFusion).
+`error_rate` of calls fail with `error_code` instead: 429 raises a
+ClientError like a quota hit, 5xx a ServerError.
+"""
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+from google.genai.errors import ClientError, ServerError
+
+from benchmarks.fake_fusion import sample_latency
+
+
+class FakeGemini:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_code=429):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.answers = {}
+        self.calls = 0
+        self.errors = 0
+        # Mirrors client.aio.models.generate_content
+        self.aio = SimpleNamespace(models=self)
+
+    def expect(self, message, fields):
+        self.answers[message] = dict(fields)
+
+    def forget(self, message):
+        self.answers.pop(message, None)
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(sample_latency(self.latency, self.jitter))
+
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            error = ClientError if self.error_code < 500 else ServerError
+            raise error(self.error_code, {
+                "error": {"code": self.error_code, "message": "Injected failure"}
+            })
+
+        wanted = config.response_json_schema["properties"]
+        answer = {
+            field: value for field, value in self.answers.get(contents, {}).items()
+            if field in wanted
+        }
+        text = json.dumps(answer)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(contents) // 4 + 200,
+                candidates_token_count=len(text) // 4,
+                thoughts_token_count=0
+            )
+        )
@@ -0,0 +1,265 @@
+"""
+End-to-end load test of app.py (guided) and app_1.py (Gemini) against the
+in-process Fusion and Gemini stand-ins.
+
+Each virtual user runs whole conversations: "create supplier", then the
+field answers (app) or one free-text message (app_1), then "yes". We
+report throughput, p50/p99 per turn type, how long the outbox took to
+create everything, and peak RSS. The JSON result goes to stdout (or
+--out) so runs can be diffed between commits; a table goes to stderr.
+
+Run from the repo root:
+    python -m benchmarks.load_test --conversations 500 --concurrency 50
+    python -m benchmarks.load_test --app app_1 --gemini-latency 0.8 --gemini-errors 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+# Everything stateful goes to a scratch directory; must happen before the
+# agent's modules, which read the settings, are imported
+_scratch = tempfile.mkdtemp(prefix="supplier-load-")
+os.environ.setdefault("AGENT_USERNAME", "bench")
+os.environ.setdefault("AGENT_PASSWORD", "bench")
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("OUTBOX_PATH", os.path.join(_scratch, "outbox.db"))
+os.environ.setdefault("SUPPLIER_INDEX_PATH", os.path.join(_scratch, "index.db"))
+os.environ.setdefault("LOV_SNAPSHOT_PATH", os.path.join(_scratch, "lov.json"))
+
+import httpx
+
+import gemini_agent
+from benchmarks.fake_fusion import FakeFusion
+from benchmarks.fake_gemini import FakeGemini
+from config.fusion_settings import FIELD_QUESTIONS
+from fusion_client import FusionClient, set_fusion_client
+from supplier_outbox import supplier_outbox, PENDING, RUNNING
+
+AUTH = (os.environ["AGENT_USERNAME"], os.environ["AGENT_PASSWORD"])
+QUESTION_FIELDS = {question: field for field, question in FIELD_QUESTIONS.items()}
+OUTBOX_DRAIN_SECONDS = 120
+
+
+def supplier_fields(n):
+    return {
+        "Supplier": f"Load Supplier {n}",
+        "TaxOrganizationType": "Corporation",
+        "SupplierType": "Services",
+        "BusinessRelationship": "Prospective",
+        "TaxpayerCountry": "United States",
+        "TaxpayerId": f"12-{n:07d}",
+        "DUNSNumber": f"{n:09d}"
+    }
+
+
+def free_text(fields):
+    return (
+        f"{fields['Supplier']} is a corporation selling services out of the"
+        f" {fields['TaxpayerCountry']}, taxpayer id {fields['TaxpayerId']},"
+        f" DUNS {fields['DUNSNumber']}"
+    )
+
+
+class Recorder:
+    def __init__(self):
+        self.turns = defaultdict(list)
+        self.statuses = Counter()
+        self.completed = 0
+        self.failed = Counter()
+
+    async def turn(self, client, kind, message, session_id):
+        payload = {"message": message}
+        if session_id:
+            payload["sessionId"] = session_id
+
+        started = time.perf_counter()
+        response = await client.post("/supplier-agent", json=payload, auth=AUTH)
+        self.turns[kind].append(time.perf_counter() - started)
+        self.statuses[response.status_code] += 1
+
+        if response.status_code != 200:
+            raise RuntimeError(f"{kind}: HTTP {response.status_code}")
+        return response.json()
+
+
+async def conversation(client, mode, n, gemini, recorder):
+    fields = supplier_fields(n)
+    body = await recorder.turn(client, "start", "create supplier", None)
+    session_id = body["sessionId"]
+
+    if mode == "app":
+        # Answer whichever question the guided flow asks next
+        while body["reply"] in QUESTION_FIELDS:
+            field = QUESTION_FIELDS[body["reply"]]
+            body = await recorder.turn(client, "field", fields[field], session_id)
+    else:
+        message = free_text(fields)
+        gemini.expect(message, fields)
+        try:
+            body = await recorder.turn(client, "extract", message, session_id)
+        finally:
+            gemini.forget(message)
+
+    if "duplicates" not in body:
+        raise RuntimeError(f"did not reach confirmation: {body['reply'][:60]!r}")
+
+    body = await recorder.turn(client, "confirm", "yes", session_id)
+    if "jobId" not in body:
+        raise RuntimeError("confirmation did not queue a job")
+
+
+async def drain_outbox(timeout):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        counts = supplier_outbox.counts()
+        if not counts.get(PENDING) and not counts.get(RUNNING):
+            break
+        await asyncio.sleep(0.05)
+    return time.perf_counter() - started, supplier_outbox.counts()
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3)
+    }
+
+
+async def run_mode(mode, args):
+    module = __import__(mode)
+    app = module.app
+
+    fusion = FakeFusion(0, latency=args.fusion_latency, jitter=args.jitter,
+                        error_rate=args.fusion_errors)
+    set_fusion_client(FusionClient(base_url="https://fusion.test",
+                                   transport=fusion.transport()))
+    gemini = FakeGemini(latency=args.gemini_latency, jitter=args.jitter,
+                        error_rate=args.gemini_errors)
+    gemini_agent.set_gemini_client(gemini)
+
+    recorder = Recorder()
+    numbers = iter(range(args.conversations))
+    offset = args.conversations * ["app", "app_1"].index(mode)
+
+    async def user(client):
+        for n in numbers:
+            try:
+                await conversation(client, mode, offset + n, gemini, recorder)
+                recorder.completed += 1
+            except Exception as e:
+                recorder.failed[str(e)] += 1
+
+    # The outbox file is shared by both modes; report only this run's jobs
+    before = Counter(supplier_outbox.counts())
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(user(client) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+        drain_seconds, outbox = await drain_outbox(OUTBOX_DRAIN_SECONDS)
+
+    turns = sum(len(samples) for samples in recorder.turns.values())
+    return {
+        "conversations": args.conversations,
+        "completed": recorder.completed,
+        "failed": dict(recorder.failed),
+        "seconds": round(elapsed, 3),
+        "conversations_per_second": round(recorder.completed / elapsed, 2),
+        "turns_per_second": round(turns / elapsed, 2),
+        "turns": {kind: summarize(samples) for kind, samples in recorder.turns.items()},
+        "http_statuses": {str(code): count for code, count in sorted(recorder.statuses.items())},
+        "outbox": dict(Counter(outbox) - before),
+        "outbox_drain_seconds": round(drain_seconds, 3),
+        "gemini_calls": gemini.calls,
+        "gemini_errors": gemini.errors,
+        "fusion_requests": fusion.requests,
+        "fusion_errors": fusion.errors,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    for mode, r in results.items():
+        print(
+            f"{mode}: {r['completed']}/{r['conversations']} conversations in"
+            f" {r['seconds']}s ({r['conversations_per_second']}/s,"
+            f" {r['turns_per_second']} turns/s), outbox drained in"
+            f" {r['outbox_drain_seconds']}s, peak RSS {r['peak_rss_mb']} MB",
+            file=sys.stderr
+        )
+        for kind, t in r["turns"].items():
+            print(f"  {kind:>8}: n={t['count']:<6} p50 {t['p50_ms']:>8.2f}ms"
+                  f"  p99 {t['p99_ms']:>8.2f}ms  max {t['max_ms']:>8.2f}ms",
+                  file=sys.stderr)
+        for reason, count in r["failed"].items():
+            print(f"  failed x{count}: {reason}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", choices=["app", "app_1", "both"], default="both")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--gemini-latency", type=float, default=0.3,
+                        help="mean seconds per Gemini call")
+    parser.add_argument("--gemini-errors", type=float, default=0.0,
+                        help="share of Gemini calls that fail")
+    parser.add_argument("--fusion-latency", type=float, default=0.05,
+                        help="mean seconds per Fusion round trip")
+    parser.add_argument("--fusion-errors", type=float, default=0.0,
+                        help="share of Fusion requests answered 503")
+    parser.add_argument("--jitter", type=float, default=0.5,
+                        help="log-normal sigma applied to both latencies")
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    return parser.parse_args(argv)
+
+
+async def main(args):
+    modes = ["app", "app_1"] if args.app == "both" else [args.app]
+    results = {mode: await run_mode(mode, args) for mode in modes}
+
+    report = {
+        "commit": current_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results
+    }
+    print_table(results)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,52 @@
+"""
+Fuzzy LOV lookup latency as the value list grows.
+
+Run from the repo root:
+    python -m benchmarks.lov_index_bench
+"""
+import random
+import string
+import time
+
+from utils.lov_index import LovIndex
+
+SIZES = [250, 2_500, 25_000]
+LOOKUPS = 20_000
+
+
+def fake_country(rng):
+    words = rng.randint(1, 3)
+    return " ".join(
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))).title()
+        for _ in range(words)
+    )
+
+
+def typo(value, rng):
+    i = rng.randrange(len(value))
+    return value[:i] + value[i + 1:]
+
+
+def timed(index, queries):
+    started = time.perf_counter()
+    for query in queries:
+        index.match(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+if __name__ == "__main__":
+    rng = random.Random(11)
+    print(f"{'values':>8} {'exact us':>10} {'typo us':>10} {'miss us':>10}")
+
+    for size in SIZES:
+        names = [fake_country(rng) for _ in range(size)]
+        index = LovIndex((name, name) for name in names)
+
+        exact = [rng.choice(names).upper() for _ in range(LOOKUPS)]
+        typos = [typo(rng.choice(names), rng) for _ in range(LOOKUPS)]
+        misses = [fake_country(rng) for _ in range(LOOKUPS)]
+
+        print(
+            f"{size:>8} {timed(index, exact):>10.2f}"
+            f" {timed(index, typos):>10.2f} {timed(index, misses):>10.2f}"
+        )
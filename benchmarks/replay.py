@@ -0,0 +1,274 @@
+"""
+Replay recorded /supplier-agent traffic (TRAFFIC_RECORD_PATH) against this
+build, with Gemini and Fusion answering from the recording.
+
+Conversations start at their recorded offsets and keep their recorded
+think time between turns, both divided by --speed. Gemini answers each
+(message, fields) request with what it answered then, after the recorded
+latency; Fusion calls seen during turns are answered the same way and
+anything else (the outbox creates) goes to FakeFusion. Conversations that
+were already under way when recording started are skipped, as their
+session state is not in the file.
+
+Reports p50/p99 per turn (by state transition) next to the recorded
+timings, and how many replies differ from the recorded ones. JSON goes to
+stdout (or --out), a table to stderr.
+
+Run from the repo root:
+    python -m benchmarks.replay traffic.jsonl --speed 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.load_test import AUTH, summarize, current_commit, drain_outbox, OUTBOX_DRAIN_SECONDS
+
+import gemini_agent
+from benchmarks.fake_fusion import FakeFusion
+from fusion_client import FusionClient, set_fusion_client
+from google.genai.errors import ClientError, ServerError
+
+MISMATCH_EXAMPLES = 5
+
+
+def path_of(url):
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class Recorded:
+    """Recorded answers per request key, handed out in order (the last one repeats)."""
+
+    def __init__(self, latency=True):
+        self._answers = defaultdict(deque)
+        self._latency = latency
+        self.misses = 0
+
+    def add(self, key, answer):
+        self._answers[key].append(answer)
+
+    async def answer(self, key):
+        answers = self._answers.get(key)
+        if not answers:
+            self.misses += 1
+            return None
+        answer = answers.popleft() if len(answers) > 1 else answers[0]
+        if self._latency and answer["seconds"]:
+            await asyncio.sleep(answer["seconds"])
+        return answer
+
+
+class ReplayGemini:
+    def __init__(self, recorded):
+        self.recorded = recorded
+        self.calls = 0
+        self.aio = SimpleNamespace(models=self)
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        fields = tuple(config.response_json_schema["properties"])
+        answer = await self.recorded.answer((contents, fields))
+        if answer is None:
+            text = "{}"
+        elif answer["status"] != 200:
+            code = answer["status"] or 500
+            error = ClientError if code < 500 else ServerError
+            raise error(code, {"error": {"code": code, "message": "Recorded failure"}})
+        else:
+            text = answer["body"]
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+
+class ReplayFusion(FakeFusion):
+    def __init__(self, recorded):
+        super().__init__(0)
+        self.recorded = recorded
+
+    async def _handle(self, request):
+        answer = await self.recorded.answer((request.method, path_of(str(request.url))))
+        if answer is None:
+            return await super()._handle(request)
+        return httpx.Response(answer["status"], text=answer["body"] or "",
+                              headers={"Content-Type": "application/json"})
+
+
+def load_conversations(path):
+    """Recorded turns grouped per session, oldest first, plus the skipped count."""
+    sessions = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                sessions[record["sessionId"]].append(record)
+
+    conversations, skipped = [], 0
+    for turns in sessions.values():
+        turns.sort(key=lambda t: t["at"])
+        if turns[0].get("newSession"):
+            conversations.append(turns)
+        else:
+            skipped += 1
+    conversations.sort(key=lambda turns: turns[0]["at"])
+    return conversations, skipped
+
+
+def load_answers(conversations, latency):
+    gemini, fusion = Recorded(latency), Recorded(latency)
+    for turns in conversations:
+        for turn in turns:
+            for call in turn.get("upstream") or []:
+                request = call["request"]
+                if call["upstream"] == "gemini":
+                    gemini.add((request["contents"], tuple(request["fields"])), call)
+                elif call["upstream"] == "fusion":
+                    fusion.add((request["method"], path_of(request["url"])), call)
+    return gemini, fusion
+
+
+class Replay:
+    def __init__(self, client, speed):
+        self.client = client
+        self.speed = speed
+        self.latencies = defaultdict(list)
+        self.recorded = defaultdict(list)
+        self.statuses = Counter()
+        self.mismatches = []
+        self.mismatch_count = 0
+        self.turns = 0
+
+    async def conversation(self, turns, t0, started):
+        session_id = None
+        for turn in turns:
+            # Recorded offset, compressed
+            delay = (turn["at"] - t0) / self.speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            payload = {"message": turn["message"]}
+            if session_id:
+                payload["sessionId"] = session_id
+
+            sent = time.perf_counter()
+            response = await self.client.post("/supplier-agent", json=payload, auth=AUTH)
+            kind = f"{turn['fromState']}->{turn['toState']}"
+            self.latencies[kind].append(time.perf_counter() - sent)
+            self.recorded[kind].append(turn["seconds"])
+            self.statuses[response.status_code] += 1
+            self.turns += 1
+
+            body = response.json() if response.status_code == 200 else {}
+            session_id = body.get("sessionId", session_id)
+
+            expected = (turn.get("reply") or {}).get("reply")
+            if body.get("reply") != expected:
+                self.mismatch_count += 1
+                if len(self.mismatches) < MISMATCH_EXAMPLES:
+                    self.mismatches.append({
+                        "message": turn["message"],
+                        "recorded": expected,
+                        "replayed": body.get("reply", f"HTTP {response.status_code}")
+                    })
+
+
+async def replay(args):
+    conversations, skipped = load_conversations(args.recording)
+    if not conversations:
+        sys.exit("No replayable conversations in the recording")
+
+    app_name = args.app or conversations[0][0]["app"]
+    app = __import__(app_name).app
+
+    gemini_answers, fusion_answers = load_answers(conversations, not args.no_upstream_latency)
+    fusion = ReplayFusion(fusion_answers)
+    set_fusion_client(FusionClient(base_url="https://fusion.test", transport=fusion.transport()))
+    gemini = ReplayGemini(gemini_answers)
+    gemini_agent.set_gemini_client(gemini)
+
+    t0 = conversations[0][0]["at"]
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            run = Replay(client, args.speed)
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                run.conversation(turns, t0, started) for turns in conversations
+            ))
+            elapsed = time.perf_counter() - started
+        drain_seconds, outbox = await drain_outbox(OUTBOX_DRAIN_SECONDS)
+
+    return {
+        "app": app_name,
+        "conversations": len(conversations),
+        "skipped_conversations": skipped,
+        "turns": run.turns,
+        "seconds": round(elapsed, 3),
+        "recorded_seconds": round(
+            max(t["at"] for turns in conversations for t in turns) - t0, 3
+        ),
+        "turns_per_second": round(run.turns / elapsed, 2),
+        "latency": {kind: summarize(samples) for kind, samples in run.latencies.items()},
+        "recorded_latency": {kind: summarize(samples) for kind, samples in run.recorded.items()},
+        "http_statuses": {str(code): count for code, count in sorted(run.statuses.items())},
+        "reply_mismatches": run.mismatch_count,
+        "mismatch_examples": run.mismatches,
+        "gemini_calls": gemini.calls,
+        "gemini_unrecorded": gemini_answers.misses,
+        "fusion_requests": fusion.requests,
+        "outbox": outbox,
+        "outbox_drain_seconds": round(drain_seconds, 3)
+    }
+
+
+def print_table(result):
+    print(
+        f"{result['app']}: {result['conversations']} conversations"
+        f" ({result['skipped_conversations']} skipped), {result['turns']} turns in"
+        f" {result['seconds']}s (recorded over {result['recorded_seconds']}s),"
+        f" {result['reply_mismatches']} replies differ",
+        file=sys.stderr
+    )
+    for kind, t in result["latency"].items():
+        before = result["recorded_latency"][kind]
+        print(f"  {kind:>24}: n={t['count']:<6} p50 {t['p50_ms']:>8.2f}ms"
+              f" (was {before['p50_ms']:.2f})  p99 {t['p99_ms']:>8.2f}ms"
+              f" (was {before['p99_ms']:.2f})", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recording", help="JSONL written via TRAFFIC_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay N times faster than recorded")
+    parser.add_argument("--app", choices=["app", "app_1"],
+                        help="defaults to the app the traffic was recorded on")
+    parser.add_argument("--no-upstream-latency", action="store_true",
+                        help="answer upstream calls immediately")
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    return parser.parse_args(argv)
+
+
+async def main(args):
+    result = await replay(args)
+    report = {
+        "commit": current_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "result": result
+    }
+    print_table(result)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
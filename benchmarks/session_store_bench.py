@@ -0,0 +1,76 @@
+"""
+Session store latency vs. number of live conversations.
+
+Run from the repo root:
+    python -m benchmarks.session_store_bench [memory|sqlite]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from utils.session_manager import init_session
+from utils.session_store import SessionStore, SQLiteSessionStore, new_session_id
+
+SIZES = [1_000, 10_000, 50_000, 100_000]
+OPERATIONS = 200_000
+
+
+def half_finished_conversation():
+    session = init_session()
+    session["Supplier"] = "Acme Industrial Supplies"
+    session["TaxpayerCountry"] = "United States"
+    return {
+        "state": "COLLECTING",
+        "session": session,
+        "current_field": "TaxpayerId"
+    }
+
+
+def make_store(backend, size):
+    # Headroom so capacity limits never evict during the measurement
+    if backend == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+        return SQLiteSessionStore(path=path, max_entries=size * 2)
+    return SessionStore(max_entries=size * 2)
+
+
+def run(backend, size):
+    store = make_store(backend, size)
+
+    tracemalloc.start()
+    session_ids = [new_session_id() for _ in range(size)]
+    for session_id in session_ids:
+        store.save(session_id, half_finished_conversation(), 0)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lookups = [random.choice(session_ids) for _ in range(OPERATIONS)]
+
+    started = time.perf_counter()
+    for session_id in lookups:
+        conversation, version = store.load(session_id)
+        conversation["current_field"] = "DUNSNumber"
+        store.save(session_id, conversation, version)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "sessions": size,
+        "ns_per_get_put": round(elapsed / OPERATIONS * 1e9),
+        "bytes_per_session": round(memory / size)
+    }
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "memory"
+
+    print(f"{'sessions':>10} {'ns/get+put':>12} {'bytes/session':>14}")
+    for size in SIZES:
+        result = run(backend, size)
+        print(
+            f"{result['sessions']:>10} "
+            f"{result['ns_per_get_put']:>12} "
+            f"{result['bytes_per_session']:>14}"
+        )
@@ -0,0 +1,81 @@
+"""
+Duplicate index sync throughput and lookup latency against a stub Fusion.
+
+Run from the repo root:
+    python -m benchmarks.supplier_index_bench [suppliers]   (default 1,000,000)
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_fusion import FakeFusion
+from fusion_client import FusionClient
+from supplier_index import SupplierIndex
+
+LOOKUPS = 20_000
+EDITS = 1_000
+
+
+def timed(index, payloads):
+    started = time.perf_counter()
+    for payload in payloads:
+        index.find_duplicates(payload)
+    return (time.perf_counter() - started) / len(payloads) * 1e6
+
+
+async def main(suppliers):
+    fake = FakeFusion(suppliers)
+    client = FusionClient(base_url="https://fusion.test", transport=fake.transport())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "supplier_index.db")
+        index = SupplierIndex(path=path, client_factory=lambda: client,
+                              capacity=max(4 * suppliers, 1000))
+
+        started = time.perf_counter()
+        await index.sync()
+        full_seconds = time.perf_counter() - started
+
+        rng = random.Random(12)
+        for i in rng.sample(range(suppliers), EDITS):
+            fake.touch(i, name=f"Renamed {i} LLC")
+
+        started = time.perf_counter()
+        received = await index.sync()
+        incremental_seconds = time.perf_counter() - started
+
+        new = [
+            {"Supplier": f"Brand New {n}", "DUNSNumber": f"9{n:08d}",
+             "TaxpayerId": f"99-{n:08d}"}
+            for n in range(LOOKUPS)
+        ]
+        by_duns = [
+            {"Supplier": f"Brand New {n}", "DUNSNumber": fake.duns(rng.randrange(suppliers))}
+            for n in range(LOOKUPS)
+        ]
+        by_name = [
+            {"Supplier": f"SUPPLIER {rng.randrange(suppliers)}, Inc."}
+            for _ in range(LOOKUPS)
+        ]
+
+        print(f"suppliers           {suppliers:,}")
+        print(f"full sync           {full_seconds:.1f}s"
+              f" ({suppliers / full_seconds:,.0f} rows/s, {fake.requests} requests)")
+        print(f"incremental sync    {incremental_seconds * 1000:.0f}ms"
+              f" ({received} rows after {EDITS} edits)")
+        print(f"new supplier        {timed(index, new):.1f} us")
+        print(f"duplicate DUNS      {timed(index, by_duns):.1f} us")
+        print(f"duplicate name      {timed(index, by_name):.1f} us")
+        print(f"bloom               {len(index._bloom.to_bytes()) / 2**20:.1f} MiB,"
+              f" index file {os.path.getsize(path) / 2**20:.0f} MiB")
+        print(f"stats               {index.stats}")
+
+        index.close()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,390 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from config.fusion_settings import DEFAULT_VALUES, get_settings
+from fusion_client import create_suppliers
+from supplier_index import supplier_index, supplier_keys
+from fusion_validator import validate_fields
+from utils.auth import authenticate_user
+from utils.normalizer import normalize_supplier_payload
+from utils.session_manager import get_missing_fields
+from utils.adaptive_limiter import request_flow
+from utils.upstream_guard import UpstreamOverloaded
+
+settings = get_settings()
+
+router = APIRouter()
+
+CSV_TYPES = {"text/csv", "application/csv"}
+JSONL_TYPES = {"application/x-ndjson", "application/jsonl", "application/json-lines"}
+
+
+# ---------------- STREAMING PARSERS ----------------
+async def iter_lines(chunks, max_chars=settings.bulk_max_record_chars):
+    """
+    Decode an async byte stream into lines without buffering the body.
+
+    A line longer than `max_chars` is dropped as it streams in and a
+    ValueError yielded in its place, so a body with no newlines cannot
+    grow without bound.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    too_long = ValueError(f"Line longer than {max_chars} characters")
+    pending = ""
+    # Inside a line already reported as too long
+    skipping = False
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > max_chars:
+                yield too_long
+            else:
+                yield line.rstrip("\r")
+
+        if len(pending) > max_chars:
+            if not skipping:
+                yield too_long
+            pending, skipping = "", True
+
+    pending += decoder.decode(b"", final=True)
+    if skipping:
+        return
+    if len(pending) > max_chars:
+        yield too_long
+    elif pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(lines, max_chars=settings.bulk_max_record_chars):
+    header = None
+    record = ""
+    row_number = 0
+
+    async for line in lines:
+        if isinstance(line, Exception):
+            record, row_number = "", row_number + 1
+            yield row_number, line
+            continue
+
+        record = f"{record}\n{line}" if record else line
+
+        # A quoted field may span lines; escaped quotes come in pairs
+        if record.count('"') % 2:
+            if len(record) > max_chars:
+                # Most likely a quote that is never closed; give up on the
+                # record rather than read the rest of the upload into it
+                record, row_number = "", row_number + 1
+                yield row_number, ValueError(
+                    f"Quoted field longer than {max_chars} characters"
+                    " (unterminated quote?)"
+                )
+            continue
+
+        values, record = next(csv.reader([record]), []), ""
+        if not any(v.strip() for v in values):
+            continue
+
+        if header is None:
+            header = [v.strip() for v in values]
+            continue
+
+        row_number += 1
+        yield row_number, {
+            k: v.strip() for k, v in zip(header, values) if v.strip()
+        }
+
+    if record:
+        row_number += 1
+        yield row_number, ValueError("Unterminated quoted field")
+
+
+async def iter_jsonl_rows(lines):
+    row_number = 0
+
+    async for line in lines:
+        if isinstance(line, Exception):
+            row_number += 1
+            yield row_number, line
+            continue
+
+        if not line.strip():
+            continue
+
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+            continue
+
+        if not isinstance(row, dict):
+            yield row_number, ValueError("Row must be a JSON object")
+            continue
+
+        yield row_number, row
+
+
+# ---------------- ROW PIPELINE ----------------
+def prepare_row(row):
+    payload = dict(DEFAULT_VALUES)
+
+    for k, v in row.items():
+        if v is None or v == "":
+            continue
+        # JSONL may carry DUNS / taxpayer ids as numbers
+        payload[k] = v if isinstance(v, (str, bool)) else str(v)
+
+    return normalize_supplier_payload(payload)
+
+
+def check_row(row_number, row):
+    """(result, None) for a row that cannot be created, else (None, payload)."""
+    if isinstance(row, Exception):
+        return {"row": row_number, "status": "INVALID", "errors": [str(row)]}, None
+
+    payload = prepare_row(row)
+
+    # Normalization drops a LOV value it cannot match; check the value
+    # sent, so the row says it is invalid rather than missing
+    cleared = {
+        field: value for field, value in row.items()
+        if value not in (None, "") and payload.get(field) is None
+    }
+    invalid = validate_fields({**payload, **cleared})
+    for field, value in cleared.items():
+        # A field with aliases but no list to check them against
+        invalid.setdefault(field, f"{field} {value} is not a valid Fusion value")
+
+    errors = [f"{f} is required" for f in get_missing_fields(payload) if f not in invalid]
+    errors += invalid.values()
+    if errors:
+        return {"row": row_number, "status": "INVALID", "errors": errors}, None
+
+    # Re-running a load must not create the same supplier twice
+    duplicates = supplier_index.find_duplicates(payload)
+    if duplicates:
+        return {"row": row_number, "status": "DUPLICATE", "duplicates": duplicates}, None
+
+    return None, payload
+
+
+def row_keys(payload):
+    return [(i, key) for i, key in enumerate(supplier_keys(payload)) if key]
+
+
+def repeat_of(seen, row_number, payload):
+    """
+    The earlier row of this upload that shares a name, DUNS number or
+    taxpayer id with payload, else None. `seen` maps the keys of the rows
+    let through so far to their row number; this row's are added to it.
+    """
+    keys = row_keys(payload)
+    earlier = next((seen[key] for key in keys if key in seen), None)
+    if earlier is None:
+        seen.update(dict.fromkeys(keys, row_number))
+    return earlier
+
+
+def forget(seen, batch):
+    """Drop the keys repeat_of kept for the rows of batch."""
+    for row_number, payload in batch:
+        for key in row_keys(payload):
+            if seen.get(key) == row_number:
+                del seen[key]
+
+
+def check_rows(rows):
+    """
+    check_row over [(row_number, row)] held in memory, also catching rows
+    that repeat an earlier one: (results for rows that cannot be created,
+    [(row_number, payload)] for those that can).
+    """
+    results, ready, seen = [], [], {}
+    for row_number, row in rows:
+        result, payload = check_row(row_number, row)
+        if result is None:
+            earlier = repeat_of(seen, row_number, payload)
+            if earlier is None:
+                ready.append((row_number, payload))
+                continue
+            result = {"row": row_number, "status": "DUPLICATE", "duplicateOfRow": earlier}
+        results.append(result)
+    return results, ready
+
+
+def row_result(row_number, payload, status, response):
+    if status == 201:
+        supplier_index.remember(payload, response)
+        return {
+            "row": row_number,
+            "status": "CREATED",
+            "SupplierId": response.get("SupplierId"),
+            "SupplierNumber": response.get("SupplierNumber")
+        }
+
+    return {
+        "row": row_number,
+        "status": "FAILED",
+        "httpStatus": status,
+        "error": response
+    }
+
+
+async def create_rows(batch, batch_size):
+    """Create [(row_number, payload)] through one Fusion batch request."""
+    payloads = [payload for _, payload in batch]
+
+    while True:
+        try:
+            outcomes = await create_suppliers(payloads, batch_size)
+            break
+        except UpstreamOverloaded as e:
+            # Interactive turns are shed; a bulk job just waits its turn
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            logging.exception("Bulk rows %s failed", [n for n, _ in batch])
+            return [
+                {"row": row_number, "status": "FAILED", "error": str(e)}
+                for row_number, _ in batch
+            ]
+
+    return [
+        row_result(row_number, payload, status, response)
+        for (row_number, payload), (status, response) in zip(batch, outcomes)
+    ]
+
+
+async def run_bulk(rows, concurrency=settings.bulk_concurrency,
+                   batch_size=settings.fusion_batch_size):
+    """
+    Yield NDJSON results as rows finish.
+
+    Valid rows are grouped into Fusion batch requests of `batch_size`; at
+    most `concurrency` batches are in flight, and the parser is only pulled
+    when a slot frees up, so memory stays flat however long the upload.
+    """
+    # Each upload queues for Fusion as its own flow, behind nobody else's
+    request_flow.set(f"bulk:{uuid.uuid4().hex[:12]}")
+
+    pending = set()
+    # Keys of the rows in `batch` and in the batches still in flight; a
+    # finished batch's created rows are in the duplicate index instead
+    batch, seen, batches = [], {}, {}
+    counts = {"rows": 0, "CREATED": 0, "DUPLICATE": 0, "INVALID": 0, "FAILED": 0}
+
+    def emit(results):
+        for result in results:
+            counts["rows"] += 1
+            counts[result["status"]] += 1
+            yield json.dumps(result) + "\n"
+
+    def finished(done):
+        for task in done:
+            forget(seen, batches.pop(task))
+            yield from emit(task.result())
+
+    def submit(batch):
+        task = asyncio.create_task(create_rows(batch, batch_size))
+        batches[task] = batch
+        pending.add(task)
+
+    try:
+        async for row_number, row in rows:
+            result, payload = check_row(row_number, row)
+            if result is not None:
+                for line in emit([result]):
+                    yield line
+                continue
+
+            # The index only learns a supplier once its batch is created,
+            # so repeats of rows still queued or in flight are caught here
+            earlier = repeat_of(seen, row_number, payload)
+            if earlier is not None:
+                for line in emit([{"row": row_number, "status": "DUPLICATE",
+                                   "duplicateOfRow": earlier}]):
+                    yield line
+                continue
+
+            batch.append((row_number, payload))
+            if len(batch) < batch_size:
+                continue
+
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for line in finished(done):
+                    yield line
+
+            submit(batch)
+            batch = []
+
+        if batch:
+            submit(batch)
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for line in finished(done):
+                yield line
+
+        yield json.dumps({"summary": counts}) + "\n"
+
+    finally:
+        # Client went away mid-stream
+        for task in pending:
+            task.cancel()
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that does not listen for disconnects.
+
+    The stock one reads receive() concurrently to spot a client going
+    away, which would swallow the upload body we are still streaming in.
+    A vanished client surfaces as a failed send instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+# =========================================================
+# BULK ENDPOINT
+# =========================================================
+@router.post("/suppliers/bulk")
+async def bulk_create_suppliers(request: Request,
+                                format: str = None,
+                                username: str = Depends(authenticate_user)):
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    upload_format = (format or "").lower()
+
+    if upload_format == "csv" or content_type in CSV_TYPES:
+        parser = iter_csv_rows
+    elif upload_format == "jsonl" or content_type in JSONL_TYPES:
+        parser = iter_jsonl_rows
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Upload text/csv or application/x-ndjson, or pass ?format=csv|jsonl"
+        )
+
+    rows = parser(iter_lines(request.stream()))
+
+    return UploadStreamingResponse(
+        run_bulk(rows),
+        media_type="application/x-ndjson"
+    )
@@ -1,49 +1,311 @@
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-FUSION_BASE_URL = os.getenv("FUSION_BASE_URL")
-FUSION_USERNAME = os.getenv("FUSION_USERNAME")
-FUSION_PASSWORD = os.getenv("FUSION_PASSWORD")
+from dataclasses import dataclass, fields
+from typing import Optional
 
 SUPPLIER_ENDPOINT = (
     "/fscmRestApi/resources/11.13.18.05/suppliers"
 )
 
+# Batch requests go to the resource version root, one part per operation
+BATCH_ENDPOINT = "/fscmRestApi/resources/11.13.18.05/"
+
+# ---------------- SUPPLIER FIELDS ----------------
+# The one definition of each supplier field, in the order the guided flow
+# asks for them. The lists below, the Gemini response schema, the rule
+# extractor's labels and the compiled validator (request_schema.py) are
+# all derived from it.
+#   question  what the guided flow asks
+#   default   pre-filled value, still validated against Fusion
+#   allowed   LOV used until Fusion's own list is loaded
+#   aliases   free-text spellings of LOV values (keys are matched after
+#             lowercasing and dropping punctuation, so "U.S.A." hits "usa")
+#   hint      what Gemini is told; fields without one are not extracted
+#   labels    how the field is labelled in structured text
+#   pattern   format Fusion accepts, with `message` when it does not match
+#   required  False for fields the agent never asks for
+SUPPLIER_FIELDS = {
+    "Supplier": {
+        "question": "What is the supplier name?",
+        "hint": "Supplier name",
+        "labels": ["supplier", "supplier name", "vendor", "vendor name", "company name"]
+    },
+    "TaxOrganizationType": {
+        "question": "What is the Tax Organization Type? (default: Corporation)",
+        "default": "Corporation",
+        "allowed": ["Corporation"],
+        "aliases": {
+            "corporation": "Corporation",
+            "corp": "Corporation",
+            "company": "Corporation"
+        },
+        "hint": "e.g. Corporation",
+        "labels": [
+            "tax organization type", "tax organisation type", "tax org type",
+            "organization type", "org type"
+        ]
+    },
+    "SupplierType": {
+        "question": "What is the Supplier Type? (default: Services)",
+        "default": "Services",
+        "allowed": ["Services"],
+        "aliases": {
+            "services": "Services",
+            "service": "Services",
+            "provided services": "Services"
+        },
+        "hint": "e.g. Services",
+        "labels": ["supplier type", "vendor type"]
+    },
+    "BusinessRelationship": {
+        "question": "What is the Business Relationship? (default: Prospective)",
+        "default": "Prospective",
+        "allowed": ["Prospective"]
+    },
+    "TaxpayerCountry": {
+        "question": "Which country is the taxpayer based in?",
+        # Fusion's territories replace this once loaded
+        "allowed": ["United States"],
+        "aliases": {
+            "us": "United States",
+            "usa": "United States",
+            "united states": "United States",
+            "united states of america": "United States",
+            "america": "United States"
+        },
+        "hint": "Country name",
+        "labels": ["taxpayer country", "country"]
+    },
+    "TaxpayerId": {
+        "question": "Please provide the Taxpayer ID (xx-xxxxxxxx)",
+        "hint": "Format xx-xxxxxxxx",
+        "labels": ["taxpayer id", "taxpayerid", "tax id", "taxid", "tin", "ein"],
+        "pattern": r"\d{2}-\d{7,8}",
+        "message": "TaxpayerId must look like xx-xxxxxxx(x)"
+    },
+    "DUNSNumber": {
+        "question": "Please provide the 9-digit DUNS Number",
+        "hint": "9 digits",
+        "labels": ["duns", "duns number", "dunsnumber", "duns no"],
+        "pattern": r"\d{9}",
+        "message": "DUNSNumber must be exactly 9 digits"
+    },
+    "OneTimeSupplierFlag": {
+        "default": False,
+        "required": False
+    }
+}
+
 REQUIRED_FIELDS = [
-    "Supplier",
-    "TaxOrganizationType",
-    "SupplierType",
-    "BusinessRelationship",
-    "TaxpayerCountry",
-    "TaxpayerId",
-    "DUNSNumber"
+    field for field, spec in SUPPLIER_FIELDS.items() if spec.get("required", True)
 ]
 
-
 DEFAULT_VALUES = {
-    "BusinessRelationship": "Prospective",
-    "OneTimeSupplierFlag": False,
-    "TaxOrganizationType": "Corporation",
-    "SupplierType": "Services"
+    field: spec["default"] for field, spec in SUPPLIER_FIELDS.items() if "default" in spec
 }
 
 FIELD_QUESTIONS = {
-    "Supplier": "What is the supplier name?",
-    "TaxOrganizationType": "What is the Tax Organization Type? (default: Corporation)",
-    "SupplierType": "What is the Supplier Type? (default: Services)",
-    "BusinessRelationship": "What is the Business Relationship? (default: Prospective)",
-    "TaxpayerCountry": "Which country is the taxpayer based in?",
-    "TaxpayerId": "Please provide the Taxpayer ID (xx-xxxxxxxx)",
-    "DUNSNumber": "Please provide the 9-digit DUNS Number"
+    field: spec["question"] for field, spec in SUPPLIER_FIELDS.items() if "question" in spec
 }
 
-
 FUSION_ALLOWED_VALUES = {
-    "TaxOrganizationType": ["Corporation"],
-    "SupplierType": ["Services"],
-    "BusinessRelationship": ["Prospective"],
-    }
+    field: spec["allowed"] for field, spec in SUPPLIER_FIELDS.items() if "allowed" in spec
+}
+
+# Free-text spellings users type for LOV values
+LOV_ALIASES = {
+    field: spec["aliases"] for field, spec in SUPPLIER_FIELDS.items() if "aliases" in spec
+}
+
+# ---------------- LOV CACHE ----------------
+# Fusion lookups backing FUSION_ALLOWED_VALUES once loaded
+LOOKUPS_ENDPOINT = "/fscmRestApi/resources/11.13.18.05/commonLookups"
+TERRITORIES_ENDPOINT = "/fscmRestApi/resources/11.13.18.05/territories"
+
+LOV_LOOKUP_TYPES = {
+    "TaxOrganizationType": "ORGANIZATION TYPE",
+    "SupplierType": "VENDOR TYPE",
+    "BusinessRelationship": "POZ_BUSINESS_RELATIONSHIP"
+}
+
+
+# ---------------- SETTINGS ----------------
+@dataclass(frozen=True)
+class AppSettings:
+    """
+    Every setting the agent takes from its environment, parsed once. Each
+    field is read from the variable of the same name in upper case
+    (gemini_model from GEMINI_MODEL). Benchmarks and tests pass a
+    replace()d copy to create_app() instead of changing os.environ and
+    re-importing.
+    """
+
+    # ---------------- APP ----------------
+    # Conversation flow served by app.py: "guided" asks for one field at a
+    # time, "assisted" extracts fields from free text with Gemini
+    agent_mode: str = "guided"
+    # Basic auth credentials for every endpoint but /
+    agent_username: Optional[str] = None
+    agent_password: Optional[str] = None
+
+    # ---------------- GEMINI ----------------
+    gemini_api_key: Optional[str] = None
+    gemini_model: str = "models/gemini-2.5-flash"
+
+    # Guard around Gemini calls; past the budget we fall back to rule extraction
+    gemini_latency_budget_seconds: float = 8.0
+    gemini_max_in_flight: int = 16
+    gemini_max_queue: int = 64
+    gemini_breaker_failures: int = 5
+    gemini_breaker_reset_seconds: float = 30.0
+    gemini_hedge: bool = False
+
+    # Cache of Gemini extraction results; set a path to persist it on disk
+    extraction_cache_size: int = 10000
+    extraction_cache_ttl_seconds: int = 86400
+    extraction_cache_path: Optional[str] = None
+
+    # Pasted lists of suppliers are extracted in parallel chunks of about this
+    # many characters; anything past the cap is left for another message
+    extraction_chunk_chars: int = 2000
+    max_suppliers_per_message: int = 50
+
+    # ---------------- FUSION ----------------
+    fusion_base_url: Optional[str] = None
+    fusion_username: Optional[str] = None
+    fusion_password: Optional[str] = None
+    fusion_batch_size: int = 25
+
+    # Shared HTTP pool for Fusion REST calls
+    fusion_max_connections: int = 20
+    fusion_max_keepalive: int = 10
+    fusion_connect_timeout: float = 5.0
+    fusion_read_timeout: float = 60.0
+    fusion_max_queue: int = 50
+
+    # Adaptive concurrency window: starts at the initial size and moves
+    # between the bounds as Fusion throttles (429/503) or slows down. Keep
+    # the ceiling within fusion_max_connections.
+    fusion_initial_in_flight: int = 10
+    fusion_min_in_flight: int = 1
+    fusion_max_in_flight: int = 20
+    fusion_latency_tolerance: float = 2.0
+    # Throttled requests are re-sent (after any Retry-After) this many times
+    fusion_throttle_retries: int = 3
+    fusion_max_retry_after_seconds: float = 60.0
+    # Share of successful creates whose response body is logged (failures always are)
+    fusion_log_sample_rate: float = 0.01
+
+    # Retry-After sent when a request is shed because an upstream queue is full
+    shed_retry_after_seconds: int = 2
+
+    # ---------------- LOV CACHE ----------------
+    lov_page_size: int = 500
+    lov_refresh_seconds: int = 3600
+    lov_snapshot_path: str = "lov_snapshot.json"
+
+    # ---------------- DUPLICATE INDEX ----------------
+    # Local copy of existing suppliers' name / DUNS / taxpayer id keys
+    supplier_index_path: str = "supplier_index.db"
+    supplier_index_page_size: int = 500
+    supplier_index_sync_seconds: int = 300
+    # Bloom filter size in keys (up to three per supplier)
+    supplier_index_capacity: int = 3000000
+
+    # ---------------- OUTBOX ----------------
+    # Confirmed suppliers are queued here and created by background workers
+    outbox_path: str = "supplier_outbox.db"
+    outbox_workers: int = 4
+    outbox_max_attempts: int = 8
+    outbox_backoff_seconds: float = 1.0
+    outbox_max_backoff_seconds: float = 300.0
+    # Must outlast a Fusion call; a job held longer is assumed orphaned
+    outbox_lease_seconds: float = 180.0
+    outbox_poll_seconds: float = 1.0
+    outbox_retention_seconds: int = 604800
+
+    # ---------------- BULK ----------------
+    bulk_concurrency: int = 8
+    # Longest line, or multi-line quoted CSV record, an upload may hold
+    bulk_max_record_chars: int = 65536
+
+    # ---------------- PRECHECKS ----------------
+    # Fusion duplicate lookups started in the background as soon as a DUNS
+    # number or taxpayer id is given (on by default when Fusion is configured)
+    precheck_enabled: bool = False
+    # How long "yes" waits for a lookup still in flight before going ahead
+    precheck_wait_seconds: float = 2.0
+
+    # ---------------- SESSIONS ----------------
+    # "memory" keeps sessions in-process; "sqlite" shares them across workers
+    session_backend: str = "memory"
+    session_db_path: str = "sessions.db"
+    session_ttl_seconds: int = 1800
+    session_max_entries: int = 50000
+    session_shards: int = 32
+
+    # ---------------- PROFILING ----------------
+    # Opt-in: when enabled, a /supplier-agent request is profiled if it sends
+    # "X-Profile: 1" or falls in the sample. Profiles hold session data, so
+    # keep profile_dir private.
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_seconds: float = 0.005
+    profile_dir: str = "profiles"
+    profile_max_files: int = 50
+
+    # ---------------- TRAFFIC RECORDING ----------------
+    # Set a path to append every /supplier-agent turn there as JSONL for
+    # benchmarks/replay.py. Identifiers are pseudonymized with the key (a
+    # random one per process when unset, so set it to keep pseudonyms
+    # stable across restarts).
+    traffic_record_path: Optional[str] = None
+    traffic_redaction_key: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        values = {
+            setting.name: _parse(setting.type, environ[setting.name.upper()])
+            for setting in fields(cls) if setting.name.upper() in environ
+        }
+        values.setdefault("precheck_enabled", bool(values.get("fusion_base_url")))
+        return cls(**values)
+
+
+def _parse(kind, value):
+    if kind is bool:
+        return value.lower() == "true"
+    if kind in (int, float):
+        return kind(value)
+    return value
+
+
+def load_settings():
+    """
+    Settings from the environment, after loading a .env file into it.
+    create_app() calls this, so importing the code reads no files.
+    """
+    # python-dotenv is only needed here
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return AppSettings.from_env()
+
+
+_settings = None
+
+
+def get_settings():
+    """
+    The settings in effect: those create_app() installed, else the
+    environment as it is on first use. Modules read them when imported,
+    so create_app() installs its settings before importing them.
+    """
+    global _settings
+    if _settings is None:
+        _settings = AppSettings.from_env()
+    return _settings
+
+
+def use_settings(settings):
+    global _settings
+    _settings = settings
@@ -1,37 +1,297 @@
-import requests
-from requests.auth import HTTPBasicAuth
-from config.fusion_settings import FUSION_BASE_URL, FUSION_USERNAME, FUSION_PASSWORD, SUPPLIER_ENDPOINT
+import asyncio
+import random
+import time
+
+import httpx
+from config.fusion_settings import SUPPLIER_ENDPOINT, BATCH_ENDPOINT, get_settings
+from utils.auth import get_basic_auth_header
+from utils.adaptive_limiter import AdaptiveLimiter, parse_retry_after
+from utils.metrics import stage_seconds, upstream_responses, register_collector
+from utils.traffic_recorder import current_recording, record_upstream
+from utils.upstream_guard import UpstreamOverloaded
 import logging
 
+settings = get_settings()
+
+BATCH_CONTENT_TYPE = "application/vnd.oracle.adf.batch+json"
+# Batch part paths are relative to the resource version root
+BATCH_SUPPLIER_PATH = "/" + SUPPLIER_ENDPOINT[len(BATCH_ENDPOINT):]
+
+# Fusion's "slow down" answers
+THROTTLE_STATUSES = {429, 503}
+
+# Body reported for a batch part Fusion returned no result for
+UNKNOWN_OUTCOME = {
+    "title": "Unknown outcome",
+    "detail": "The batch was committed without a result for this part; it may have been created."
+}
+
+
+class FusionClient:
+    """
+    Pooled, keep-alive async client for the Fusion REST API.
+
+    One instance is shared by every request so connections (and their TLS
+    sessions) are reused. Pass `transport` or `base_url` to point it at a
+    local stand-in server.
+
+    Concurrency is an AdaptiveLimiter window between `min_in_flight` and
+    `max_in_flight`, steered by Fusion's 429/503s, Retry-After and
+    latency. Calls beyond the window queue fairly per request_flow; once
+    `max_queue` are waiting, further calls raise UpstreamOverloaded.
+    Throttled requests are re-sent up to `throttle_retries` times once the
+    Retry-After has passed (POSTs only when Fusion sent one, as a bare 503
+    does not say the create was not applied).
+    """
+
+    def __init__(self, base_url=settings.fusion_base_url,
+                 username=settings.fusion_username,
+                 password=settings.fusion_password,
+                 max_connections=settings.fusion_max_connections,
+                 max_keepalive=settings.fusion_max_keepalive,
+                 connect_timeout=settings.fusion_connect_timeout,
+                 read_timeout=settings.fusion_read_timeout,
+                 max_in_flight=settings.fusion_max_in_flight,
+                 max_queue=settings.fusion_max_queue,
+                 initial_in_flight=settings.fusion_initial_in_flight,
+                 min_in_flight=settings.fusion_min_in_flight,
+                 latency_tolerance=settings.fusion_latency_tolerance,
+                 throttle_retries=settings.fusion_throttle_retries,
+                 max_retry_after=settings.fusion_max_retry_after_seconds,
+                 transport=None):
+        self.limiter = AdaptiveLimiter(
+            "fusion",
+            initial=min(initial_in_flight, max_in_flight),
+            min_limit=min_in_flight,
+            max_limit=max_in_flight,
+            max_queue=max_queue,
+            retry_after=settings.shed_retry_after_seconds,
+            latency_tolerance=latency_tolerance,
+            max_retry_after=max_retry_after
+        )
+        self._throttle_retries = throttle_retries
+        self.retried = 0
+        self._client = httpx.AsyncClient(
+            base_url=base_url or "",
+            headers={
+                "Authorization": get_basic_auth_header(username, password),
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            },
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=transport
+        )
+
+    async def _send(self, method, path, kind, **kwargs):
+        for attempt in range(self._throttle_retries + 1):
+            self.limiter.check()
+            await self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except httpx.HTTPError:
+                self.limiter.release(failed=True)
+                upstream_responses.inc("fusion", "error")
+                raise
+            except BaseException:
+                self.limiter.release()
+                raise
+
+            latency = time.monotonic() - started
+            stage_seconds.observe(latency, f"fusion_{method.lower()}")
+            upstream_responses.inc("fusion", str(response.status_code))
+            if current_recording.get() is not None:
+                record_upstream("fusion", {"method": method, "url": str(response.request.url)},
+                                response.status_code, response.text, latency)
+
+            if response.status_code not in THROTTLE_STATUSES:
+                self.limiter.release(latency, kind)
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.limiter.release(throttled=True, retry_after=retry_after)
+
+            if method == "POST" and retry_after is None and response.status_code == 503:
+                return response
+            if attempt < self._throttle_retries:
+                self.retried += 1
+                if retry_after is None:
+                    # The window has shrunk; give Fusion a moment as well
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+        return response
+
+    async def post(self, path, payload, headers=None, kind=None):
+        return await self._send("POST", path, kind or f"POST {path}",
+                                json=payload, headers=headers)
+
+    async def get(self, path, params=None, headers=None):
+        return await self._send("GET", path, f"GET {path}",
+                                params=params, headers=headers)
+
+    def metrics(self):
+        return {**self.limiter.metrics(), "throttle_retries": self.retried}
+
+    async def create_supplier(self, payload: dict):
+        response = await self.post(SUPPLIER_ENDPOINT, payload)
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+
+        # Bodies are only formatted when the line is actually written
+        if response.status_code >= 400:
+            logging.warning("Fusion create failed: %s %s",
+                            response.status_code, body or response.text)
+        elif (logging.getLogger().isEnabledFor(logging.INFO)
+              and random.random() < settings.fusion_log_sample_rate):
+            logging.info("Fusion create (sampled): %s %s", response.status_code, body)
+
+        # 🔴 IMPORTANT: return TEXT if JSON is empty
+        if not body:
+            return response.status_code, response.text.strip()
+
+        return response.status_code, body
+
+    async def create_suppliers(self, payloads, chunk_size=settings.fusion_batch_size):
+        """
+        Create many suppliers with one batch request per chunk.
+
+        Returns (status, body) per payload, in input order. Fusion runs a
+        batch as one transaction, so a part it rejects rolls back the rest:
+        those are re-sent once as a batch without the rejected parts, and
+        whatever is still unresolved is posted one by one, so a single bad
+        row only costs itself. A part a committed batch returns no result
+        for is reported as a 502 rather than posted again.
+        """
+        chunk_size = max(1, chunk_size)
+        results = []
+        for start in range(0, len(payloads), chunk_size):
+            chunk = payloads[start:start + chunk_size]
+            if len(chunk) == 1:
+                results.append(await self.create_supplier(chunk[0]))
+            else:
+                results.extend(await self._create_batch(chunk))
+        return results
+
+    async def _create_batch(self, chunk):
+        results = [None] * len(chunk)
+        batch = list(range(len(chunk)))
+
+        for _ in range(2):
+            if len(batch) < 2:
+                break
+
+            response = await self.post(
+                BATCH_ENDPOINT,
+                {"parts": [
+                    {"id": str(i), "path": BATCH_SUPPLIER_PATH,
+                     "operation": "create", "payload": chunk[i]}
+                    for i in batch
+                ]},
+                headers={"Content-Type": BATCH_CONTENT_TYPE},
+                kind=f"batch of {len(batch)}"
+            )
+            try:
+                parts = response.json().get("parts", [])
+            except ValueError:
+                parts = []
+            by_id = {part.get("id"): part for part in parts}
+
+            if response.is_success:
+                for i in batch:
+                    part = by_id.get(str(i), {})
+                    if "exception" in part:
+                        continue
+                    if part.get("payload"):
+                        results[i] = (201, part["payload"])
+                    else:
+                        # Committed with the batch for all we know; posting it
+                        # again could create it twice. Left for the caller to
+                        # check (the outbox looks it up before retrying)
+                        results[i] = (502, UNKNOWN_OUTCOME)
+                break
+
+            rejected = {i for i in batch if "exception" in by_id.get(str(i), {})}
+            logging.info("Fusion batch of %d rolled back (%s), %d part(s) rejected",
+                         len(batch), response.status_code, len(rejected))
+            if not rejected:
+                break
+            batch = [i for i in batch if i not in rejected]
+
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = await self._create_part(chunk[i])
+        return results
+
+    async def _create_part(self, payload):
+        # Some parts of the batch may already exist in Fusion, so a part
+        # must not fail the call: wait for admission, report transport
+        # errors as this part's result
+        while True:
+            try:
+                return await self.create_supplier(payload)
+            except UpstreamOverloaded as e:
+                await asyncio.sleep(e.retry_after)
+            except httpx.HTTPError as e:
+                return 502, str(e) or type(e).__name__
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_fusion_client = None
+
+
+def get_fusion_client():
+    global _fusion_client
+    if _fusion_client is None:
+        _fusion_client = FusionClient()
+    return _fusion_client
+
+
+def set_fusion_client(client):
+    global _fusion_client
+    _fusion_client = client
+
+
+async def close_fusion_client():
+    global _fusion_client
+    if _fusion_client is not None:
+        await _fusion_client.aclose()
+        _fusion_client = None
+
+
+async def create_supplier(payload: dict):
+    return await get_fusion_client().create_supplier(payload)
+
 
-def create_supplier(payload: dict):
-    url = f"{FUSION_BASE_URL}{SUPPLIER_ENDPOINT}"
+async def create_suppliers(payloads, chunk_size=settings.fusion_batch_size):
+    return await get_fusion_client().create_suppliers(payloads, chunk_size)
 
-    response = requests.post(
-        url,
-        json=payload,
-        auth=HTTPBasicAuth(FUSION_USERNAME, FUSION_PASSWORD),
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        },
-        timeout=60
-    )
 
-    logging.info("--- FUSION DEBUG START ---")
-    logging.info(f"Status: {response.status_code}")
+def get_fusion_stats():
+    return get_fusion_client().metrics()
 
-    try:
-        body = response.json()
-        logging.info(f"Raw Response: {body}")
-    except ValueError:
-        body = None
-        logging.info(f"Raw Response Text: {response.text}")
 
-    logging.info("--- FUSION DEBUG END ---")
+def _collect_metrics():
+    if _fusion_client is None:
+        return []
+    metrics = _fusion_client.metrics()
+    return [
+        ("supplier_agent_fusion_window", "gauge",
+         "Adaptive Fusion concurrency window", (), {(): metrics["window"]}),
+        ("supplier_agent_fusion_in_flight", "gauge",
+         "Fusion calls in flight", (), {(): metrics["in_flight"]}),
+        ("supplier_agent_fusion_queued", "gauge",
+         "Fusion calls waiting for a slot", (), {(): metrics["queued"]}),
+        ("supplier_agent_fusion_shed_total", "counter",
+         "Fusion calls refused because the queue was full", (), {(): metrics["shed"]})
+    ]
 
-    # 🔴 IMPORTANT: return TEXT if JSON is empty
-    if not body:
-        return response.status_code, response.text.strip()
 
-    return response.status_code, body
+register_collector(_collect_metrics)
@@ -1,17 +1,98 @@
-from config.fusion_settings import FUSION_ALLOWED_VALUES
+from pydantic_core import SchemaValidator
+
+from config.fusion_settings import SUPPLIER_FIELDS
+from lov_cache import lov_cache
+from request_schema import SCHEMA_CONFIG, field_schemas, supplier_schema
+from utils.metrics import stage_seconds
+
+# Longer LOVs (e.g. countries) are not spelled out in the error
+MAX_LISTED_VALUES = 10
+
+
+def lov_message(field, allowed):
+    listed = sorted(allowed) if len(allowed) <= MAX_LISTED_VALUES else None
+
+    def message(value):
+        if listed is not None:
+            return f"{field} must be one of {listed}. Received: {value}"
+        return f"{field} {value} is not a valid Fusion value"
+
+    return message
+
+
+def format_message(message):
+    return lambda value: message
+
+
+FORMAT_MESSAGES = {
+    field: format_message(spec["message"])
+    for field, spec in SUPPLIER_FIELDS.items() if "pattern" in spec
+}
 
-def validate_against_fusion(payload):
-    errors = []
 
-    for field, allowed in FUSION_ALLOWED_VALUES.items():
-        if payload.get(field) and payload[field] not in allowed:
-            errors.append(
-                f"{field} must be one of {allowed}. "
-                f"Received: {payload.get(field)}"
-            )
+class FieldRules:
+    """
+    The supplier field specs compiled into pydantic-core validators: LOV
+    membership for every list the LOV cache holds, plus the formats the
+    specs give. A whole payload is checked in one native call, and only
+    one that fails is gone through field by field for the messages. They
+    are compiled again only when the cache installs a new generation, and
+    a check validates just the fields it is given, so a turn only pays
+    for what it changed.
+    """
 
-    if payload.get("DUNSNumber"):
-        if not payload["DUNSNumber"].isdigit() or len(payload["DUNSNumber"]) != 9:
-            errors.append("DUNSNumber must be exactly 9 digits")
+    def __init__(self, lovs=lov_cache):
+        self._lovs = lovs
+        self._generation = None
+        self._payload = None
+        self._fields = {}
+        self._messages = {}
 
+    def compile(self):
+        values, indexes = self._lovs.values, self._lovs.indexes
+        if values is not self._generation:
+            schemas = field_schemas({field: index.keys() for field, index in indexes.items()})
+            self._payload = SchemaValidator(supplier_schema(schemas))
+            self._fields = {
+                field: SchemaValidator(schema, SCHEMA_CONFIG) for field, schema in schemas.items()
+            }
+            messages = {field: lov_message(field, allowed) for field, allowed in values.items()}
+            messages.update(FORMAT_MESSAGES)
+            self._messages, self._generation = messages, values
+
+    def check(self, payload, fields=None):
+        self.compile()
+        if fields is None:
+            if self._payload.isinstance_python(payload):
+                return {}
+            fields = payload
+
+        errors = {}
+        for field in fields:
+            validator, value = self._fields.get(field), payload.get(field)
+            if validator is None or not value:
+                continue
+            if not validator.isinstance_python(value):
+                errors[field] = self._messages[field](value)
+        return errors
+
+
+field_rules = FieldRules()
+
+
+@stage_seconds.time("validation")
+def validate_fields(payload, fields=None):
+    """{field: error} for `fields` of payload (all of them by default); empty values are skipped."""
+    return field_rules.check(payload, fields)
+
+
+def reject_invalid(session, fields):
+    """Validate fields that just changed and clear the failing ones, so they are asked for again."""
+    errors = validate_fields(session, fields)
+    for field in errors:
+        session[field] = None
     return errors
+
+
+def validate_against_fusion(payload):
+    return list(validate_fields(payload).values())
@@ -1,53 +1,381 @@
-from google import genai
-from config.fusion_settings import GEMINI_API_KEY
+from config.fusion_settings import SUPPLIER_FIELDS, get_settings
+import asyncio
 import json
 import logging
-from google.genai.errors import ClientError
+import threading
+import time
+from utils.extraction_cache import ExtractionCache
+from utils.rule_extractor import extract_with_rules
+from utils.supplier_list import split_entries, chunk_entries
+from utils.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from utils.upstream_guard import UpstreamGuard
+from utils.traffic_recorder import record_upstream
+from utils.metrics import (
+    stage_seconds,
+    upstream_responses,
+    register_collector,
+    cache_metrics
+)
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+settings = get_settings()
+
+# google.genai takes about half a second to import, so it is imported
+# (and the client built) on first use rather than with this module
+_client = None
+_client_lock = threading.Lock()
+
+extraction_cache = ExtractionCache()
+gemini_guard = UpstreamGuard(
+    "gemini",
+    budget_seconds=settings.gemini_latency_budget_seconds,
+    max_in_flight=settings.gemini_max_in_flight,
+    max_queue=settings.gemini_max_queue,
+    breaker=CircuitBreaker(settings.gemini_breaker_failures,
+                           settings.gemini_breaker_reset_seconds),
+    hedge=settings.gemini_hedge,
+    retry_after=settings.shed_retry_after_seconds
+)
 
 SYSTEM_PROMPT = """
 Extract Oracle Fusion Supplier fields from input.
 
 Rules:
 - Extract only explicitly mentioned fields
-- Output JSON only
-- No markdown
+- Omit fields that are not mentioned
 - No guessing
+"""
+
+LIST_PROMPT = """
+Extract every Oracle Fusion supplier listed in the input, one object per
+supplier, in input order.
 
-Fields:
-Supplier
-TaxOrganizationType
-SupplierType
-TaxpayerCountry
-TaxpayerId
-DUNSNumber
+Rules:
+- Extract only explicitly mentioned fields
+- Omit fields that are not mentioned
+- No guessing
 """
 
+# Field -> hint the model sees in the response schema
+EXTRACTION_FIELDS = {
+    field: spec["hint"] for field, spec in SUPPLIER_FIELDS.items() if "hint" in spec
+}
 
-def extract_supplier_payload(user_input: str) -> dict:
-    try:
-        response = client.models.generate_content(
-            model="models/gemini-2.5-flash",
-            contents=f"{SYSTEM_PROMPT}\n\nInput:\n{user_input}"
-        )
+# ---------------- CALL STATS ----------------
+_stats_lock = threading.Lock()
+extraction_stats = {
+    "calls": 0,
+    "errors": 0,
+    "parse_failures": 0,
+    "prompt_tokens": 0,
+    "output_tokens": 0,
+    "thinking_tokens": 0,
+    "latency_ms_total": 0.0
+}
+extraction_fallbacks = 0
+
+
+def _record_call(latency_ms, usage=None, error=False, parse_failure=False):
+    with _stats_lock:
+        extraction_stats["calls"] += 1
+        extraction_stats["latency_ms_total"] += latency_ms
+        extraction_stats["errors"] += int(error)
+        extraction_stats["parse_failures"] += int(parse_failure)
+        if usage is not None:
+            extraction_stats["prompt_tokens"] += usage.prompt_token_count or 0
+            extraction_stats["output_tokens"] += usage.candidates_token_count or 0
+            extraction_stats["thinking_tokens"] += usage.thoughts_token_count or 0
+
+
+def _collect_metrics():
+    cache = extraction_cache.stats()
+    with _stats_lock:
+        stats = dict(extraction_stats)
+    answered = stats["calls"] - stats["errors"] - stats["parse_failures"]
+    return cache_metrics(
+        "extraction",
+        {"hit": cache["hits"], "disk_hit": cache["disk_hits"], "miss": cache["misses"]},
+        cache["hits"] + cache["disk_hits"]
+    ) + [
+        ("supplier_agent_gemini_calls_total", "counter",
+         "Gemini extraction calls by outcome", ("outcome",),
+         {("answered",): answered, ("error",): stats["errors"],
+          ("parse_failure",): stats["parse_failures"]}),
+        ("supplier_agent_gemini_tokens_total", "counter",
+         "Gemini tokens used by extraction calls", ("kind",),
+         {("prompt",): stats["prompt_tokens"], ("output",): stats["output_tokens"],
+          ("thinking",): stats["thinking_tokens"]}),
+        ("supplier_agent_gemini_latency_seconds_total", "counter",
+         "Time spent in Gemini extraction calls", (),
+         {(): stats["latency_ms_total"] / 1000}),
+        ("supplier_agent_gemini_fallbacks_total", "counter",
+         "Extractions answered by the rules alone because Gemini could not answer", (),
+         {(): extraction_fallbacks})
+    ] + _guard_metrics(gemini_guard.metrics())
+
+
+def _guard_metrics(guard):
+    return [
+        ("supplier_agent_gemini_breaker_state", "gauge",
+         "1 for the state the Gemini circuit breaker is in", ("state",),
+         {(state,): int(guard["breaker_state"] == state) for state in (CLOSED, HALF_OPEN, OPEN)}),
+        ("supplier_agent_gemini_breaker_opened_total", "counter",
+         "Times the Gemini circuit breaker opened", (), {(): guard["breaker_opened"]}),
+        ("supplier_agent_gemini_guarded_calls_total", "counter",
+         "Gemini calls through the guard by outcome", ("outcome",),
+         {(outcome,): guard[outcome]
+          for outcome in ("succeeded", "failed", "budget_exceeded", "short_circuited")}),
+        ("supplier_agent_gemini_hedged_total", "counter",
+         "Gemini calls that started a hedged second attempt", (), {(): guard["hedged"]}),
+        ("supplier_agent_gemini_in_flight", "gauge",
+         "Gemini calls in flight", (), {(): guard["in_flight"]}),
+        ("supplier_agent_gemini_queued", "gauge",
+         "Gemini calls waiting for a slot", (), {(): guard["queued"]}),
+        ("supplier_agent_gemini_shed_total", "counter",
+         "Gemini calls refused because the queue was full", (), {(): guard["shed"]})
+    ]
+
+
+register_collector(_collect_metrics)
+
+
+def get_gemini_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(api_key=settings.gemini_api_key)
+    return _client
+
+
+def set_gemini_client(client):
+    global _client
+    _client = client
+
+
+# ---------------- PROMPT ----------------
+def build_config(fields):
+    """Schema-constrained JSON output asking only for `fields`."""
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        system_instruction=SYSTEM_PROMPT,
+        response_mime_type="application/json",
+        response_json_schema={
+            "type": "object",
+            "properties": {
+                f: {"type": "string", "description": EXTRACTION_FIELDS[f]}
+                for f in fields
+            },
+            "additionalProperties": False
+        },
+        # Field lookup needs no reasoning; thinking only adds latency
+        thinking_config=types.ThinkingConfig(thinking_budget=0)
+    )
+
+
+def build_list_config():
+    """Schema-constrained JSON output: {"suppliers": [{field: value}]}."""
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        system_instruction=LIST_PROMPT,
+        response_mime_type="application/json",
+        response_json_schema={
+            "type": "object",
+            "properties": {
+                "suppliers": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            f: {"type": "string", "description": hint}
+                            for f, hint in EXTRACTION_FIELDS.items()
+                        },
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "additionalProperties": False
+        },
+        thinking_config=types.ThinkingConfig(thinking_budget=0)
+    )
+
+
+async def extract_supplier_payload(user_input: str, fields=None,
+                                   budget_seconds=None) -> dict:
+    global extraction_fallbacks
+
+    with stage_seconds.time("extraction"):
+        wanted = [f for f in (fields or EXTRACTION_FIELDS) if f in EXTRACTION_FIELDS]
 
-        if not response or not response.text:
-            return {}
+        # Structured messages are fully handled by the rules, no model call
+        ruled, complete = extract_with_rules(user_input)
+        unresolved = [f for f in wanted if f not in ruled]
+        if complete or not unresolved:
+            return ruled
 
-        text = response.text.strip()
+        extracted = await extract_with_llm(user_input, unresolved, budget_seconds)
 
-        if text.startswith("```"):
-            text = text.replace("```json", "").replace("```", "").strip()
+        # Gemini slow, failing or switched off by the breaker: answer with
+        # what the rules found rather than keep the user waiting
+        if extracted is None:
+            extraction_fallbacks += 1
+            return ruled
 
-        parsed = json.loads(text)
+        # Rule matches are format-checked, so they win over the model
+        extracted.update(ruled)
+        return extracted
 
-        if isinstance(parsed, dict):
-            return parsed
 
+async def extract_supplier_list(user_input: str, budget_seconds=None) -> list:
+    """
+    Every supplier in a pasted list or table, as field dicts in input order.
+
+    Entries are grouped into chunks of about extraction_chunk_chars that
+    are extracted in parallel, so a long paste costs one Gemini round trip
+    rather than one per supplier. A chunk the rules fully handle needs no
+    model call, and one Gemini cannot answer in time falls back to them.
+    """
+    with stage_seconds.time("extraction"):
+        header, entries = split_entries(user_input)
+        chunks = chunk_entries(entries, settings.extraction_chunk_chars)
+        results = await asyncio.gather(*(
+            _extract_chunk(header, chunk, budget_seconds) for chunk in chunks
+        ))
+        suppliers = [s for chunk in results for s in chunk]
+        return suppliers[:settings.max_suppliers_per_message]
+
+
+async def _extract_chunk(header, entries, budget_seconds):
+    global extraction_fallbacks
+
+    ruled = [extract_with_rules(entry) for entry in entries]
+    ruled_suppliers = [fields for fields, _ in ruled if fields]
+    if all(complete for _, complete in ruled):
+        return ruled_suppliers
+
+    # The header goes with every chunk so table columns stay labelled
+    text = "\n".join(([header] if header else []) + entries)
+    extracted = await extract_list_with_llm(text, budget_seconds)
+    if extracted is None:
+        extraction_fallbacks += 1
+    return extracted or ruled_suppliers
+
+
+async def extract_with_llm(user_input: str, fields=None, budget_seconds=None):
+    """The requested fields Gemini found, or None when it could not answer."""
+    fields = list(fields or EXTRACTION_FIELDS)
+
+    def clean(parsed):
+        if not isinstance(parsed, dict):
+            return None
+        return {k: v for k, v in parsed.items() if k in fields and v}
+
+    return await _generate(
+        user_input, fields, build_config(fields), clean, budget_seconds
+    )
+
+
+async def extract_list_with_llm(user_input: str, budget_seconds=None):
+    """The suppliers Gemini found, or None when it could not answer."""
+    def clean(parsed):
+        if not isinstance(parsed, dict) or not isinstance(parsed.get("suppliers"), list):
+            return None
+        suppliers = [
+            {k: v for k, v in item.items() if k in EXTRACTION_FIELDS and v}
+            for item in parsed["suppliers"] if isinstance(item, dict)
+        ]
+        # Cached in the response's own shape, so a recorded hit replays as one
+        return {"suppliers": [s for s in suppliers if s]}
+
+    result = await _generate(
+        user_input, ["suppliers"], build_list_config(), clean, budget_seconds
+    )
+    return result["suppliers"] if result else None
+
+
+def config_fingerprint(config):
+    """
+    The request config as stable JSON: system prompt, response schema
+    (field hints included) and generation settings, so a change to any of
+    them misses the cache, its SQLite tier included.
+    """
+    return json.dumps(config.model_dump(mode="json", exclude_none=True), sort_keys=True)
+
+
+async def _request(user_input, fields, config):
+    """The Gemini call itself: (response, latency in ms). Errors are raised to the guard."""
+    from google.genai.errors import ClientError
+
+    started = time.perf_counter()
+
+    try:
+        response = await get_gemini_client().aio.models.generate_content(
+            model=settings.gemini_model,
+            contents=user_input,
+            config=config
+        )
     except ClientError as e:
+        # Rate limits land here; let the guard count it towards the breaker
         logging.error(str(e))
-    except Exception:
+        _record_call((time.perf_counter() - started) * 1000, error=True)
+        upstream_responses.inc("gemini", str(e.code))
+        record_upstream("gemini", {"contents": user_input, "fields": fields},
+                        e.code, None, time.perf_counter() - started)
+        raise
+    except Exception as e:
         logging.exception("Gemini extraction failed")
+        _record_call((time.perf_counter() - started) * 1000, error=True)
+        upstream_responses.inc("gemini", str(getattr(e, "code", None) or "error"))
+        record_upstream("gemini", {"contents": user_input, "fields": fields},
+                        getattr(e, "code", None), None, time.perf_counter() - started)
+        raise
+
+    upstream_responses.inc("gemini", "200")
+    return response, (time.perf_counter() - started) * 1000
+
+
+async def _generate(user_input, fields, config, clean, budget_seconds=None):
+    """
+    One cached Gemini call. `clean` turns the parsed JSON into the result
+    that is cached and returned, or None when the answer is unusable
+    (not cached, so the next turn asks again). None also when Gemini was
+    slow, failing or switched off by the breaker.
+
+    Only the request goes through gemini_guard: a cache hit takes no
+    admission slot, is served while the breaker is open and adds no
+    latency sample for the hedging p95.
+    """
+    cache_key = ExtractionCache.make_key(user_input, settings.gemini_model,
+                                         config_fingerprint(config))
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        record_upstream("gemini", {"contents": user_input, "fields": fields},
+                        200, json.dumps(cached), cached=True)
+        return cached
+
+    answered = await gemini_guard.run(
+        lambda: _request(user_input, fields, config), budget_seconds
+    )
+    if answered is None:
+        return None
+
+    response, latency_ms = answered
+    usage = getattr(response, "usage_metadata", None)
+    record_upstream("gemini", {"contents": user_input, "fields": fields},
+                    200, response.text, latency_ms / 1000)
+
+    try:
+        parsed = json.loads(response.text or "{}")
+    except ValueError:
+        logging.warning("Gemini returned non-JSON output")
+        _record_call(latency_ms, usage, parse_failure=True)
+        return None
+
+    _record_call(latency_ms, usage)
 
-    return {}
+    result = clean(parsed)
+    if result is not None:
+        extraction_cache.put(cache_key, result)
+    return result
@@ -0,0 +1,155 @@
+from utils.session_manager import init_session, get_missing_fields, reset_session
+from fusion_validator import reject_invalid
+from utils.normalizer import normalize_lov_fields
+from supplier_index import supplier_index, describe_duplicates
+from supplier_outbox import supplier_outbox
+from supplier_prechecks import supplier_prechecks
+from config.fusion_settings import (
+    FIELD_QUESTIONS,
+    REQUIRED_FIELDS,
+    DEFAULT_VALUES
+)
+
+
+def new_session():
+    return {"state": "INIT"}
+
+
+async def handle_message(active_session, user_input, session_id):
+    # -------------------------------------------------
+    # INIT
+    # -------------------------------------------------
+    if active_session["state"] == "INIT":
+        if "create supplier" not in user_input.lower():
+            return {"reply": 'Type "create supplier" to begin.'}
+
+        session = init_session()
+        # A default Fusion no longer lists is asked for like any other field
+        reject_invalid(session, DEFAULT_VALUES)
+
+        reset_session(
+            active_session,
+            state="COLLECTING",
+            session=session,
+            current_field=REQUIRED_FIELDS[0]
+        )
+
+        return {"reply": FIELD_QUESTIONS[REQUIRED_FIELDS[0]]}
+
+    # -------------------------------------------------
+    # LOAD STATE
+    # -------------------------------------------------
+    state = active_session["state"]
+    session = active_session["session"]
+    current_field = active_session.get("current_field")
+
+    # -------------------------------------------------
+    # COLLECTING MODE
+    # -------------------------------------------------
+    if state == "COLLECTING":
+
+        # Save value for current field and check it straight away, so a
+        # bad answer is re-asked now rather than after the last question
+        if current_field:
+            session[current_field] = user_input
+            normalize_lov_fields(session, [current_field])
+
+            errors = reject_invalid(session, [current_field])
+            if errors:
+                return {
+                    "reply": f"{errors[current_field]}\n{FIELD_QUESTIONS[current_field]}"
+                }
+
+        # Find next missing field
+        missing = get_missing_fields(session)
+
+        if missing:
+            next_field = missing[0]
+            active_session["current_field"] = next_field
+            return {"reply": FIELD_QUESTIONS[next_field]}
+
+        # All fields collected, each validated as it came in (defaults
+        # when the session started) → CONFIRM
+        summary = "\n".join(
+            f"{f}: {session.get(f)}" for f in REQUIRED_FIELDS
+        )
+
+        active_session["state"] = "CONFIRM"
+
+        duplicates = supplier_index.find_duplicates(session)
+        active_session["duplicates"] = [d["SupplierId"] for d in duplicates]
+        if duplicates:
+            summary += "\n\n" + describe_duplicates(duplicates)
+
+        return {
+            "reply": (
+                "Please confirm supplier creation:\n\n"
+                + summary +
+                "\n\nType Yes, Edit, or Cancel."
+            ),
+            "duplicates": duplicates
+        }
+
+    # -------------------------------------------------
+    # CONFIRM MODE
+    # -------------------------------------------------
+    if state == "CONFIRM":
+
+        if user_input.lower() == "yes":
+            # The Fusion lookups started while the user was typing may
+            # have found a supplier the summary did not mention
+            new = await supplier_prechecks.new_duplicates(session_id, active_session)
+            if new:
+                return {
+                    "reply": (
+                        describe_duplicates(new)
+                        + "\n\nType Yes to create it anyway, Edit, or Cancel."
+                    ),
+                    "duplicates": new
+                }
+
+            # Fusion can take a minute; queue it and let the client poll
+            job = await supplier_outbox.enqueue(session_id, session)
+            reset_session(active_session)
+
+            return {
+                "reply": "Supplier creation submitted.",
+                "jobId": job["jobId"],
+                "status": job["status"]
+            }
+
+        if user_input.lower() == "edit":
+            active_session["state"] = "EDIT"
+            return {
+                "reply": (
+                    "Which field do you want to edit?\n" +
+                    "\n".join(
+                        f"{i+1}. {f}"
+                        for i, f in enumerate(REQUIRED_FIELDS)
+                    )
+                )
+            }
+
+        if user_input.lower() == "cancel":
+            reset_session(active_session)
+            return {"reply": "Supplier creation cancelled."}
+
+        return {"reply": "Please respond with Yes, Edit, or Cancel."}
+
+    # -------------------------------------------------
+    # EDIT MODE
+    # -------------------------------------------------
+    if state == "EDIT":
+        field_map = {
+            str(i + 1): f
+            for i, f in enumerate(REQUIRED_FIELDS)
+        }
+
+        if user_input in field_map:
+            field = field_map[user_input]
+            supplier_prechecks.invalidate(session_id, active_session, field)
+            active_session["state"] = "COLLECTING"
+            active_session["current_field"] = field
+            return {"reply": FIELD_QUESTIONS[field]}
+
+        return {"reply": "Invalid choice. Enter a valid field number."}
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+
+from config.fusion_settings import (
+    FUSION_ALLOWED_VALUES,
+    LOV_ALIASES,
+    LOOKUPS_ENDPOINT,
+    TERRITORIES_ENDPOINT,
+    LOV_LOOKUP_TYPES,
+    get_settings
+)
+from fusion_client import get_fusion_client
+from utils.adaptive_limiter import request_flow
+from utils.lov_index import LovIndex
+
+settings = get_settings()
+
+
+def lov_sources():
+    """field -> (resource path, query, code attribute, value attribute)"""
+    sources = {
+        field: (LOOKUPS_ENDPOINT, f"LookupType='{lookup_type}'", "LookupCode", "Meaning")
+        for field, lookup_type in LOV_LOOKUP_TYPES.items()
+    }
+    sources["TaxpayerCountry"] = (
+        TERRITORIES_ENDPOINT, None, "TerritoryCode", "TerritoryShortName"
+    )
+    return sources
+
+
+def build_fuzzy_index(field, pairs):
+    entries = [(meaning, meaning) for _, meaning in pairs]
+    entries += [(code, meaning) for code, meaning in pairs if code]
+
+    allowed = {meaning for _, meaning in pairs}
+    entries += [
+        (alias, canonical)
+        for alias, canonical in LOV_ALIASES.get(field, {}).items()
+        if canonical in allowed
+    ]
+    return LovIndex(entries)
+
+
+def build_index(values):
+    """value -> canonical, keyed case-insensitively on both code and meaning"""
+    index = {}
+    for code, meaning in values:
+        index[meaning.lower()] = meaning
+        if code:
+            index.setdefault(code.lower(), meaning)
+    return index
+
+
+class LovCache:
+    """
+    Allowed Fusion values, bulk-loaded from the Fusion lookup resources.
+
+    Each field gets a frozenset of canonical values, a lowercase
+    code/meaning index and a fuzzy LovIndex (which also knows the
+    LOV_ALIASES spellings), swapped in whole so readers never see a half
+    loaded list. A background task refreshes every `refresh_seconds`,
+    sending If-None-Match so unchanged lookups cost one small 304. The
+    last good load is written to `snapshot_path`, which also lets the
+    agent start (or run entirely) without reaching Fusion.
+    """
+
+    def __init__(self, client_factory=get_fusion_client,
+                 refresh_seconds=settings.lov_refresh_seconds,
+                 snapshot_path=settings.lov_snapshot_path,
+                 page_size=settings.lov_page_size):
+        self._client_factory = client_factory
+        self._refresh_seconds = refresh_seconds
+        self._snapshot_path = snapshot_path
+        self._page_size = page_size
+        self._task = None
+
+        # field -> [(code, meaning)], etag
+        self._raw = {}
+        self._etags = {}
+
+        self.values = {
+            field: frozenset(allowed)
+            for field, allowed in FUSION_ALLOWED_VALUES.items()
+        }
+        self.indexes = {
+            field: build_index((None, v) for v in allowed)
+            for field, allowed in FUSION_ALLOWED_VALUES.items()
+        }
+
+        # Fields without a Fusion list yet still resolve their aliases
+        default_pairs = {
+            field: [(None, v) for v in sorted(set(aliases.values()))]
+            for field, aliases in LOV_ALIASES.items()
+        }
+        default_pairs.update({
+            field: [(None, v) for v in allowed]
+            for field, allowed in FUSION_ALLOWED_VALUES.items()
+        })
+        self.fuzzy = {
+            field: build_fuzzy_index(field, pairs)
+            for field, pairs in default_pairs.items()
+        }
+        self.loaded_from = "defaults"
+
+    # ---------------- LOOKUPS ----------------
+    def allowed(self, field):
+        return self.values.get(field)
+
+    def resolve(self, field, value):
+        index = self.indexes.get(field)
+        if index is None or not isinstance(value, str):
+            return None
+        return index.get(value.strip().lower())
+
+    def match(self, field, value):
+        """Fuzzy lookup: (canonical, confidence) or (None, 0.0)."""
+        index = self.fuzzy.get(field)
+        if index is None:
+            return None, 0.0
+        return index.match(value)
+
+    def _install(self, raw, source):
+        values, indexes = dict(self.values), dict(self.indexes)
+        fuzzy = dict(self.fuzzy)
+        for field, pairs in raw.items():
+            if not pairs:
+                continue
+            values[field] = frozenset(meaning for _, meaning in pairs)
+            indexes[field] = build_index(pairs)
+            fuzzy[field] = build_fuzzy_index(field, pairs)
+
+        # Readers only ever see a complete generation
+        self.values, self.indexes, self.fuzzy = values, indexes, fuzzy
+        self.loaded_from = source
+
+    # ---------------- SNAPSHOT ----------------
+    def load_snapshot(self, path=None):
+        path = path or self._snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+
+        with open(path) as f:
+            snapshot = json.load(f)
+
+        self._raw = {
+            field: [tuple(pair) for pair in pairs]
+            for field, pairs in snapshot.get("values", {}).items()
+        }
+        self._etags = snapshot.get("etags", {})
+        self._install(self._raw, "snapshot")
+        return True
+
+    def save_snapshot(self, path=None):
+        path = path or self._snapshot_path
+        if not path:
+            return
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"values": self._raw, "etags": self._etags}, f)
+        os.replace(tmp_path, path)
+
+    # ---------------- FUSION ----------------
+    async def _fetch(self, field, path, query, code_key, value_key):
+        client = self._client_factory()
+        pairs, offset, etag = [], 0, None
+
+        while True:
+            params = {
+                "onlyData": "true",
+                "fields": f"{code_key},{value_key}",
+                "limit": self._page_size,
+                "offset": offset
+            }
+            if query:
+                params["q"] = query
+
+            # Conditional on the first page only: if it is unchanged the
+            # lookup has not been edited since our last load
+            headers = {}
+            if offset == 0 and field in self._etags and field in self._raw:
+                headers["If-None-Match"] = self._etags[field]
+
+            response = await client.get(path, params=params, headers=headers)
+
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+
+            if offset == 0:
+                etag = response.headers.get("ETag")
+
+            body = response.json()
+            items = body.get("items", [])
+            pairs.extend(
+                (item.get(code_key), item[value_key])
+                for item in items if item.get(value_key)
+            )
+
+            if not body.get("hasMore") or not items:
+                # Only remember the ETag once every page has arrived
+                if etag:
+                    self._etags[field] = etag
+                return pairs
+            offset += len(items)
+
+    async def refresh(self):
+        changed = False
+
+        for field, source in lov_sources().items():
+            try:
+                pairs = await self._fetch(field, *source)
+            except Exception as e:
+                logging.warning("LOV refresh for %s failed: %s", field, e)
+                continue
+
+            if pairs is not None:
+                self._raw[field] = pairs
+                changed = True
+
+        if changed:
+            self._install(self._raw, "fusion")
+            self.save_snapshot()
+
+        return changed
+
+    async def _refresh_forever(self):
+        request_flow.set("lov-refresh")
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._refresh_seconds)
+
+    def start(self, background=bool(settings.fusion_base_url)):
+        try:
+            self.load_snapshot()
+        except (OSError, ValueError):
+            logging.exception("Ignoring unreadable LOV snapshot")
+
+        if background and self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+lov_cache = LovCache()
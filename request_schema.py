@@ -1,8 +1,53 @@
-SUPPLIER_REQUIRED_FIELDS = [
-    "Supplier",
-    "TaxOrganizationType",
-    "SupplierType",
-    "BusinessRelationship",
-    "TaxpayerCountry",
-    "TaxpayerId"
-]
+from pydantic_core import core_schema
+
+from config.fusion_settings import SUPPLIER_FIELDS, REQUIRED_FIELDS
+
+# Derived from the field specs, so it can no longer drift from them
+SUPPLIER_REQUIRED_FIELDS = REQUIRED_FIELDS
+
+
+def lov_schema(keys):
+    """A value Fusion lists: matched on its lowercase code or meaning, like LovCache.resolve."""
+    return core_schema.chain_schema([
+        core_schema.str_schema(strip_whitespace=True, to_lower=True),
+        core_schema.literal_schema(sorted(keys))
+    ])
+
+
+def pattern_schema(pattern):
+    return core_schema.str_schema(pattern=f"^(?:{pattern})$")
+
+
+def field_schemas(lov_keys):
+    """
+    pydantic-core schema per checked field: LOV membership for each field
+    in `lov_keys` (field -> lowercase codes and meanings) and the format of
+    every field with a pattern.
+    """
+    schemas = {field: lov_schema(keys) for field, keys in lov_keys.items()}
+    schemas.update({
+        field: pattern_schema(spec["pattern"])
+        for field, spec in SUPPLIER_FIELDS.items() if "pattern" in spec
+    })
+    return schemas
+
+
+# JSONL rows may carry DUNS numbers and taxpayer ids as numbers
+SCHEMA_CONFIG = core_schema.CoreConfig(coerce_numbers_to_str=True)
+
+
+def supplier_schema(schemas):
+    """
+    A supplier payload whose fields each match `schemas`; other fields,
+    and absent or None ones, pass. Whether required fields are filled is
+    checked separately.
+    """
+    return core_schema.typed_dict_schema(
+        {
+            field: core_schema.typed_dict_field(
+                core_schema.nullable_schema(schema), required=False
+            )
+            for field, schema in schemas.items()
+        },
+        config=SCHEMA_CONFIG
+    )
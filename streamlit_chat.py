@@ -1,10 +1,62 @@
+import json
+import time
+
 import streamlit as st
 import requests
 
 API_URL = "http://localhost:8003/supplier-agent"
+STREAM_URL = API_URL + "/stream"
+JOBS_URL = API_URL.rsplit("/", 1)[0] + "/supplier-jobs/"
+JOB_POLL_SECONDS = 1
+JOB_WAIT_SECONDS = 120
 
 st.set_page_config(page_title="Supplier Agent Chat", layout="centered")
 
+
+def call_agent(payload, progress):
+    """
+    Send one turn, reporting intermediate stages to `progress(event, data)`
+    as the server streams them. Falls back to the plain endpoint when the
+    server has no streaming variant.
+    """
+    response = requests.post(STREAM_URL, json=payload, stream=True, timeout=60)
+
+    if response.status_code == 404:
+        response = requests.post(API_URL, json=payload, timeout=60)
+        return response.json() if response.text else {}
+
+    if not response.headers.get("content-type", "").startswith("text/event-stream"):
+        # Auth / validation errors come back as plain JSON
+        return response.json() if response.text else {}
+
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+            if event == "reply":
+                return data
+            if event == "error":
+                return {"reply": f"⚠️ {data.get('detail')}"}
+            progress(event, data)
+
+    return {}
+
+
+def describe_progress(event, data):
+    if event == "ack":
+        return "_Working on it..._"
+    if event == "fields":
+        found = ", ".join(f"{k}: {v}" for k, v in data["extracted"].items())
+        return f"_Picked up {found or 'no new details'}_"
+    if event == "suppliers":
+        return f"_Picked up {len(data['extracted'])} suppliers, {data['ready']} ready_"
+    if event == "validation":
+        return "_Checked against Fusion_" if data["valid"] else "_Found an issue..._"
+    return None
+
+
 st.title("🤖 Supplier Creation Agent")
 st.write("Type create supplier to start the process.")
 
@@ -51,34 +103,76 @@ if user_input:
     if st.session_state.sessionId:
         payload["sessionId"] = st.session_state.sessionId
 
-    try:
-        response = requests.post(API_URL, json=payload, timeout=60)
-        data = response.json() if response.text else {}
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
 
+        def show_progress(event, data):
+            text = describe_progress(event, data)
+            if text:
+                placeholder.markdown(text)
 
-    except Exception as e:
-        with st.chat_message("assistant"):
-            st.error(f"API Error: {e}")
-        st.stop()
+        try:
+            data = call_agent(payload, show_progress)
 
-    # -----------------------------
-    # Store sessionId
-    # -----------------------------
-    if "sessionId" in data:
-        st.session_state.sessionId = data["sessionId"]
+        except Exception as e:
+            placeholder.error(f"API Error: {e}")
+            st.stop()
 
-    # -----------------------------
-    # Show Bot Reply
-    # -----------------------------
-    reply = data.get("reply", "No response")
+        # -----------------------------
+        # Store sessionId
+        # -----------------------------
+        if "sessionId" in data:
+            st.session_state.sessionId = data["sessionId"]
+
+        # -----------------------------
+        # Show Bot Reply
+        # -----------------------------
+        reply = data.get("reply", "No response")
+        placeholder.markdown(reply)
 
     st.session_state.messages.append({
         "role": "assistant",
         "content": reply
     })
 
-    with st.chat_message("assistant"):
-        st.markdown(reply)
+    # -----------------------------
+    # Creation runs in the background; poll the job
+    # -----------------------------
+    if "jobId" in data:
+        deadline = time.time() + JOB_WAIT_SECONDS
+
+        with st.spinner("Creating supplier in Fusion..."):
+            while data.get("status") not in ("CREATED", "FAILED"):
+                if time.time() > deadline:
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+                try:
+                    job = requests.get(JOBS_URL + data["jobId"], timeout=10)
+                    data.update(job.json())
+                except Exception:
+                    # Transient; the job is durable, keep polling
+                    continue
+
+        if data.get("status") == "FAILED":
+            failed_msg = f"❌ Supplier creation failed: {data.get('error')}"
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": failed_msg
+            })
+            with st.chat_message("assistant"):
+                st.error(failed_msg)
+
+        elif data.get("status") != "CREATED":
+            pending_msg = (
+                f"⏳ Still creating (job `{data['jobId']}`). "
+                "It will finish in the background."
+            )
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": pending_msg
+            })
+            with st.chat_message("assistant"):
+                st.markdown(pending_msg)
 
     # -----------------------------
     # Final success response
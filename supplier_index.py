@@ -0,0 +1,403 @@
+import asyncio
+import logging
+import re
+import sqlite3
+
+from config.fusion_settings import SUPPLIER_ENDPOINT, get_settings
+from fusion_client import get_fusion_client
+from utils.adaptive_limiter import request_flow
+from utils.bloom_filter import BloomFilter
+from utils.metrics import register_collector, cache_metrics
+from utils.lov_index import normalize_key
+
+settings = get_settings()
+
+SYNC_FIELDS = "SupplierId,SupplierNumber,Supplier,DUNSNumber,TaxpayerId,LastUpdateDate"
+
+# Trailing words that do not make two supplier names different
+NAME_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "lp", "llp"
+}
+
+_NON_DIGITS = re.compile(r"\D")
+
+# payload field -> (key prefix, indexed column)
+KEY_FIELDS = {
+    "Supplier": ("name", "name_key"),
+    "DUNSNumber": ("duns", "duns"),
+    "TaxpayerId": ("tax", "taxpayer_id")
+}
+
+
+def name_key(name):
+    words = normalize_key(name).split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    return " ".join(words) or None
+
+
+def digits_key(value):
+    return _NON_DIGITS.sub("", value) or None
+
+
+def supplier_keys(record):
+    """(name_key, duns, taxpayer_id) for a supplier payload or Fusion row."""
+    def text(field):
+        value = record.get(field)
+        return str(value) if value not in (None, "") else None
+
+    name, duns, tax = text("Supplier"), text("DUNSNumber"), text("TaxpayerId")
+    return (
+        name_key(name) if name else None,
+        digits_key(duns) if duns else None,
+        digits_key(tax) if tax else None
+    )
+
+
+def describe_duplicates(matches):
+    return "\n".join(
+        f"Possible duplicate: {m['Supplier']} (SupplierNumber {m['SupplierNumber']})"
+        f" has the same {', '.join(m['fields'])}."
+        for m in matches
+    )
+
+
+class SupplierIndex:
+    """
+    Local index of the suppliers already in Fusion, for duplicate checks.
+
+    Rows live in a SQLite table indexed on normalized name, DUNS number and
+    taxpayer id, so a million suppliers cost disk rather than memory. An
+    in-memory Bloom filter over the same keys answers the common case (a
+    genuinely new supplier) without touching SQLite; only possible hits
+    are confirmed with an indexed query.
+
+    The first sync pages through every supplier; later ones only ask
+    Fusion for rows whose LastUpdateDate is at or after the last one seen.
+    """
+
+    def __init__(self, path=settings.supplier_index_path, client_factory=get_fusion_client,
+                 page_size=settings.supplier_index_page_size,
+                 sync_seconds=settings.supplier_index_sync_seconds,
+                 capacity=settings.supplier_index_capacity):
+        self._path = path
+        self._client_factory = client_factory
+        self._page_size = page_size
+        self._sync_seconds = sync_seconds
+        self._capacity = capacity
+        self._conn = None
+        self._bloom = None
+        self._bloom_keys = 0
+        self._task = None
+
+        self.stats = {
+            "lookups": 0,
+            "bloom_negatives": 0,
+            "bloom_false_positives": 0,
+            "duplicates": 0,
+            "synced_rows": 0,
+            "syncs": 0
+        }
+
+    # ---------------- STORAGE ----------------
+    def open(self):
+        if self._conn is not None:
+            return
+
+        conn = sqlite3.connect(self._path or ":memory:", check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS suppliers (
+                supplier_id INTEGER PRIMARY KEY,
+                supplier_number TEXT,
+                supplier TEXT,
+                name_key TEXT,
+                duns TEXT,
+                taxpayer_id TEXT,
+                last_update TEXT
+            );
+            CREATE INDEX IF NOT EXISTS suppliers_name ON suppliers (name_key);
+            CREATE INDEX IF NOT EXISTS suppliers_duns ON suppliers (duns);
+            CREATE INDEX IF NOT EXISTS suppliers_tax ON suppliers (taxpayer_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        """)
+        self._conn = conn
+        self._load_bloom()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def __len__(self):
+        self.open()
+        return self._conn.execute("SELECT COUNT(*) FROM suppliers").fetchone()[0]
+
+    @property
+    def watermark(self):
+        self.open()
+        return self._meta("watermark")
+
+    # ---------------- BLOOM ----------------
+    def _load_bloom(self):
+        data, size, hashes = (
+            self._meta("bloom"), self._meta("bloom_bits"), self._meta("bloom_hashes")
+        )
+        if data is None:
+            self._rebuild_bloom(self._capacity)
+            return
+
+        self._bloom = BloomFilter.from_bytes(data, size, hashes)
+        self._bloom_keys = self._meta("bloom_keys") or 0
+        # Suppliers remembered since the last sync are not in the saved
+        # filter yet (they have no LastUpdateDate until Fusion sends one)
+        rows = self._conn.execute(
+            "SELECT name_key, duns, taxpayer_id FROM suppliers WHERE last_update IS NULL"
+        )
+        for keys in rows:
+            self._add_keys(keys)
+
+    def _rebuild_bloom(self, capacity):
+        self._capacity = capacity
+        self._bloom, self._bloom_keys = BloomFilter(capacity), 0
+        rows = self._conn.execute("SELECT name_key, duns, taxpayer_id FROM suppliers")
+        for keys in rows:
+            self._add_keys(keys)
+
+    def _add_keys(self, keys):
+        for (prefix, _), key in zip(KEY_FIELDS.values(), keys):
+            if key and self._bloom.add(f"{prefix}:{key}"):
+                self._bloom_keys += 1
+
+    def _save_bloom(self):
+        # Renames leave their old keys behind, so grow (and drop them)
+        # before the false positive rate drifts past the sized one
+        if self._bloom_keys > self._capacity:
+            self._rebuild_bloom(self._capacity)
+            if self._bloom_keys > self._capacity * 0.75:
+                self._rebuild_bloom(self._capacity * 2)
+
+        with self._conn:
+            self._set_meta("bloom", self._bloom.to_bytes())
+            self._set_meta("bloom_bits", self._bloom.size)
+            self._set_meta("bloom_hashes", self._bloom.hashes)
+            self._set_meta("bloom_keys", self._bloom_keys)
+
+    # ---------------- LOOKUP ----------------
+    def find_duplicates(self, payload):
+        """
+        Existing suppliers sharing the payload's name, DUNS number or
+        taxpayer id: [{"SupplierId", "SupplierNumber", "Supplier", "fields"}].
+        """
+        try:
+            self.open()
+        except sqlite3.Error:
+            return []
+        self.stats["lookups"] += 1
+
+        matches = {}
+        probed = False
+        for (field, (prefix, column)), key in zip(KEY_FIELDS.items(), supplier_keys(payload)):
+            if not key or f"{prefix}:{key}" not in self._bloom:
+                continue
+
+            probed = True
+            rows = self._conn.execute(
+                f"SELECT supplier_id, supplier_number, supplier FROM suppliers"
+                f" WHERE {column} = ? LIMIT 5",
+                (key,)
+            )
+            for supplier_id, number, name in rows:
+                match = matches.setdefault(supplier_id, {
+                    "SupplierId": supplier_id,
+                    "SupplierNumber": number,
+                    "Supplier": name,
+                    "fields": []
+                })
+                match["fields"].append(field)
+
+        if matches:
+            self.stats["duplicates"] += 1
+        elif probed:
+            self.stats["bloom_false_positives"] += 1
+        else:
+            self.stats["bloom_negatives"] += 1
+        return list(matches.values())
+
+    def upsert(self, records, save_bloom=True):
+        """Insert or refresh Fusion supplier rows; returns the newest LastUpdateDate."""
+        self.open()
+        rows, newest = [], None
+        for record in records:
+            if record.get("SupplierId") is None:
+                continue
+            keys = supplier_keys(record)
+            updated = record.get("LastUpdateDate")
+            rows.append((
+                record["SupplierId"], record.get("SupplierNumber"),
+                record.get("Supplier"), *keys, updated
+            ))
+            self._add_keys(keys)
+            if updated and (newest is None or updated > newest):
+                newest = updated
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO suppliers (supplier_id, supplier_number, supplier,"
+                " name_key, duns, taxpayer_id, last_update)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (supplier_id) DO UPDATE SET"
+                " supplier_number = excluded.supplier_number,"
+                " supplier = excluded.supplier, name_key = excluded.name_key,"
+                " duns = excluded.duns, taxpayer_id = excluded.taxpayer_id,"
+                " last_update = COALESCE(excluded.last_update, last_update)",
+                rows
+            )
+        if save_bloom:
+            self._save_bloom()
+        return newest
+
+    def remember(self, payload, response):
+        """Index a supplier we just created, ahead of the next sync."""
+        if not isinstance(response, dict) or response.get("SupplierId") is None:
+            return
+        self.upsert([{
+            **payload,
+            "SupplierId": response["SupplierId"],
+            "SupplierNumber": response.get("SupplierNumber"),
+            "LastUpdateDate": None
+        }], save_bloom=False)
+
+    # ---------------- FUSION ----------------
+    async def _get_page(self, params):
+        response = await self._client_factory().get(
+            SUPPLIER_ENDPOINT,
+            params={"onlyData": "true", "fields": SYNC_FIELDS, **params}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def lookup(self, field, value):
+        """
+        Ask Fusion for suppliers holding this DUNS number or taxpayer id and
+        index them, so ones created since the last sync are caught too;
+        returns how many Fusion has.
+        """
+        escaped = str(value).replace("'", "''")
+        body = await self._get_page({"q": f"{field}='{escaped}'", "limit": 5})
+        items = body.get("items", [])
+        if items:
+            self.upsert(items, save_bloom=False)
+        return len(items)
+
+    async def _latest_update(self):
+        body = await self._get_page({"orderBy": "LastUpdateDate:desc", "limit": 1})
+        items = body.get("items", [])
+        return items[0].get("LastUpdateDate") if items else None
+
+    async def sync(self, full=None):
+        """
+        Pull new and changed suppliers from Fusion; returns rows received.
+
+        A full sync pages by SupplierId (stable while others are edited)
+        and takes its watermark from the newest LastUpdateDate *before*
+        paging starts, so edits made during the sweep are picked up by
+        the next incremental sync.
+        """
+        self.open()
+        watermark = self.watermark
+        full = watermark is None if full is None else full
+
+        if full:
+            newest = await self._latest_update()
+            params = {"orderBy": "SupplierId"}
+        else:
+            newest = watermark
+            # >= so rows sharing the watermark's timestamp are not lost;
+            # re-applying the ones we already have is harmless
+            params = {
+                "orderBy": "LastUpdateDate",
+                "q": f"LastUpdateDate >= '{watermark}'"
+            }
+
+        received, offset = 0, 0
+        while True:
+            body = await self._get_page({
+                **params, "limit": self._page_size, "offset": offset
+            })
+            items = body.get("items", [])
+            page_newest = self.upsert(items, save_bloom=False)
+            if not full and page_newest and page_newest > newest:
+                newest = page_newest
+            received += len(items)
+
+            if not body.get("hasMore") or not items:
+                break
+            offset += len(items)
+
+        self._save_bloom()
+        if newest:
+            with self._conn:
+                self._set_meta("watermark", newest)
+
+        self.stats["syncs"] += 1
+        self.stats["synced_rows"] += received
+        return received
+
+    async def _sync_forever(self):
+        request_flow.set("supplier-sync")
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logging.warning("Supplier index sync failed: %s", e)
+            await asyncio.sleep(self._sync_seconds)
+
+    def start(self, background=bool(settings.fusion_base_url)):
+        try:
+            self.open()
+        except sqlite3.Error:
+            logging.exception("Supplier index unavailable; duplicate checks disabled")
+            return
+
+        if background and self._task is None:
+            self._task = asyncio.create_task(self._sync_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+supplier_index = SupplierIndex()
+
+
+def _collect_metrics():
+    # The bloom filter is the cache here: a negative answers the lookup
+    # without touching SQLite
+    stats = supplier_index.stats
+    return cache_metrics(
+        "duplicate_index",
+        {
+            "bloom_negative": stats["bloom_negatives"],
+            "bloom_false_positive": stats["bloom_false_positives"],
+            "duplicate": stats["duplicates"]
+        },
+        stats["bloom_negatives"]
+    )
+
+
+register_collector(_collect_metrics)
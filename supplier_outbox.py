@@ -0,0 +1,353 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException
+
+from config.fusion_settings import SUPPLIER_ENDPOINT, get_settings
+from fusion_client import create_supplier, create_suppliers, get_fusion_client
+from supplier_index import supplier_index, supplier_keys
+from utils.auth import authenticate_user
+from utils.adaptive_limiter import request_flow
+from utils.upstream_guard import UpstreamOverloaded
+
+settings = get_settings()
+
+router = APIRouter()
+
+PENDING, RUNNING, CREATED, FAILED = "PENDING", "RUNNING", "CREATED", "FAILED"
+
+
+def idempotency_key(session_id, payload):
+    """Same session confirming the same supplier -> same job, however often it retries."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{session_id}\0{body}".encode()).hexdigest()
+
+
+def retryable(status):
+    return status == 429 or status >= 500
+
+
+class SupplierOutbox:
+    """
+    Durable queue of supplier creations.
+
+    enqueue() commits the payload to a SQLite WAL file and returns a job
+    id straight away; worker tasks drain it with exponential backoff. The
+    idempotency key makes a retried confirmation return the existing job
+    instead of queueing a second supplier, unless that job FAILED.
+
+    A claimed job is leased rather than locked: `run_at` holds the lease
+    expiry while it is RUNNING, so a job whose worker died is simply
+    claimed again once the lease runs out. Before re-posting such a job
+    we ask Fusion whether the earlier attempt got through.
+
+    When jobs back up, a worker claims up to `batch_size` at once and
+    creates them with a single Fusion batch request.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path=settings.outbox_path, workers=settings.outbox_workers,
+                 max_attempts=settings.outbox_max_attempts,
+                 backoff_seconds=settings.outbox_backoff_seconds,
+                 max_backoff_seconds=settings.outbox_max_backoff_seconds,
+                 lease_seconds=settings.outbox_lease_seconds,
+                 poll_seconds=settings.outbox_poll_seconds,
+                 retention_seconds=settings.outbox_retention_seconds,
+                 batch_size=settings.fusion_batch_size):
+        self._path = path
+        self._workers = workers
+        self._max_attempts = max_attempts
+        self._backoff = backoff_seconds
+        self._max_backoff = max_backoff_seconds
+        self._lease = lease_seconds
+        self._poll = poll_seconds
+        self._retention = retention_seconds
+        self._batch_size = batch_size
+        self._local = threading.local()
+        self._tasks = []
+        self._wake = None
+        self._stopping = False
+        self._enqueued = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(
+                self._path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A queued job is a promise to the user; survive power loss too
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " idempotency_key TEXT NOT NULL UNIQUE,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " run_at REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " result TEXT"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---------------- QUEUE ----------------
+    async def enqueue(self, session_id, payload):
+        """
+        Queue a creation; returns the job. A repeated key returns the job
+        already queued, running or created; a FAILED one is replaced by a
+        fresh job, so the user can try again. The write waits for an
+        fsync, so it runs on a thread rather than hold up the event loop.
+        """
+        job = await asyncio.to_thread(self._insert, session_id, payload)
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    def _insert(self, session_id, payload):
+        key = idempotency_key(session_id, payload)
+        now = time.time()
+        conn = self._conn()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # A new id rather than a reset row, so a worker still holding
+            # the old job cannot settle the new one
+            conn.execute(
+                "DELETE FROM jobs WHERE idempotency_key = ? AND status = ?", (key, FAILED)
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, idempotency_key, payload, status, run_at,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (idempotency_key) DO NOTHING",
+                (uuid.uuid4().hex, key, json.dumps(payload), PENDING, now, now, now)
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE idempotency_key = ?", (key,)
+            ).fetchone()
+
+        self._enqueued += 1
+        if self._enqueued % self.PURGE_EVERY == 0:
+            self.purge_finished()
+
+        return self.get(row[0])
+
+    def get(self, job_id):
+        row = self._conn().execute(
+            "SELECT id, status, attempts, result FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, attempts, result = row
+        job = {"jobId": job_id, "status": status, "attempts": attempts}
+        job.update(json.loads(result) if result else {})
+        return job
+
+    def claim(self, limit=1):
+        """Lease up to `limit` due jobs: [(job_id, payload, attempt)]."""
+        now = time.time()
+        rows = self._conn().execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1,"
+            " run_at = ?, updated_at = ?"
+            " WHERE id IN ("
+            "  SELECT id FROM jobs WHERE status IN (?, ?) AND run_at <= ?"
+            "  ORDER BY run_at LIMIT ?)"
+            " RETURNING id, payload, attempts",
+            (RUNNING, now + self._lease, now, PENDING, RUNNING, now, limit)
+        ).fetchall()
+        return [(job_id, json.loads(payload), attempt) for job_id, payload, attempt in rows]
+
+    def _finish(self, job_id, attempt, status, result, run_at=None):
+        # Fenced on the attempt so a worker whose lease ran out cannot
+        # overwrite the outcome of the one that took the job over
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, run_at = ?, updated_at = ?"
+            " WHERE id = ? AND status = ? AND attempts = ?",
+            (status, json.dumps(result), run_at or now, now, job_id, RUNNING, attempt)
+        )
+
+    def _retry_or_fail(self, job_id, attempt, result, delay=None):
+        if attempt >= self._max_attempts:
+            self._finish(job_id, attempt, FAILED, result)
+            return
+
+        if delay is None:
+            delay = min(self._max_backoff, self._backoff * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+        self._finish(job_id, attempt, PENDING, result, run_at=time.time() + delay)
+
+    def purge_finished(self):
+        self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (CREATED, FAILED, time.time() - self._retention)
+        )
+
+    def counts(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows.fetchall())
+
+    # ---------------- WORKER ----------------
+    async def _find_existing(self, payload):
+        """
+        The supplier Fusion already holds under this name, if any, whose
+        DUNS number and taxpayer id agree with the payload's wherever both
+        have one, so a namesake is not taken for the supplier being created.
+        """
+        name = payload.get("Supplier")
+        if not name:
+            return None
+
+        escaped = name.replace("'", "''")
+        response = await get_fusion_client().get(
+            SUPPLIER_ENDPOINT,
+            params={
+                "onlyData": "true",
+                "fields": "SupplierId,SupplierNumber,DUNSNumber,TaxpayerId",
+                "q": f"Supplier='{escaped}'"
+            }
+        )
+        response.raise_for_status()
+
+        _, duns, taxpayer_id = supplier_keys(payload)
+        for item in response.json().get("items", []):
+            _, item_duns, item_taxpayer_id = supplier_keys(item)
+            if all(
+                not ours or not theirs or ours == theirs
+                for ours, theirs in ((duns, item_duns), (taxpayer_id, item_taxpayer_id))
+            ):
+                return item
+        return None
+
+    def _call_failed(self, jobs, error):
+        delay = error.retry_after if isinstance(error, UpstreamOverloaded) else None
+        for job_id, _, attempt in jobs:
+            self._retry_or_fail(
+                job_id, attempt, {"error": str(error) or type(error).__name__}, delay
+            )
+
+    def _settle(self, job_id, payload, attempt, status, response):
+        if status == 201:
+            supplier_index.remember(payload, response)
+            self._finish(job_id, attempt, CREATED, {
+                "SupplierId": response.get("SupplierId"),
+                "SupplierNumber": response.get("SupplierNumber")
+            })
+            return
+
+        result = {"httpStatus": status, "error": response}
+        if retryable(status):
+            self._retry_or_fail(job_id, attempt, result)
+        else:
+            self._finish(job_id, attempt, FAILED, result)
+
+    async def run_job(self, job_id, payload, attempt):
+        try:
+            # A supplier under this name whose ids agree with ours means an
+            # earlier attempt succeeded before we lost track of it
+            existing = await self._find_existing(payload) if attempt > 1 else None
+            if existing:
+                status, response = 201, existing
+            else:
+                status, response = await create_supplier(payload)
+        except (UpstreamOverloaded, httpx.HTTPError) as e:
+            self._call_failed([(job_id, payload, attempt)], e)
+            return
+
+        self._settle(job_id, payload, attempt, status, response)
+
+    async def run_jobs(self, jobs):
+        """First attempts share one Fusion batch; retries go one by one."""
+        first = [job for job in jobs if job[2] == 1]
+        retries = [self.run_job(*job) for job in jobs if job[2] > 1]
+
+        if first:
+            try:
+                outcomes = await create_suppliers(
+                    [payload for _, payload, _ in first], self._batch_size
+                )
+            except (UpstreamOverloaded, httpx.HTTPError) as e:
+                self._call_failed(first, e)
+            else:
+                for job, (status, response) in zip(first, outcomes):
+                    self._settle(*job, status, response)
+
+        await asyncio.gather(*retries)
+
+    async def _work(self):
+        request_flow.set("outbox")
+        # On Python 3.11 wait_for() swallows a cancel that lands just as
+        # the wake event fires, so the flag is what reliably ends the loop
+        while not self._stopping:
+            # Cleared before looking, so an enqueue in between still wakes us
+            self._wake.clear()
+            try:
+                jobs = self.claim(self._batch_size)
+            except sqlite3.Error:
+                logging.exception("Outbox claim failed")
+                jobs = []
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._poll)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.run_jobs(jobs)
+            except Exception:
+                # Leave the leases to expire; the jobs will be picked up again
+                logging.exception("Outbox jobs %s crashed", [job[0] for job in jobs])
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self._workers)
+        ]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+supplier_outbox = SupplierOutbox()
+
+
+# =========================================================
+# JOB STATUS ENDPOINT
+# =========================================================
+@router.get("/supplier-jobs/{job_id}")
+async def supplier_job_status(job_id: str,
+                              username: str = Depends(authenticate_user)):
+    job = supplier_outbox.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job
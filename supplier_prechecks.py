@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+
+from config.fusion_settings import get_settings
+from supplier_index import supplier_index
+from utils.metrics import register_collector
+
+settings = get_settings()
+
+# Identifiers worth asking Fusion about as soon as they are known
+PRECHECK_FIELDS = ("DUNSNumber", "TaxpayerId")
+
+
+class SupplierPrechecks:
+    """
+    Speculative Fusion duplicate lookups that overlap with the conversation.
+
+    After every turn, sync() starts a background lookup for each key
+    identifier in the session that has not been checked at its current
+    value, and attaches finished ones to the session as
+    active_session["prechecks"] = {field: value checked}. Fusion's rows go
+    into the supplier index, so find_duplicates() also sees suppliers
+    created since its last sync. A lookup whose field changes, or is
+    picked for editing, is cancelled and its result dropped.
+
+    Lookups live in this process; a turn served by another worker just
+    starts them again.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, enabled=settings.precheck_enabled,
+                 wait_seconds=settings.precheck_wait_seconds,
+                 ttl_seconds=settings.session_ttl_seconds, index=supplier_index):
+        self.enabled = enabled
+        self._wait = wait_seconds
+        self._ttl = ttl_seconds
+        self._index = index
+        # session id -> {field: (value, task, started)}; no task while the
+        # field is held by invalidate()
+        self._checks = {}
+        self._syncs = 0
+
+        self.stats = {"started": 0, "attached": 0, "cancelled": 0, "failed": 0}
+
+    async def _lookup(self, field, value):
+        try:
+            return await self._index.lookup(field, value)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.warning("Supplier precheck of %s failed: %s", field, e)
+            return None
+
+    def _start(self, field, value):
+        self.stats["started"] += 1
+        return asyncio.create_task(self._lookup(field, value))
+
+    def _cancel(self, task):
+        if not task.done():
+            task.cancel()
+            self.stats["cancelled"] += 1
+
+    def sync(self, session_id, active_session):
+        """Start, cancel and attach lookups to match the session's current values."""
+        if not self.enabled:
+            return
+
+        session = active_session.get("session") or {}
+        checked = active_session.get("prechecks", {})
+        checks = self._checks.pop(session_id, {})
+
+        for field in PRECHECK_FIELDS:
+            value = session.get(field) or None
+            if checked.get(field, value) != value:
+                del checked[field]
+
+            entry = checks.pop(field, None)
+            if entry and entry[1] is None:
+                # Held by invalidate() for the turn that picked the field
+                continue
+            if entry and entry[0] != value:
+                self._cancel(entry[1])
+                entry = None
+            if entry and entry[1].done():
+                # A failed lookup is simply tried again next turn
+                if not entry[1].cancelled() and entry[1].result() is not None:
+                    checked[field] = value
+                    self.stats["attached"] += 1
+                entry = None
+
+            if entry:
+                checks[field] = entry
+            elif value and field not in checked:
+                checks[field] = (value, self._start(field, value), time.monotonic())
+
+        if checks:
+            self._checks[session_id] = checks
+        if checked:
+            active_session["prechecks"] = checked
+        else:
+            active_session.pop("prechecks", None)
+
+        self._syncs += 1
+        if self._syncs % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def invalidate(self, session_id, active_session, field):
+        """
+        The user is about to change `field`: drop its lookup and result, and
+        do not look the old value up again at the end of this turn.
+        """
+        if not self.enabled:
+            return
+        checks = self._checks.setdefault(session_id, {})
+        entry = checks.get(field)
+        if entry and entry[1]:
+            self._cancel(entry[1])
+        value = (active_session.get("session") or {}).get(field) or None
+        checks[field] = (value, None, time.monotonic())
+        active_session.get("prechecks", {}).pop(field, None)
+
+    async def wait(self, session_id, active_session):
+        """Give lookups still in flight up to wait_seconds, then attach what finished."""
+        if not self.enabled:
+            return
+        self.sync(session_id, active_session)
+        pending = [task for _, task, _ in self._checks.get(session_id, {}).values() if task]
+        if pending:
+            await asyncio.wait(pending, timeout=self._wait)
+            self.sync(session_id, active_session)
+
+    async def new_duplicates(self, session_id, active_session):
+        """
+        Possible duplicates that were not in the confirmation summary
+        (active_session["duplicates"]), once lookups still in flight have
+        had their chance to finish.
+        """
+        await self.wait(session_id, active_session)
+        shown = set(active_session.get("duplicates", []))
+        duplicates = self._index.find_duplicates(active_session["session"])
+        active_session["duplicates"] = [d["SupplierId"] for d in duplicates]
+        return [d for d in duplicates if d["SupplierId"] not in shown]
+
+    def purge(self):
+        """Forget lookups of sessions that went quiet longer than the session TTL."""
+        cutoff = time.monotonic() - self._ttl
+        for session_id, checks in list(self._checks.items()):
+            if all(started < cutoff for _, _, started in checks.values()):
+                for _, task, _ in checks.values():
+                    if task:
+                        self._cancel(task)
+                del self._checks[session_id]
+
+    async def stop(self):
+        tasks = [
+            task for checks in self._checks.values() for _, task, _ in checks.values() if task
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._checks.clear()
+
+
+supplier_prechecks = SupplierPrechecks()
+
+
+def _collect_metrics():
+    return [
+        ("supplier_agent_prechecks_total", "counter",
+         "Speculative Fusion duplicate lookups by outcome", ("outcome",),
+         {(outcome,): count for outcome, count in supplier_prechecks.stats.items()})
+    ]
+
+
+register_collector(_collect_metrics)
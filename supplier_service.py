@@ -1,36 +1,22 @@
 #the script that calls the fusion rest api
-import requests
-from config.fusion_settings import (
-    FUSION_BASE_URL,
-    SUPPLIER_ENDPOINT,
-    FUSION_USERNAME,
-    FUSION_PASSWORD
-)
-from utils.auth import get_basic_auth_header
+from fusion_client import get_fusion_client
 
-def create_supplier(payload: dict):
-    url = FUSION_BASE_URL + SUPPLIER_ENDPOINT
 
-    headers = {
-        "Authorization": get_basic_auth_header(
-            FUSION_USERNAME, FUSION_PASSWORD
-        ),
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
+async def create_supplier(payload: dict):
+    status, body = await get_fusion_client().create_supplier(payload)
 
-    if response.status_code == 201:
-        data = response.json()
+    if status == 201:
+        # A created supplier can come back with an empty or non-JSON body,
+        # which the client returns as text
+        created = body if isinstance(body, dict) else {}
         return {
             "status": "SUCCESS",
-            "supplierId": data.get("SupplierId"),
-            "supplierNumber": data.get("SupplierNumber")
+            "supplierId": created.get("SupplierId"),
+            "supplierNumber": created.get("SupplierNumber")
         }
 
     return {
         "status": "FAILED",
-        "httpStatus": response.status_code,
-        "error": response.text
+        "httpStatus": status,
+        "error": body
     }
@@ -0,0 +1,81 @@
+"""
+Tests run with no Fusion or Gemini configured and every database,
+snapshot and profile in a temporary directory. The agent's modules read
+the settings when imported, so they are set before anything else.
+"""
+import asyncio
+import os
+import tempfile
+
+_data = tempfile.mkdtemp(prefix="supplier-agent-tests-")
+os.environ.update({
+    "GEMINI_API_KEY": "test",
+    "AGENT_USERNAME": "test",
+    "AGENT_PASSWORD": "test",
+    "FUSION_BASE_URL": "",
+    "EXTRACTION_CACHE_PATH": "",
+    "TRAFFIC_RECORD_PATH": "",
+    # Empty keeps the duplicate index in memory
+    "SUPPLIER_INDEX_PATH": "",
+    "OUTBOX_PATH": os.path.join(_data, "supplier_outbox.db"),
+    "LOV_SNAPSHOT_PATH": os.path.join(_data, "lov_snapshot.json"),
+    "PROFILE_DIR": os.path.join(_data, "profiles"),
+    "SESSION_BACKEND": "memory",
+    "SESSION_DB_PATH": os.path.join(_data, "sessions.db")
+})
+
+import pytest  # noqa: E402
+
+import gemini_agent  # noqa: E402
+from benchmarks.fake_fusion import FakeFusion  # noqa: E402
+from benchmarks.fake_gemini import FakeGemini  # noqa: E402
+from fusion_client import FusionClient, set_fusion_client  # noqa: E402
+from supplier_index import supplier_index  # noqa: E402
+from utils.extraction_cache import ExtractionCache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    """A fresh, empty in-memory duplicate index for every test."""
+    supplier_index.close()
+    yield supplier_index
+    supplier_index.close()
+
+
+class FakeClock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def fusion():
+    """A FakeFusion holding no suppliers, installed as the Fusion client."""
+    fake = FakeFusion(0)
+    client = FusionClient(base_url="https://fusion.test", transport=fake.transport())
+    set_fusion_client(client)
+    yield fake
+    set_fusion_client(None)
+    asyncio.run(client.aclose())
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """A FakeGemini installed as the Gemini client, behind an empty cache."""
+    fake = FakeGemini()
+    monkeypatch.setattr(gemini_agent, "extraction_cache", ExtractionCache(path=None))
+    gemini_agent.set_gemini_client(fake)
+    yield fake
+    gemini_agent.set_gemini_client(None)
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from config.fusion_settings import SUPPLIER_ENDPOINT
+from fusion_client import FusionClient
+from utils.adaptive_limiter import AdaptiveLimiter, parse_retry_after, request_flow
+from utils.upstream_guard import UpstreamOverloaded
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    later = format_datetime(now + timedelta(seconds=30), usegmt=True)
+
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(later, now=now.timestamp()) == 30.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_full_window_grows_on_fast_successes(clock):
+    limiter = AdaptiveLimiter("test", initial=2, clock=clock)
+
+    async def scenario():
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.acquire()
+            limiter.release(0.01)
+            limiter.release(0.01)
+    asyncio.run(scenario())
+
+    assert limiter.limit > 3
+    assert limiter.in_flight == 0
+
+
+def test_throttles_from_one_overload_halve_the_window_once(clock):
+    limiter = AdaptiveLimiter("test", initial=16, clock=clock)
+
+    async def scenario():
+        await limiter.acquire()
+        limiter.release(0.5)
+        for _ in range(3):
+            await limiter.acquire()
+            limiter.release(throttled=True)
+    asyncio.run(scenario())
+
+    assert limiter.limit == 8
+    assert limiter.counters["throttled"] == 3
+    assert limiter.counters["decreases"] == 1
+
+
+def test_retry_after_pauses_dispatch(clock):
+    limiter = AdaptiveLimiter("test", initial=4, clock=clock)
+
+    async def scenario():
+        await limiter.acquire()
+        limiter.release(throttled=True, retry_after=5)
+        assert limiter.metrics()["paused_seconds"] == 5
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        clock.advance(5)
+        limiter._resume_dispatch()
+        await waiter
+    asyncio.run(scenario())
+
+    assert limiter.in_flight == 1
+
+
+def test_waiting_flows_are_served_round_robin(clock):
+    limiter = AdaptiveLimiter("test", initial=1, clock=clock)
+    order = []
+
+    async def call(flow, name):
+        request_flow.set(flow)
+        await limiter.acquire()
+        order.append(name)
+        limiter.release()
+
+    async def scenario():
+        await limiter.acquire()
+        calls = [asyncio.create_task(call("bulk", f"bulk {i}")) for i in range(3)]
+        calls.append(asyncio.create_task(call("session", "session")))
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*calls)
+    asyncio.run(scenario())
+
+    assert order == ["bulk 0", "session", "bulk 1", "bulk 2"]
+
+
+def test_full_queue_is_shed(clock):
+    limiter = AdaptiveLimiter("test", initial=1, max_queue=0, retry_after=2, clock=clock)
+
+    async def scenario():
+        await limiter.acquire()
+        limiter.check()
+    with pytest.raises(UpstreamOverloaded):
+        asyncio.run(scenario())
+
+    assert limiter.counters["shed"] == 1
+
+
+def test_client_resends_after_retry_after():
+    answers = [
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(201, json={"SupplierId": 1, "SupplierNumber": "100001"})
+    ]
+    client = FusionClient(base_url="https://fusion.test",
+                          transport=httpx.MockTransport(lambda request: answers.pop(0)))
+
+    async def main():
+        try:
+            return await client.create_supplier({"Supplier": "Acme Inc"})
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main())[0] == 201
+    assert client.metrics()["throttle_retries"] == 1
+    assert client.metrics()["throttled"] == 1
+
+
+def test_bare_503_on_a_post_is_not_resent():
+    requests = []
+
+    def unavailable(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    client = FusionClient(base_url="https://fusion.test",
+                          transport=httpx.MockTransport(unavailable))
+
+    async def main():
+        try:
+            return await client.post(SUPPLIER_ENDPOINT, {"Supplier": "Acme Inc"})
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main()).status_code == 503
+    assert len(requests) == 1
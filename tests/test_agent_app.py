@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_app import create_app
+from config.fusion_settings import AppSettings, get_settings, use_settings
+
+
+@pytest.fixture
+def restore_settings():
+    settings = get_settings()
+    yield
+    use_settings(settings)
+
+
+def test_each_mode_serves_its_own_flow():
+    guided = TestClient(create_app("guided"))
+    assisted = TestClient(create_app("assisted"))
+
+    assert guided.get("/").json()["mode"] == "guided"
+    assert assisted.get("/").json()["mode"] == "assisted"
+
+    guided.auth = assisted.auth = ("test", "test")
+    assert guided.post("/supplier-agent/stream", json={"message": "hello"}).status_code == 404
+    assert assisted.post("/supplier-agent/stream", json={"message": "hello"}).status_code == 200
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        create_app("chatty")
+
+
+def test_settings_are_parsed_by_type():
+    settings = AppSettings.from_env({
+        "OUTBOX_WORKERS": "2",
+        "FUSION_READ_TIMEOUT": "12.5",
+        "GEMINI_HEDGE": "True",
+        "FUSION_BASE_URL": "https://fusion.test"
+    })
+
+    assert settings.outbox_workers == 2
+    assert settings.fusion_read_timeout == 12.5
+    assert settings.gemini_hedge is True
+    assert settings.precheck_enabled is True
+    assert AppSettings.from_env({}).precheck_enabled is False
+    assert AppSettings.from_env({}).outbox_workers == AppSettings().outbox_workers
+
+
+def test_app_uses_the_settings_it_is_given(restore_settings):
+    settings = replace(get_settings(), agent_username="ops", agent_password="secret")
+
+    with TestClient(create_app("assisted", settings)) as client:
+        assert client.get("/").json()["mode"] == "assisted"
+        assert client.get("/metrics", auth=("test", "test")).status_code == 401
+        assert client.get("/metrics", auth=("ops", "secret")).status_code == 200
+
+
+def test_importing_the_app_reads_no_dotenv():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    check = "import sys, agent_app; sys.exit('dotenv' in sys.modules)"
+
+    assert subprocess.run([sys.executable, "-c", check], cwd=root).returncode == 0
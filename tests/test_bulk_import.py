@@ -0,0 +1,237 @@
+import asyncio
+import json
+from functools import partial
+
+from fastapi.testclient import TestClient
+
+from bulk_import import check_rows, iter_csv_rows, iter_jsonl_rows, iter_lines, run_bulk
+
+HEADER = "Supplier,TaxpayerCountry,TaxpayerId,DUNSNumber\n"
+
+
+async def chunks(data, size=7):
+    """The body in small pieces, so records straddle chunk boundaries."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def parse(parser, text, max_chars=None):
+    limit = {} if max_chars is None else {"max_chars": max_chars}
+
+    async def collect():
+        lines = iter_lines(chunks(text.encode()), **limit)
+        return [row async for row in parser(lines)]
+    return asyncio.run(collect())
+
+
+def bulk(parser, text, **kwargs):
+    async def collect():
+        rows = parser(iter_lines(chunks(text.encode())))
+        return [json.loads(line) async for line in run_bulk(rows, **kwargs)]
+    *results, summary = asyncio.run(collect())
+    return sorted(results, key=lambda r: r["row"]), summary["summary"]
+
+
+def test_lines_survive_split_multibyte_characters():
+    text = "Zürich AG\r\nMüller GmbH"
+
+    async def collect():
+        return [line async for line in iter_lines(chunks(("﻿" + text).encode(), size=1))]
+
+    assert asyncio.run(collect()) == ["Zürich AG", "Müller GmbH"]
+
+
+def test_csv_quoted_fields_keep_commas_quotes_and_newlines():
+    rows = parse(iter_csv_rows, HEADER + (
+        '"Acme, Inc",US,12-3456789,123456789\r\n'
+        '"The ""Best"" Co",US,12-3456780,123456780\n'
+        '"Two\nLines Ltd",US,12-3456781,123456781\n'
+    ))
+
+    assert [row["Supplier"] for _, row in rows] == [
+        "Acme, Inc", 'The "Best" Co', "Two\nLines Ltd"
+    ]
+    assert [n for n, _ in rows] == [1, 2, 3]
+
+
+def test_csv_blank_lines_and_empty_values_are_skipped():
+    [(number, row)] = parse(iter_csv_rows, HEADER + "\n,,,\nAcme Inc,US,,123456789\n")
+
+    assert number == 1
+    assert row == {"Supplier": "Acme Inc", "TaxpayerCountry": "US", "DUNSNumber": "123456789"}
+
+
+def test_csv_unterminated_quote_is_an_error_row():
+    rows = parse(iter_csv_rows, HEADER + 'Acme Inc,US,12-3456789,123456789\n"Open,US\n')
+
+    assert rows[0][1]["Supplier"] == "Acme Inc"
+    number, error = rows[1]
+    assert number == 2
+    assert isinstance(error, ValueError)
+
+
+def test_over_long_line_is_an_error_row():
+    rows = parse(iter_jsonl_rows, '{"Supplier": "' + "x" * 100 + '"}\n{"Supplier": "Acme Inc"}\n',
+                 max_chars=50)
+
+    assert isinstance(rows[0][1], ValueError)
+    assert rows[1] == (2, {"Supplier": "Acme Inc"})
+
+
+def test_body_without_newlines_is_one_error_row():
+    [(number, error)] = parse(iter_jsonl_rows, "x" * 1000, max_chars=50)
+
+    assert number == 1
+    assert str(error) == "Line longer than 50 characters"
+
+
+def test_csv_unterminated_quote_does_not_swallow_the_upload():
+    rows = parse(partial(iter_csv_rows, max_chars=50), HEADER + '"Open,US\n' + "more text\n" * 10 + "Acme Inc,US\n",
+                 max_chars=50)
+
+    number, error = rows[0]
+    assert number == 1
+    assert "unterminated quote" in str(error)
+    assert rows[-1][1] == {"Supplier": "Acme Inc", "TaxpayerCountry": "US"}
+
+
+def test_unmatched_lov_value_is_reported_as_invalid_not_missing():
+    [result] = check_rows([(1, {
+        "Supplier": "Acme Inc", "SupplierType": "Goods", "TaxpayerCountry": "US",
+        "TaxpayerId": "12-3456789", "DUNSNumber": "123456789"
+    })])[0]
+
+    assert result["errors"] == ["SupplierType must be one of ['Services']. Received: Goods"]
+
+
+def test_bulk_reports_invalid_rows_and_creates_the_rest(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + (
+        "Acme Inc,US,12-3456789,123456789\n"
+        "No Duns Inc,US,12-3456780,\n"
+        "Short Duns Inc,US,12-3456781,12345\n"
+        "Nowhere Inc,Atlantis,12-3456782,123456782\n"
+        '"Open,US\n'
+    ))
+
+    assert [r["status"] for r in results] == [
+        "CREATED", "INVALID", "INVALID", "INVALID", "INVALID"
+    ]
+    assert results[0]["SupplierId"] == 1
+    assert results[1]["errors"] == ["DUNSNumber is required"]
+    assert results[2]["errors"] == ["DUNSNumber must be exactly 9 digits"]
+    assert results[3]["errors"] == [
+        "TaxpayerCountry must be one of ['United States']. Received: Atlantis"
+    ]
+    assert summary == {
+        "rows": 5, "CREATED": 1, "DUPLICATE": 0, "INVALID": 4, "FAILED": 0
+    }
+    assert fusion.suppliers == 1
+
+
+def test_valid_rows_share_batch_requests(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + "".join(
+        f"Supplier {n} Co,US,12-345678{n},12345678{n}\n" for n in range(5)
+    ), batch_size=2)
+
+    assert [r["status"] for r in results] == ["CREATED"] * 5
+    assert fusion.requests == 3
+
+
+def test_repeat_within_a_batch_is_a_duplicate(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + (
+        "Acme Inc,US,12-3456789,123456789\n"
+        "Other Inc,US,12-3456780,123456789\n"
+    ))
+
+    assert results[1] == {"row": 2, "status": "DUPLICATE", "duplicateOfRow": 1}
+    assert fusion.suppliers == 1
+
+
+def test_rerun_upload_reports_duplicates(fusion):
+    upload = HEADER + "Acme Inc,US,12-3456789,123456789\n"
+    bulk(iter_csv_rows, upload)
+
+    results, summary = bulk(iter_csv_rows, upload.replace("Acme Inc", "ACME LLC"))
+
+    assert results[0]["status"] == "DUPLICATE"
+    assert results[0]["duplicates"][0]["fields"] == ["Supplier", "DUNSNumber", "TaxpayerId"]
+    assert summary["DUPLICATE"] == 1
+    assert fusion.suppliers == 1
+
+
+def test_bulk_row_fusion_rejects_is_failed(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + "FAIL Inc,US,12-3456789,123456789\n")
+
+    assert results == [{
+        "row": 1, "status": "FAILED", "httpStatus": 400,
+        "error": {"title": "Bad Request", "detail": "Supplier name is invalid."}
+    }]
+    assert summary["FAILED"] == 1
+
+
+def test_bulk_jsonl_bad_lines_are_invalid(fusion):
+    results, summary = bulk(iter_jsonl_rows, "\n".join([
+        json.dumps({"Supplier": "Acme Inc", "TaxpayerCountry": "US",
+                    "TaxpayerId": "12-3456789", "DUNSNumber": 123456789}),
+        "{not json",
+        "[1, 2]"
+    ]) + "\n")
+
+    assert [r["status"] for r in results] == ["CREATED", "INVALID", "INVALID"]
+    assert results[2]["errors"] == ["Row must be a JSON object"]
+    assert summary["CREATED"] == 1
+
+
+def test_bulk_endpoint_streams_ndjson(fusion):
+    import app
+
+    client = TestClient(app.app)
+    client.auth = ("test", "test")
+    response = client.post(
+        "/suppliers/bulk",
+        content=HEADER + "Acme Inc,US,12-3456789,123456789\n",
+        headers={"Content-Type": "text/csv"}
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert lines[0]["status"] == "CREATED"
+    assert lines[-1]["summary"]["CREATED"] == 1
+
+
+def test_bulk_endpoint_needs_a_known_format():
+    import app
+
+    client = TestClient(app.app)
+    client.auth = ("test", "test")
+    response = client.post("/suppliers/bulk", content="x", headers={"Content-Type": "text/plain"})
+
+    assert response.status_code == 415
+
+
+def test_bulk_repeated_row_in_a_later_batch_is_a_duplicate(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + (
+        "Acme Inc,US,12-3456789,123456789\n"
+        "Other Inc,US,12-3456780,123456780\n"
+        "Third Inc,US,12-3456781,123456781\n"
+        "Acme Inc,US,12-3456782,123456782\n"
+    ), batch_size=2)
+
+    assert [r["status"] for r in results] == ["CREATED", "CREATED", "CREATED", "DUPLICATE"]
+    assert results[3]["duplicateOfRow"] == 1
+    assert fusion.suppliers == 3
+
+
+def test_repeat_of_a_created_row_is_found_in_the_index(fusion):
+    results, summary = bulk(iter_csv_rows, HEADER + (
+        "Acme Inc,US,12-3456789,123456789\n"
+        "Other Inc,US,12-3456780,123456780\n"
+        "Third Inc,US,12-3456781,123456781\n"
+        "Acme Inc,US,12-3456782,123456782\n"
+    ), batch_size=1, concurrency=1)
+
+    # Row 1's batch had finished, so its keys were let go and the index
+    # it was remembered in caught the repeat
+    assert results[3]["status"] == "DUPLICATE"
+    assert results[3]["duplicates"][0]["SupplierId"] == results[0]["SupplierId"]
+    assert fusion.suppliers == 3
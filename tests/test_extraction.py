@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import gemini_agent
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import render_metrics
+from utils.upstream_guard import UpstreamGuard
+
+MESSAGE = "Please add the supplier we met at the trade fair, Acme from Ohio"
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    guard = UpstreamGuard("gemini", budget_seconds=5, max_in_flight=4, max_queue=4,
+                          breaker=CircuitBreaker(1, 60))
+    monkeypatch.setattr(gemini_agent, "gemini_guard", guard)
+    return guard
+
+
+def extract(message, fields=None):
+    return asyncio.run(gemini_agent.extract_supplier_payload(message, fields))
+
+
+def test_model_fills_what_the_rules_cannot(gemini, guard):
+    gemini.expect(MESSAGE, {"Supplier": "Acme", "TaxpayerCountry": "United States"})
+
+    assert extract(MESSAGE) == {"Supplier": "Acme", "TaxpayerCountry": "United States"}
+    assert gemini.calls == 1
+
+
+def test_structured_message_needs_no_model_call(gemini, guard):
+    message = "Supplier: Acme Inc\nDUNS: 123456789\nTaxpayer ID: 12-3456789\nCountry: US"
+
+    assert extract(message) == {
+        "Supplier": "Acme Inc", "DUNSNumber": "123456789",
+        "TaxpayerId": "12-3456789", "TaxpayerCountry": "United States"
+    }
+    assert gemini.calls == 0
+
+
+def test_failing_model_falls_back_to_the_rules(gemini, guard):
+    gemini.error_rate = 1.0
+
+    assert extract(MESSAGE + ", DUNS 123456789") == {"DUNSNumber": "123456789"}
+    assert guard.metrics()["failed"] == 1
+
+
+def test_cache_hit_is_served_while_the_breaker_is_open(gemini, guard):
+    gemini.expect(MESSAGE, {"Supplier": "Acme"})
+    assert extract(MESSAGE, ["Supplier"]) == {"Supplier": "Acme"}
+
+    # One failure opens this breaker
+    gemini.error_rate = 1.0
+    assert extract(MESSAGE + " again", ["Supplier"]) == {}
+    calls = guard.metrics()["calls"]
+
+    assert extract(MESSAGE, ["Supplier"]) == {"Supplier": "Acme"}
+    assert guard.metrics()["calls"] == calls
+    assert gemini.calls == 2
+
+
+def test_breaker_and_fallbacks_are_published(gemini, guard):
+    def fallbacks():
+        [line] = [line for line in render_metrics().splitlines()
+                  if line.startswith("supplier_agent_gemini_fallbacks_total ")]
+        return float(line.split()[1])
+
+    before = fallbacks()
+    gemini.error_rate = 1.0
+    extract(MESSAGE)
+
+    lines = render_metrics().splitlines()
+    assert 'supplier_agent_gemini_breaker_state{state="open"} 1' in lines
+    assert 'supplier_agent_gemini_breaker_state{state="closed"} 0' in lines
+    assert 'supplier_agent_gemini_guarded_calls_total{outcome="failed"} 1' in lines
+    assert 'supplier_agent_gemini_guarded_calls_total{outcome="budget_exceeded"} 0' in lines
+    assert fallbacks() == before + 1
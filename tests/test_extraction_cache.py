@@ -0,0 +1,88 @@
+import asyncio
+
+import gemini_agent
+from utils.extraction_cache import ExtractionCache
+
+make_key = ExtractionCache.make_key
+
+
+def test_key_ignores_spacing_and_unicode_form_but_not_case():
+    key = make_key("Acme  Inc,\nDUNS 123456789", "model", "prompt")
+
+    assert make_key(" Acme Inc, DUNS １２３456789 ", "model", "prompt") == key
+    assert make_key("ACME Inc, DUNS 123456789", "model", "prompt") != key
+
+
+def test_key_changes_with_model_and_prompt():
+    key = make_key("Acme Inc", "model", "prompt")
+
+    assert make_key("Acme Inc", "other model", "prompt") != key
+    assert make_key("Acme Inc", "model", "other prompt") != key
+
+
+def test_hit_returns_a_copy():
+    cache = ExtractionCache(path=None)
+    cache.put("k", {"Supplier": "Acme"})
+
+    cache.get("k")["Supplier"] = "Changed"
+
+    assert cache.get("k") == {"Supplier": "Acme"}
+    assert cache.stats()["hits"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ExtractionCache(max_entries=2, path=None)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+
+
+def test_expired_entry_is_a_miss():
+    cache = ExtractionCache(ttl_seconds=-1, path=None)
+    cache.put("k", {"n": 1})
+
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "extractions.db")
+    ExtractionCache(path=path).put("k", {"Supplier": "Acme"})
+
+    cache = ExtractionCache(path=path)
+    assert cache.get("k") == {"Supplier": "Acme"}
+    assert cache.get("k") == {"Supplier": "Acme"}
+    assert (cache.stats()["disk_hits"], cache.stats()["hits"]) == (1, 1)
+
+
+def test_repeated_message_is_extracted_once(gemini):
+    gemini.expect("Acme Inc", {"Supplier": "Acme"})
+
+    for message in ("Acme Inc", "  Acme   Inc "):
+        extracted = asyncio.run(gemini_agent.extract_supplier_payload(message))
+        assert extracted == {"Supplier": "Acme"}
+    assert gemini.calls == 1
+
+
+def test_key_covers_the_whole_request_config(monkeypatch):
+    fingerprint = gemini_agent.config_fingerprint(gemini_agent.build_config(["Supplier"]))
+
+    monkeypatch.setitem(gemini_agent.EXTRACTION_FIELDS, "Supplier", "The legal name")
+    changed = gemini_agent.config_fingerprint(gemini_agent.build_config(["Supplier"]))
+
+    assert changed != fingerprint
+    assert make_key("Acme Inc", "model", changed) != make_key("Acme Inc", "model", fingerprint)
+
+
+def test_forked_worker_opens_its_own_connection(tmp_path):
+    cache = ExtractionCache(path=str(tmp_path / "extractions.db"))
+    parent = cache._conn()
+
+    # As seen from a child forked after the parent connected
+    cache._local.pid = -1
+
+    assert cache._conn() is not parent
@@ -0,0 +1,73 @@
+import pytest
+
+from bulk_import import check_row
+from fusion_validator import reject_invalid, validate_fields
+from utils.normalizer import normalize_lov_fields
+
+VALID = {
+    "Supplier": "Acme Inc",
+    "TaxOrganizationType": "Corporation",
+    "SupplierType": "Services",
+    "BusinessRelationship": "Prospective",
+    "TaxpayerCountry": "United States",
+    "TaxpayerId": "12-3456789",
+    "DUNSNumber": "123456789"
+}
+
+
+def test_valid_payload_has_no_errors():
+    assert validate_fields(VALID) == {}
+
+
+def test_each_invalid_field_gets_its_message():
+    errors = validate_fields({**VALID, "DUNSNumber": "12345", "SupplierType": "Goods"})
+
+    assert errors == {
+        "DUNSNumber": "DUNSNumber must be exactly 9 digits",
+        "SupplierType": "SupplierType must be one of ['Services']. Received: Goods"
+    }
+
+
+def test_lov_values_match_on_code_or_meaning_in_any_case():
+    assert validate_fields({**VALID, "SupplierType": "  services "}) == {}
+
+
+def test_numeric_values_are_checked_as_text():
+    assert validate_fields({**VALID, "DUNSNumber": 123456789}) == {}
+    assert "DUNSNumber" in validate_fields({**VALID, "DUNSNumber": 1234})
+
+
+def test_empty_and_unknown_fields_are_skipped():
+    assert validate_fields({**VALID, "DUNSNumber": None, "Notes": "anything"}) == {}
+
+
+def test_only_the_given_fields_are_checked():
+    payload = {**VALID, "DUNSNumber": "12345", "TaxpayerId": "bad"}
+
+    assert list(validate_fields(payload, ["TaxpayerId"])) == ["TaxpayerId"]
+
+
+def test_reject_invalid_clears_failing_fields():
+    session = {**VALID, "TaxpayerId": "123", "DUNSNumber": "123456789"}
+
+    errors = reject_invalid(session, ["TaxpayerId", "DUNSNumber"])
+
+    assert list(errors) == ["TaxpayerId"]
+    assert session["TaxpayerId"] is None
+    assert session["DUNSNumber"] == "123456789"
+
+
+@pytest.mark.parametrize("country, valid", [
+    ("U.S.A.", True), ("united states", True), ("corp", False), ("Germany", False)
+])
+def test_chat_and_bulk_agree_on_the_country(country, valid):
+    # As a chat turn checks the field it just collected
+    session = {**VALID, "TaxpayerCountry": country}
+    normalize_lov_fields(session, ["TaxpayerCountry"])
+    chat_errors = reject_invalid(session, ["TaxpayerCountry"])
+
+    result, _ = check_row(1, {**VALID, "TaxpayerCountry": country})
+
+    assert (not chat_errors) == (result is None) == valid
+    if not valid:
+        assert result["errors"] == [chat_errors["TaxpayerCountry"]]
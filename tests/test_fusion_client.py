@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import supplier_service
+from config.fusion_settings import BATCH_ENDPOINT, SUPPLIER_ENDPOINT
+from fusion_client import FusionClient, get_fusion_client, set_fusion_client
+
+
+class Recorder:
+    """Answers every request with `response` and keeps what was sent."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        return self.response
+
+
+def client_for(handler):
+    return FusionClient(base_url="https://fusion.test", username="user",
+                        password="secret", transport=httpx.MockTransport(handler))
+
+
+def run(coro_factory):
+    async def main():
+        return await coro_factory()
+    return asyncio.run(main())
+
+
+def test_create_supplier_posts_json_with_basic_auth():
+    fusion = Recorder(httpx.Response(201, json={"SupplierId": 7, "SupplierNumber": "1007"}))
+    client = client_for(fusion)
+
+    status, body = run(lambda: client.create_supplier({"Supplier": "Acme Inc"}))
+
+    assert (status, body) == (201, {"SupplierId": 7, "SupplierNumber": "1007"})
+    [request] = fusion.requests
+    assert request.url == "https://fusion.test" + SUPPLIER_ENDPOINT
+    assert request.headers["Authorization"].startswith("Basic ")
+    assert json.loads(request.content) == {"Supplier": "Acme Inc"}
+
+
+def test_non_json_answer_comes_back_as_text():
+    client = client_for(Recorder(httpx.Response(500, text=" Internal error \n")))
+
+    assert run(lambda: client.create_supplier({})) == (500, "Internal error")
+
+
+def test_requests_share_one_client():
+    assert get_fusion_client() is get_fusion_client()
+
+
+@pytest.fixture
+def fusion_answers():
+    def install(response):
+        set_fusion_client(client_for(Recorder(response)))
+    yield install
+    set_fusion_client(None)
+
+
+def test_service_reports_created_supplier(fusion_answers):
+    fusion_answers(httpx.Response(201, json={"SupplierId": 7, "SupplierNumber": "1007"}))
+
+    assert run(lambda: supplier_service.create_supplier({})) == {
+        "status": "SUCCESS", "supplierId": 7, "supplierNumber": "1007"
+    }
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(201),
+    httpx.Response(201, text="Created"),
+    httpx.Response(201, json=[{"SupplierId": 7}])
+])
+def test_service_reports_created_supplier_without_ids(fusion_answers, response):
+    fusion_answers(response)
+
+    assert run(lambda: supplier_service.create_supplier({})) == {
+        "status": "SUCCESS", "supplierId": None, "supplierNumber": None
+    }
+
+
+def test_service_reports_rejection(fusion_answers):
+    fusion_answers(httpx.Response(400, json={"detail": "Supplier name is invalid."}))
+
+    assert run(lambda: supplier_service.create_supplier({})) == {
+        "status": "FAILED", "httpStatus": 400, "error": {"detail": "Supplier name is invalid."}
+    }
+
+
+def payloads(*names):
+    return [{"Supplier": name, "DUNSNumber": f"{n:09d}"} for n, name in enumerate(names)]
+
+
+def create_many(fusion, items):
+    client = FusionClient(base_url="https://fusion.test", transport=fusion.transport())
+
+    async def main():
+        try:
+            return await client.create_suppliers(items)
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_batch_creates_every_part_in_one_request(fusion):
+    results = create_many(fusion, payloads("Acme Inc", "Other Inc", "Third Inc"))
+
+    assert [status for status, _ in results] == [201, 201, 201]
+    assert [body["Supplier"] for _, body in results] == ["Acme Inc", "Other Inc", "Third Inc"]
+    assert fusion.requests == 1
+
+
+def test_rejected_part_only_fails_itself(fusion):
+    results = create_many(fusion, payloads("Acme Inc", "FAIL Inc", "Third Inc"))
+
+    assert [status for status, _ in results] == [201, 400, 201]
+    assert fusion.suppliers == 2
+
+
+def test_part_without_result_in_committed_batch_is_not_posted_again(fusion):
+    handle = fusion.handle
+
+    async def drop_second_part(request):
+        response = await handle(request)
+        if request.url.path != BATCH_ENDPOINT:
+            return response
+        body = response.json()
+        body["parts"][1].pop("payload")
+        return httpx.Response(response.status_code, json=body)
+
+    fusion.handle = drop_second_part
+    results = create_many(fusion, payloads("Acme Inc", "Other Inc", "Third Inc"))
+
+    assert [status for status, _ in results] == [201, 502, 201]
+    assert fusion.requests == 1
+    assert fusion.suppliers == 3
@@ -0,0 +1,41 @@
+import asyncio
+
+import gemini_agent
+from utils.metrics import render_metrics
+
+
+def test_only_missing_fields_are_asked_for(gemini):
+    message = "Acme folks, they do services"
+    gemini.expect(message, {"Supplier": "Acme", "SupplierType": "Services"})
+
+    extracted = asyncio.run(
+        gemini_agent.extract_supplier_payload(message, fields=["Supplier"])
+    )
+    assert extracted == {"Supplier": "Acme"}
+
+
+def test_answer_is_not_asked_for_when_rules_cover_the_fields(gemini):
+    extracted = asyncio.run(gemini_agent.extract_supplier_payload(
+        "Acme folks, DUNS 123456789", fields=["DUNSNumber"]
+    ))
+
+    assert extracted == {"DUNSNumber": "123456789"}
+    assert gemini.calls == 0
+
+
+def metric(name):
+    """The value of the one series whose line starts with `name`."""
+    [line] = [line for line in render_metrics().splitlines() if line.startswith(name + " ")]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_calls_are_published_with_their_tokens(gemini):
+    calls = 'supplier_agent_gemini_calls_total{outcome="answered"}'
+    tokens = 'supplier_agent_gemini_tokens_total{kind="prompt"}'
+    before = metric(calls), metric(tokens)
+
+    asyncio.run(gemini_agent.extract_with_llm("Acme", ["Supplier"]))
+
+    assert metric(calls) == before[0] + 1
+    assert metric(tokens) > before[1]
+    assert metric("supplier_agent_gemini_latency_seconds_total") > 0
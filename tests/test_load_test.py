@@ -0,0 +1,24 @@
+import asyncio
+
+import gemini_agent
+from benchmarks import load_test
+from fusion_client import set_fusion_client
+
+
+def test_every_conversation_reaches_fusion():
+    args = load_test.parse_args([
+        "--conversations", "3", "--concurrency", "2",
+        "--gemini-latency", "0", "--fusion-latency", "0"
+    ])
+
+    try:
+        results = {mode: asyncio.run(load_test.run_mode(mode, args)) for mode in ("app", "app_1")}
+    finally:
+        set_fusion_client(None)
+        gemini_agent.set_gemini_client(None)
+
+    for result in results.values():
+        assert result["completed"] == 3
+        assert result["failed"] == {}
+        assert result["outbox"] == {"CREATED": 3}
+    assert results["app_1"]["gemini_calls"] == 3
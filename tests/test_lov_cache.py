@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+
+from config.fusion_settings import LOOKUPS_ENDPOINT, TERRITORIES_ENDPOINT
+from fusion_client import FusionClient
+from fusion_validator import validate_against_fusion
+from lov_cache import LovCache, lov_cache
+
+LOOKUPS = {
+    "ORGANIZATION TYPE": [("CORPORATION", "Corporation"), ("PARTNERSHIP", "Partnership")],
+    "VENDOR TYPE": [("SERVICES", "Services"), ("GOODS", "Goods")],
+    "POZ_BUSINESS_RELATIONSHIP": [("PROSPECTIVE", "Prospective")]
+}
+TERRITORIES = [("US", "United States"), ("DE", "Germany"), ("FR", "France")]
+
+
+class StubLookups:
+    """Fusion's lookup resources, paged two items at a time with ETags."""
+
+    def __init__(self):
+        self.requests = []
+
+    def handle(self, request):
+        self.requests.append(request)
+        params = request.url.params
+        if request.url.path == TERRITORIES_ENDPOINT:
+            code, value, rows = "TerritoryCode", "TerritoryShortName", TERRITORIES
+        else:
+            lookup_type = params["q"].split("'")[1]
+            code, value, rows = "LookupCode", "Meaning", LOOKUPS[lookup_type]
+
+        etag = f'"{request.url.path}:{params.get("q")}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+
+        offset = int(params["offset"])
+        page = rows[offset:offset + 2]
+        return httpx.Response(200, headers={"ETag": etag}, json={
+            "items": [{code: c, value: v} for c, v in page],
+            "hasMore": offset + 2 < len(rows)
+        })
+
+
+def cache_for(stub, snapshot_path=None):
+    client = FusionClient(base_url="https://fusion.test",
+                          transport=httpx.MockTransport(stub.handle))
+    return LovCache(client_factory=lambda: client, snapshot_path=snapshot_path)
+
+
+def test_refresh_loads_every_page():
+    cache = cache_for(StubLookups())
+
+    assert asyncio.run(cache.refresh())
+
+    assert cache.allowed("TaxpayerCountry") == {"United States", "Germany", "France"}
+    assert cache.resolve("TaxpayerCountry", " de ") == "Germany"
+    assert cache.resolve("SupplierType", "goods") == "Goods"
+    assert cache.loaded_from == "fusion"
+
+
+def test_unchanged_lookups_answer_304():
+    stub = StubLookups()
+    cache = cache_for(stub)
+    asyncio.run(cache.refresh())
+    stub.requests.clear()
+
+    assert not asyncio.run(cache.refresh())
+    assert {r.headers.get("If-None-Match") is not None for r in stub.requests} == {True}
+    assert cache.resolve("TaxpayerCountry", "FR") == "France"
+
+
+def test_snapshot_lets_a_new_cache_start_without_fusion(tmp_path):
+    path = str(tmp_path / "lov.json")
+    asyncio.run(cache_for(StubLookups(), path).refresh())
+
+    cache = LovCache(client_factory=None, snapshot_path=path)
+    assert cache.load_snapshot()
+
+    assert cache.loaded_from == "snapshot"
+    assert cache.resolve("TaxOrganizationType", "corporation") == "Corporation"
+
+
+def test_validator_accepts_codes_and_lists_short_lovs(monkeypatch):
+    monkeypatch.setattr(lov_cache, "values", dict(lov_cache.values))
+    monkeypatch.setattr(lov_cache, "indexes", dict(lov_cache.indexes))
+    monkeypatch.setattr(lov_cache, "loaded_from", lov_cache.loaded_from)
+    lov_cache._install({"SupplierType": LOOKUPS["VENDOR TYPE"]}, "fusion")
+
+    assert validate_against_fusion({"SupplierType": "SERVICES"}) == []
+    assert validate_against_fusion({"SupplierType": "Rentals"}) == [
+        "SupplierType must be one of ['Goods', 'Services']. Received: Rentals"
+    ]
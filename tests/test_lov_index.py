@@ -0,0 +1,62 @@
+import pytest
+
+from lov_cache import LovCache
+from utils.lov_index import LovIndex, bounded_levenshtein, normalize_key
+from utils.normalizer import normalize_lov_fields
+
+COUNTRIES = LovIndex([
+    ("United States", "United States"), ("US", "United States"),
+    ("United Kingdom", "United Kingdom"), ("Germany", "Germany"),
+    ("DE", "Germany")
+])
+
+
+def test_keys_ignore_case_punctuation_and_spacing():
+    assert normalize_key("  U.S.A. ") == "usa"
+    assert normalize_key("United   STATES") == "united states"
+
+
+@pytest.mark.parametrize("a, b, bound, distance", [
+    ("germany", "germany", 2, 0),
+    ("germny", "germany", 2, 1),
+    ("gremany", "germany", 2, 2),
+    ("france", "germany", 2, 3),
+    ("us", "united states", 2, 3)
+])
+def test_bounded_levenshtein(a, b, bound, distance):
+    assert bounded_levenshtein(a, b, bound) == distance
+
+
+def test_exact_match_is_certain():
+    assert COUNTRIES.match("u.s.") == ("United States", 1.0)
+
+
+def test_typo_resolves_with_lower_confidence():
+    canonical, confidence = COUNTRIES.match("Untied States")
+
+    assert canonical == "United States"
+    assert 0.8 <= confidence < 1.0
+
+
+def test_unrelated_value_does_not_match():
+    assert COUNTRIES.match("Atlantis") == (None, 0.0)
+    assert COUNTRIES.match(None) == (None, 0.0)
+
+
+def test_cache_resolves_aliases_before_fusion_is_loaded():
+    cache = LovCache(client_factory=None, snapshot_path=None)
+
+    assert cache.match("TaxpayerCountry", "U.S.A.")[0] == "United States"
+    assert cache.match("TaxOrganizationType", "corp")[0] == "Corporation"
+    assert cache.match("Unknown", "x") == (None, 0.0)
+
+
+def test_low_confidence_values_are_left_for_validation():
+    session = normalize_lov_fields({
+        "TaxpayerCountry": "usa", "SupplierType": "Servces", "TaxOrganizationType": "Corprate"
+    })
+
+    assert session == {
+        "TaxpayerCountry": "United States", "SupplierType": "Services",
+        "TaxOrganizationType": "Corprate"
+    }
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app_1
+from utils.metrics import (
+    Counter, Histogram, cache_metrics, register_collector, render_metrics
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Metrics created by the test render on their own."""
+    monkeypatch.setattr("utils.metrics._metrics", [])
+    monkeypatch.setattr("utils.metrics._collectors", [])
+
+
+def test_counter_renders_one_series_per_label_set(registry):
+    calls = Counter("calls_total", "Calls", labels=("code",))
+    calls.inc("200")
+    calls.inc("200")
+    calls.inc("5\"03")
+
+    assert render_metrics().splitlines() == [
+        "# HELP calls_total Calls",
+        "# TYPE calls_total counter",
+        'calls_total{code="200"} 2',
+        'calls_total{code="5\\"03"} 1'
+    ]
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        latency.observe(value)
+
+    lines = render_metrics().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert "latency_seconds_sum 3.05" in lines
+
+
+def test_quantiles_interpolate_inside_the_bucket(registry):
+    latency = Histogram("latency_seconds", "Latency", buckets=(1.0, 2.0))
+    for _ in range(4):
+        latency.observe(1.5)
+
+    assert latency.quantile(0.5) == 1.5
+    assert Histogram("empty_seconds", "Empty").quantile(0.5) is None
+
+
+def test_collectors_merge_series_of_one_metric(registry):
+    register_collector(lambda: cache_metrics("a", {"hit": 3, "miss": 1}, 3))
+    register_collector(lambda: cache_metrics("b", {"hit": 0, "miss": 0}, 0))
+
+    lines = render_metrics().splitlines()
+    assert lines.count("# TYPE supplier_agent_cache_hit_ratio gauge") == 1
+    assert 'supplier_agent_cache_hit_ratio{cache="a"} 0.75' in lines
+    assert 'supplier_agent_cache_hit_ratio{cache="b"} 0.0' in lines
+    assert 'supplier_agent_cache_lookups_total{cache="a",result="hit"} 3' in lines
+
+
+def test_metrics_endpoint_needs_auth_and_reports_turns():
+    client = TestClient(app_1.app)
+    assert client.get("/metrics").status_code == 401
+
+    client.auth = ("test", "test")
+    client.post("/supplier-agent", json={"message": "hello"})
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'supplier_agent_stage_seconds_count{stage="turn"}' in response.text
+    assert 'supplier_agent_state_transitions_total{from_state="INIT",to_state="INIT"}' in response.text
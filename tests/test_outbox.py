@@ -0,0 +1,244 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from config.fusion_settings import BATCH_ENDPOINT
+from fusion_client import FusionClient, set_fusion_client
+from supplier_outbox import SupplierOutbox, CREATED, FAILED, PENDING, RUNNING
+
+ACME = {
+    "Supplier": "Acme Inc",
+    "TaxOrganizationType": "Corporation",
+    "SupplierType": "Services",
+    "BusinessRelationship": "Prospective",
+    "TaxpayerCountry": "United States",
+    "TaxpayerId": "12-3456789",
+    "DUNSNumber": "123456789"
+}
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return SupplierOutbox(path=str(tmp_path / "outbox.db"), backoff_seconds=0, max_attempts=3)
+
+
+def enqueue(outbox, session_id, payload):
+    return asyncio.run(outbox.enqueue(session_id, payload))
+
+
+def drain(outbox):
+    """Run every due job once, as a worker would."""
+    jobs = outbox.claim(10)
+    asyncio.run(outbox.run_jobs(jobs))
+    return jobs
+
+
+def test_repeated_confirmation_returns_the_same_job(outbox):
+    first = enqueue(outbox, "session-1", ACME)
+    again = enqueue(outbox, "session-1", dict(ACME))
+
+    assert again["jobId"] == first["jobId"]
+    assert outbox.counts() == {PENDING: 1}
+
+
+def test_job_is_created_in_fusion(outbox, fusion):
+    job = enqueue(outbox, "session-1", ACME)
+    drain(outbox)
+
+    done = outbox.get(job["jobId"])
+    assert done["status"] == CREATED
+    assert done["SupplierId"] == 1
+    assert fusion.supplier(0)["Supplier"] == "Acme Inc"
+
+
+def test_retryable_failure_is_retried(outbox, fusion):
+    job = enqueue(outbox, "session-1", ACME)
+
+    fusion.error_rate = 1.0
+    drain(outbox)
+    assert outbox.get(job["jobId"])["status"] == PENDING
+
+    fusion.error_rate = 0.0
+    drain(outbox)
+    done = outbox.get(job["jobId"])
+    assert done["status"] == CREATED
+    assert done["attempts"] == 2
+    assert fusion.suppliers == 1
+
+
+def test_retries_stop_after_max_attempts(outbox, fusion):
+    job = enqueue(outbox, "session-1", ACME)
+
+    fusion.error_rate = 1.0
+    for _ in range(3):
+        drain(outbox)
+
+    failed = outbox.get(job["jobId"])
+    assert failed["status"] == FAILED
+    assert failed["attempts"] == 3
+    assert "503" in failed["error"]
+    assert outbox.claim() == []
+
+
+def test_rejected_supplier_is_not_retried(outbox, fusion):
+    job = enqueue(outbox, "session-1", {**ACME, "Supplier": "FAIL Inc"})
+    drain(outbox)
+
+    failed = outbox.get(job["jobId"])
+    assert failed["status"] == FAILED
+    assert failed["attempts"] == 1
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    outbox = SupplierOutbox(path=str(tmp_path / "outbox.db"), lease_seconds=0)
+    job = enqueue(outbox, "session-1", ACME)
+
+    [(job_id, _, attempt)] = outbox.claim()
+    assert (job_id, attempt) == (job["jobId"], 1)
+    assert outbox.get(job_id)["status"] == RUNNING
+
+    # The first worker died holding the lease
+    [(reclaimed, _, attempt)] = outbox.claim()
+    assert (reclaimed, attempt) == (job_id, 2)
+
+
+def test_reclaimed_job_finds_the_supplier_its_first_attempt_created(tmp_path, fusion):
+    outbox = SupplierOutbox(path=str(tmp_path / "outbox.db"), lease_seconds=0)
+    job = enqueue(outbox, "session-1", ACME)
+    outbox.claim()
+
+    # The first attempt got through before its worker was lost
+    fusion.create(ACME)
+    drain(outbox)
+
+    done = outbox.get(job["jobId"])
+    assert done["status"] == CREATED
+    assert done["SupplierId"] == 1
+    assert fusion.suppliers == 1
+
+
+def test_stale_worker_cannot_overwrite_a_reclaimed_job(tmp_path, fusion):
+    outbox = SupplierOutbox(path=str(tmp_path / "outbox.db"), lease_seconds=0)
+    job = enqueue(outbox, "session-1", ACME)
+    [stale] = outbox.claim()
+
+    drain(outbox)
+    assert outbox.get(job["jobId"])["status"] == CREATED
+
+    # The first worker wakes up and reports a failure for its attempt
+    fusion.error_rate = 1.0
+    asyncio.run(outbox.run_jobs([stale]))
+    assert outbox.get(job["jobId"])["status"] == CREATED
+
+
+def test_backlog_is_created_in_one_batch(outbox, fusion):
+    jobs = [
+        enqueue(outbox, f"session-{i}", {**ACME, "Supplier": f"Acme {i} Inc"})
+        for i in range(3)
+    ]
+
+    drain(outbox)
+
+    assert [outbox.get(job["jobId"])["status"] for job in jobs] == [CREATED] * 3
+    assert fusion.requests == 1
+
+
+def test_rejected_part_only_fails_its_own_job(outbox, fusion):
+    good = enqueue(outbox, "session-1", ACME)
+    bad = enqueue(outbox, "session-2", {**ACME, "Supplier": "FAIL Inc"})
+
+    drain(outbox)
+
+    assert outbox.get(good["jobId"])["status"] == CREATED
+    assert outbox.get(bad["jobId"])["status"] == FAILED
+    assert fusion.suppliers == 1
+
+
+def test_failed_job_is_queued_again_on_a_new_confirmation(outbox, fusion):
+    failed = enqueue(outbox, "session-1", {**ACME, "Supplier": "FAIL Inc"})
+    drain(outbox)
+    assert outbox.get(failed["jobId"])["status"] == FAILED
+
+    again = enqueue(outbox, "session-1", {**ACME, "Supplier": "FAIL Inc"})
+
+    assert again["jobId"] != failed["jobId"]
+    assert again["status"] == PENDING
+    assert outbox.get(failed["jobId"]) is None
+
+
+def test_failed_job_survives_a_replacement_that_could_not_be_queued(outbox, fusion, monkeypatch):
+    failed = enqueue(outbox, "session-1", {**ACME, "Supplier": "FAIL Inc"})
+    drain(outbox)
+
+    def no_id():
+        raise RuntimeError("no id")
+
+    monkeypatch.setattr("supplier_outbox.uuid.uuid4", no_id)
+    with pytest.raises(RuntimeError):
+        enqueue(outbox, "session-1", {**ACME, "Supplier": "FAIL Inc"})
+
+    assert outbox.get(failed["jobId"])["status"] == FAILED
+
+
+def test_created_job_is_not_queued_again(outbox, fusion):
+    job = enqueue(outbox, "session-1", ACME)
+    drain(outbox)
+
+    again = enqueue(outbox, "session-1", ACME)
+
+    assert again["jobId"] == job["jobId"]
+    assert again["status"] == CREATED
+    assert outbox.claim() == []
+
+
+def test_reclaimed_job_does_not_take_a_namesake_for_its_supplier(tmp_path, fusion):
+    outbox = SupplierOutbox(path=str(tmp_path / "outbox.db"), lease_seconds=0)
+    job = enqueue(outbox, "session-1", ACME)
+    outbox.claim()
+
+    # Someone else's Acme Inc, with other ids
+    fusion.create({**ACME, "TaxpayerId": "98-7654321", "DUNSNumber": "987654321"})
+    drain(outbox)
+
+    # Created afresh rather than settled with the namesake's id
+    done = outbox.get(job["jobId"])
+    assert done["status"] == CREATED
+    assert done["SupplierId"] == 2
+
+
+def test_batch_part_without_result_is_looked_up_not_created_again(outbox, fusion):
+    handle = fusion.handle
+
+    async def drop_acme(request):
+        response = await handle(request)
+        if request.url.path != BATCH_ENDPOINT:
+            return response
+        body = response.json()
+        for part in body["parts"]:
+            if part["payload"]["Supplier"] == "Acme Inc":
+                del part["payload"]
+        return httpx.Response(response.status_code, json=body)
+
+    fusion.handle = drop_acme
+    first = enqueue(outbox, "session-1", ACME)
+    enqueue(outbox, "session-2", {**ACME, "Supplier": "Other Inc", "DUNSNumber": "123456780"})
+    set_fusion_client(FusionClient(base_url="https://fusion.test", transport=fusion.transport()))
+
+    drain(outbox)
+    assert outbox.get(first["jobId"])["status"] == PENDING
+
+    drain(outbox)
+    done = outbox.get(first["jobId"])
+    assert done["status"] == CREATED
+    assert fusion.suppliers == 2
+    assert fusion.supplier(done["SupplierId"] - 1)["Supplier"] == "Acme Inc"
+
+
+def test_unknown_job_is_404():
+    client = TestClient(app.app)
+    client.auth = ("test", "test")
+
+    assert client.get("/supplier-jobs/nope").status_code == 404
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_fusion import FakeFusion
+from fusion_client import FusionClient
+from supplier_index import SupplierIndex
+from supplier_prechecks import SupplierPrechecks
+
+
+@pytest.fixture
+def prechecks():
+    fusion = FakeFusion(10)
+    client = FusionClient(base_url="https://fusion.test", transport=fusion.transport())
+    index = SupplierIndex(path=None, client_factory=lambda: client)
+    return SupplierPrechecks(enabled=True, wait_seconds=1, index=index)
+
+
+def conversation(**fields):
+    return {"state": "COLLECTING", "session": {"Supplier": "Acme Inc", **fields}}
+
+
+def test_known_duns_is_found_before_confirmation(prechecks):
+    active = conversation(DUNSNumber=FakeFusion.duns(3))
+
+    async def scenario():
+        prechecks.sync("s-1", active)
+        return await prechecks.new_duplicates("s-1", active)
+    [duplicate] = asyncio.run(scenario())
+
+    assert duplicate["SupplierId"] == 4
+    assert duplicate["fields"] == ["DUNSNumber"]
+    assert active["prechecks"] == {"DUNSNumber": FakeFusion.duns(3)}
+    assert active["duplicates"] == [4]
+
+
+def test_duplicate_already_shown_is_not_repeated(prechecks):
+    active = conversation(DUNSNumber=FakeFusion.duns(3))
+    active["duplicates"] = [4]
+
+    async def scenario():
+        prechecks.sync("s-1", active)
+        return await prechecks.new_duplicates("s-1", active)
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_changed_value_cancels_the_lookup(prechecks):
+    active = conversation(DUNSNumber=FakeFusion.duns(3))
+
+    async def scenario():
+        prechecks.sync("s-1", active)
+        active["session"]["DUNSNumber"] = "999999999"
+        prechecks.sync("s-1", active)
+        await prechecks.wait("s-1", active)
+    asyncio.run(scenario())
+
+    assert prechecks.stats["cancelled"] == 1
+    assert active["prechecks"] == {"DUNSNumber": "999999999"}
+
+
+def test_field_picked_for_editing_is_not_looked_up_again(prechecks):
+    active = conversation(TaxpayerId=FakeFusion.taxpayer_id(3))
+
+    async def scenario():
+        prechecks.sync("s-1", active)
+        await prechecks.wait("s-1", active)
+        prechecks.invalidate("s-1", active, "TaxpayerId")
+        prechecks.sync("s-1", active)
+    asyncio.run(scenario())
+
+    assert "prechecks" not in active
+    assert prechecks.stats["started"] == 1
+
+
+def test_disabled_prechecks_do_nothing(prechecks):
+    prechecks.enabled = False
+    active = conversation(DUNSNumber=FakeFusion.duns(3))
+
+    prechecks.sync("s-1", active)
+
+    assert prechecks.stats["started"] == 0
+    assert "prechecks" not in active
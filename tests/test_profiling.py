@@ -0,0 +1,68 @@
+import json
+import os
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.fusion_settings import get_settings
+from utils.metrics import stage_seconds
+from utils.profiling import ProfilingMiddleware, profile_note, write_profile
+
+
+def profiled_app():
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.post("/supplier-agent")
+    def turn():
+        stage_seconds.observe(0.25, "extraction")
+        profile_note(sessionId="s-1")
+        return {"reply": "ok"}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    return TestClient(app, headers={"X-Profile": "1"})
+
+
+def test_requested_profile_is_written_with_its_stages():
+    response = profiled_app().post("/supplier-agent", auth=("test", "test"))
+
+    profile_id = response.headers["X-Profile-Id"]
+    with open(os.path.join(get_settings().profile_dir, profile_id + ".json")) as f:
+        meta = json.load(f)
+    assert meta["status"] == 200
+    assert meta["sessionId"] == "s-1"
+    assert {"stage": "extraction", "seconds": 0.25} in meta["stages"]
+    assert os.path.exists(os.path.join(get_settings().profile_dir, profile_id + ".folded"))
+
+
+def test_unrequested_and_other_paths_are_not_profiled():
+    client = profiled_app()
+    client.auth = ("test", "test")
+
+    assert "X-Profile-Id" not in client.post("/supplier-agent", headers={"X-Profile": "0"}).headers
+    assert "X-Profile-Id" not in client.get("/health").headers
+
+
+@pytest.mark.parametrize("auth", [None, ("test", "wrong"), ("someone", "test")])
+def test_requests_without_the_agents_credentials_are_not_profiled(auth):
+    response = profiled_app().post("/supplier-agent", auth=auth)
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    for n in range(3):
+        meta = {"id": f"profile-{n}"}
+        write_profile(meta, Counter({"main;work": n + 1}), directory=str(tmp_path), max_files=2)
+        os.utime(tmp_path / f"profile-{n}.json", (n, n))
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "profile-1.folded", "profile-1.json", "profile-2.folded", "profile-2.json"
+    ]
+    assert (tmp_path / "profile-2.folded").read_text() == "main;work 3\n"
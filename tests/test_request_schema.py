@@ -0,0 +1,24 @@
+from pydantic_core import SchemaValidator
+
+from config.fusion_settings import SUPPLIER_FIELDS
+from request_schema import SUPPLIER_REQUIRED_FIELDS, field_schemas, supplier_schema
+
+
+def test_required_fields_come_from_the_field_specs():
+    assert "DUNSNumber" in SUPPLIER_REQUIRED_FIELDS
+    assert set(SUPPLIER_REQUIRED_FIELDS) <= set(SUPPLIER_FIELDS)
+
+
+def test_lov_matches_trimmed_lowercase_keys():
+    validator = SchemaValidator(supplier_schema(field_schemas({"SupplierType": {"services"}})))
+
+    assert validator.isinstance_python({"SupplierType": " Services "})
+    assert not validator.isinstance_python({"SupplierType": "Goods"})
+
+
+def test_patterns_are_anchored_and_numbers_are_text():
+    validator = SchemaValidator(supplier_schema(field_schemas({})))
+
+    assert validator.isinstance_python({"DUNSNumber": 123456789})
+    assert not validator.isinstance_python({"DUNSNumber": "1234567890"})
+    assert validator.isinstance_python({"DUNSNumber": None, "Notes": "anything"})
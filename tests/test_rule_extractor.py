@@ -0,0 +1,53 @@
+import asyncio
+
+import gemini_agent
+from utils.rule_extractor import extract_with_rules
+
+
+def test_labelled_message_is_complete():
+    fields, complete = extract_with_rules(
+        "Supplier: Acme, Inc.; tax org type: corporation; supplier type: "
+        "services; country: US; tax id: 12-3456789; DUNS: 12-345-6789"
+    )
+
+    assert complete
+    assert fields["Supplier"] == "Acme, Inc."
+    assert fields["TaxpayerId"] == "12-3456789"
+    assert fields["DUNSNumber"] == "123456789"
+
+
+def test_identifiers_are_found_without_labels():
+    fields, complete = extract_with_rules("12-3456789 and 123456789")
+
+    assert complete
+    assert fields == {"TaxpayerId": "12-3456789", "DUNSNumber": "123456789"}
+
+
+def test_sentence_is_left_to_the_model():
+    fields, complete = extract_with_rules(
+        "The supplier is a company that is based in Germany"
+    )
+
+    assert not complete
+    assert "Supplier" not in fields
+
+
+def test_malformed_duns_is_not_taken():
+    fields, _ = extract_with_rules("DUNS: 12345")
+
+    assert "DUNSNumber" not in fields
+
+
+def test_structured_message_skips_the_model(gemini):
+    extracted = asyncio.run(gemini_agent.extract_supplier_payload("DUNS: 123456789"))
+
+    assert extracted == {"DUNSNumber": "123456789"}
+    assert gemini.calls == 0
+
+
+def test_rule_matches_win_over_the_model(gemini):
+    message = "We buy from the Acme folks, DUNS 123456789"
+    gemini.expect(message, {"Supplier": "Acme", "DUNSNumber": "999999999"})
+
+    extracted = asyncio.run(gemini_agent.extract_supplier_payload(message))
+    assert extracted == {"Supplier": "Acme", "DUNSNumber": "123456789"}
@@ -0,0 +1,179 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.session_store import (
+    SessionConflict,
+    SessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+    new_session_id
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return SessionStore()
+    return SQLiteSessionStore(path=str(tmp_path / "sessions.db"))
+
+
+def test_sessions_are_kept_apart(store):
+    first, second = new_session_id(), new_session_id()
+    store.save(first, {"state": "INIT"}, 0)
+    store.save(second, {"state": "COLLECTING"}, 0)
+
+    assert first != second
+    assert store.load(first) == ({"state": "INIT"}, 1)
+    assert store.load(second) == ({"state": "COLLECTING"}, 1)
+
+
+def test_unknown_or_missing_id_is_none(store):
+    assert store.load("nope") == (None, 0)
+    assert store.load(None) == (None, 0)
+
+
+def test_save_bumps_the_version(store):
+    session_id = new_session_id()
+    version = store.save(session_id, {"n": 1}, 0)
+    version = store.save(session_id, {"n": 2}, version)
+
+    assert store.load(session_id) == ({"n": 2}, 2)
+
+
+def test_racing_turn_is_rejected(store):
+    session_id = new_session_id()
+    store.save(session_id, {"n": 1}, 0)
+
+    _, first = store.load(session_id)
+    _, second = store.load(session_id)
+    store.save(session_id, {"n": 2}, first)
+
+    with pytest.raises(SessionConflict):
+        store.save(session_id, {"n": 3}, second)
+    assert store.load(session_id) == ({"n": 2}, 2)
+
+
+def test_new_session_cannot_overwrite_a_live_one(store):
+    session_id = new_session_id()
+    store.save(session_id, {"n": 1}, 0)
+
+    with pytest.raises(SessionConflict):
+        store.save(session_id, {"n": 2}, 0)
+
+
+def test_loaded_conversation_is_a_private_copy(store):
+    session_id = new_session_id()
+    store.save(session_id, {"session": {"Supplier": "Acme"}}, 0)
+
+    conversation, _ = store.load(session_id)
+    conversation["session"]["Supplier"] = "Changed"
+
+    assert store.load(session_id)[0] == {"session": {"Supplier": "Acme"}}
+
+
+def test_delete(store):
+    session_id = new_session_id()
+    store.save(session_id, {"state": "INIT"}, 0)
+
+    store.delete(session_id)
+
+    assert store.load(session_id) == (None, 0)
+
+
+def test_idle_session_expires(clock):
+    store = SessionStore(ttl_seconds=60, clock=clock)
+    session_id = new_session_id()
+    store.save(session_id, {"state": "INIT"}, 0)
+
+    clock.advance(59)
+    assert store.load(session_id)[0] is not None
+
+    # The load above restarted the idle timer
+    clock.advance(59)
+    assert store.load(session_id)[0] is not None
+
+    clock.advance(61)
+    assert store.load(session_id) == (None, 0)
+
+
+def test_expired_sqlite_session_is_gone_and_purged(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"), ttl_seconds=-1)
+    session_id = new_session_id()
+    store.save(session_id, {"state": "INIT"}, 0)
+
+    assert store.load(session_id) == (None, 0)
+    store.purge_expired()
+    assert len(store) == 0
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(shards=1, max_entries=2, clock=clock)
+    first, second, third = (new_session_id() for _ in range(3))
+    store.save(first, {"n": 1}, 0)
+    store.save(second, {"n": 2}, 0)
+
+    store.load(first)
+    store.save(third, {"n": 3}, 0)
+
+    assert store.load(second) == (None, 0)
+    assert store.load(first)[0] == {"n": 1}
+    assert store.load(third)[0] == {"n": 3}
+
+
+def test_sqlite_store_keeps_the_most_recent_sessions(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"), max_entries=2)
+    ids = [new_session_id() for _ in range(3)]
+    for n, session_id in enumerate(ids):
+        store.save(session_id, {"n": n}, 0)
+
+    store.purge_expired()
+
+    assert [store.load(i)[0] for i in ids] == [None, {"n": 1}, {"n": 2}]
+
+
+def test_sqlite_sessions_are_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    session_id = new_session_id()
+    SQLiteSessionStore(path=path).save(session_id, {"state": "INIT"}, 0)
+
+    assert SQLiteSessionStore(path=path).load(session_id) == ({"state": "INIT"}, 1)
+
+
+def test_purge_expired_empties_idle_shards(clock):
+    store = SessionStore(shards=4, ttl_seconds=10, clock=clock)
+    for n in range(20):
+        store.save(new_session_id(), {"n": n}, 0)
+
+    clock.advance(11)
+    store.purge_expired()
+
+    assert len(store) == 0
+
+
+def test_backend_is_picked_by_name(tmp_path):
+    assert isinstance(create_session_store("memory"), SessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+
+
+def test_each_caller_gets_their_own_conversation():
+    import app
+
+    client = TestClient(app.app)
+    client.auth = ("test", "test")
+    first = client.post("/supplier-agent", json={"message": "create supplier"}).json()
+    second = client.post("/supplier-agent", json={"message": "hello"}).json()
+
+    assert first["sessionId"] != second["sessionId"]
+
+    reply = client.post(
+        "/supplier-agent", json={"message": "Acme Inc", "sessionId": first["sessionId"]}
+    ).json()
+    assert reply["sessionId"] == first["sessionId"]
+    assert reply["reply"] != first["reply"]
+
+    # The other conversation never started
+    reply = client.post(
+        "/supplier-agent", json={"message": "Acme Inc", "sessionId": second["sessionId"]}
+    ).json()
+    assert reply["reply"] == 'Type "create supplier" to begin.'
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app_1
+
+
+@pytest.fixture
+def client():
+    client = TestClient(app_1.app)
+    client.auth = ("test", "test")
+    return client
+
+
+def events(response):
+    """[(event, data)] from a text/event-stream body."""
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+def test_turn_is_acknowledged_then_answered(client):
+    response = client.post("/supplier-agent/stream", json={"message": "create supplier"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    [(ack, first), (reply, body)] = events(response)
+    assert (ack, first["state"]) == ("ack", "INIT")
+    assert reply == "reply"
+    assert body["sessionId"] == first["sessionId"]
+
+
+def test_collecting_turn_streams_its_fields_first(client, gemini):
+    started = client.post("/supplier-agent/stream", json={"message": "create supplier"})
+    session_id = events(started)[0][1]["sessionId"]
+
+    response = client.post("/supplier-agent/stream", json={
+        "message": "DUNS: 123456789", "sessionId": session_id
+    })
+
+    stages = events(response)
+    assert [event for event, _ in stages] == ["ack", "fields", "validation", "reply"]
+    assert stages[0][1]["state"] == "COLLECTING"
+    assert stages[1][1]["extracted"] == {"DUNSNumber": "123456789"}
+    assert "DUNSNumber" not in stages[1][1]["missing"]
+    assert stages[2][1] == {"valid": True, "errors": {}}
+    assert gemini.calls == 0
+
+
+def test_stream_and_plain_endpoint_agree(client):
+    streamed = events(client.post("/supplier-agent/stream", json={"message": "hello"}))[-1][1]
+    plain = client.post("/supplier-agent", json={"message": "hello"}).json()
+
+    assert streamed["reply"] == plain["reply"] == 'Say "create supplier" to begin.'
@@ -0,0 +1,71 @@
+import asyncio
+
+from benchmarks.fake_fusion import FakeFusion
+from fusion_client import FusionClient
+from supplier_index import SupplierIndex, describe_duplicates, name_key, supplier_keys
+
+
+def index_for(fake, **kwargs):
+    client = FusionClient(base_url="https://fusion.test", transport=fake.transport())
+    return SupplierIndex(path=None, client_factory=lambda: client, page_size=10, **kwargs)
+
+
+def test_keys_ignore_legal_suffixes_and_separators():
+    assert name_key("Acme, Inc.") == name_key("ACME Corp") == "acme"
+    assert name_key("Inc") == "inc"
+    assert supplier_keys({"Supplier": "Acme LLC", "DUNSNumber": "12-345-6789",
+                          "TaxpayerId": ""}) == ("acme", "123456789", None)
+
+
+def test_full_sync_indexes_every_supplier():
+    fake = FakeFusion(25)
+    index = index_for(fake)
+
+    assert asyncio.run(index.sync()) == 25
+    assert len(index) == 25
+
+    matches = index.find_duplicates({"DUNSNumber": FakeFusion.duns(7)})
+    assert [(m["SupplierId"], m["fields"]) for m in matches] == [(8, ["DUNSNumber"])]
+
+
+def test_incremental_sync_picks_up_edits():
+    fake = FakeFusion(25)
+    index = index_for(fake)
+    asyncio.run(index.sync())
+
+    fake.touch(3, name="Renamed Ltd")
+    asyncio.run(index.sync())
+
+    assert index.find_duplicates({"Supplier": "renamed"})[0]["SupplierId"] == 4
+    assert index.find_duplicates({"Supplier": "Supplier 3 Inc"}) == []
+    assert index.watermark == fake.supplier(3)["LastUpdateDate"]
+
+
+def test_new_supplier_is_answered_by_the_bloom_filter():
+    index = index_for(FakeFusion(25))
+    asyncio.run(index.sync())
+
+    assert index.find_duplicates({"Supplier": "Brand New Co", "DUNSNumber": "999999999"}) == []
+    assert index.stats["bloom_negatives"] == 1
+
+
+def test_remembered_supplier_is_a_duplicate_before_the_next_sync():
+    index = index_for(FakeFusion(0))
+    index.remember({"Supplier": "Acme Inc"}, {"SupplierId": 1, "SupplierNumber": "100001"})
+
+    matches = index.find_duplicates({"Supplier": "Acme"})
+    assert describe_duplicates(matches) == (
+        "Possible duplicate: Acme Inc (SupplierNumber 100001) has the same Supplier."
+    )
+
+
+def test_bloom_filter_survives_a_restart(tmp_path):
+    path = str(tmp_path / "index.db")
+    client = FusionClient(base_url="https://fusion.test", transport=FakeFusion(25).transport())
+    first = SupplierIndex(path=path, client_factory=lambda: client, page_size=10)
+    asyncio.run(first.sync())
+    first.close()
+
+    second = SupplierIndex(path=path, client_factory=None)
+    assert second.find_duplicates({"TaxpayerId": FakeFusion.taxpayer_id(5)})
+    assert len(second) == 25
@@ -0,0 +1,53 @@
+import pytest
+
+from utils.supplier_list import chunk_entries, looks_like_supplier_list, split_entries
+
+SINGLE_SUPPLIERS = [
+    "Supplier: Acme Inc\nDUNS: 123456789\nTaxpayerId: 12-3456789\nCountry: US",
+    "Acme Inc\nDUNS: 123456789\nTax ID: 12-3456789\nCountry: United States",
+    "create Acme Inc with DUNS 123456789 and tax id 12-3456789",
+    "DUNS 123456789\nTax ID 12-3456789",
+    "Acme Inc, 12-3456789, 123456789"
+]
+
+LISTS = [
+    "Supplier,DUNS,TaxpayerId\nAcme Inc,123456789,12-3456789\nGlobex,987654321,98-7654321",
+    "| Supplier | DUNS |\n|---|---|\n| Acme Inc | 123456789 |\n| Globex | 987654321 |",
+    "Acme Inc 123456789\nGlobex 987654321",
+    "Acme Inc\nDUNS: 123456789\n\nGlobex\nDUNS: 987654321",
+    "Acme Inc\nDUNS: 123456789\nGlobex\nDUNS: 987654321",
+    "Supplier: Acme Inc\nDUNS: 123456789\nSupplier: Globex\nDUNS: 987654321"
+]
+
+
+@pytest.mark.parametrize("text", SINGLE_SUPPLIERS)
+def test_one_supplier_is_not_a_list(text):
+    assert not looks_like_supplier_list(text)
+
+
+@pytest.mark.parametrize("text", LISTS)
+def test_several_suppliers_are_a_list(text):
+    assert looks_like_supplier_list(text)
+
+
+def test_field_per_line_supplier_is_one_entry():
+    assert split_entries(SINGLE_SUPPLIERS[0]) == (None, [SINGLE_SUPPLIERS[0]])
+
+
+def test_repeated_label_starts_the_next_supplier():
+    assert split_entries(LISTS[-1]) == (None, [
+        "Supplier: Acme Inc\nDUNS: 123456789",
+        "Supplier: Globex\nDUNS: 987654321"
+    ])
+
+
+def test_table_header_and_rule_are_split_off():
+    assert split_entries(LISTS[1]) == (
+        "| Supplier | DUNS |", ["| Acme Inc | 123456789 |", "| Globex | 987654321 |"]
+    )
+
+
+def test_chunks_never_split_an_entry():
+    entries = ["a" * 40, "b" * 40, "c" * 40]
+
+    assert chunk_entries(entries, 90) == [entries[:2], entries[2:]]
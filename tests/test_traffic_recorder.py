@@ -0,0 +1,99 @@
+import json
+import re
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from utils.auth import authenticate_user
+from utils.traffic_recorder import (
+    Recording, Redactor, TrafficRecorder, TrafficRecorderMiddleware, record_turn
+)
+
+
+def test_identifiers_keep_their_shape():
+    redact = Redactor("key")
+
+    redacted = redact("Taxpayer id 12-3456789, DUNS 123456789, since 2019")
+
+    assert redacted != "Taxpayer id 12-3456789, DUNS 123456789, since 2019"
+    assert re.fullmatch(r"Taxpayer id \d\d-\d{7}, DUNS \d{9}, since 2019", redacted)
+
+
+@pytest.mark.parametrize("number", ["123-45-6789", "12 345 6789", "12-345-6789", "123.456.789"])
+def test_digit_groups_split_by_separators_are_one_identifier(number):
+    redact = Redactor("key")
+
+    redacted = redact(f"id {number}")
+
+    # Same separators, and the digits written together would get
+    assert re.sub(r"\d", "0", redacted) == re.sub(r"\d", "0", f"id {number}")
+    assert re.sub(r"\D", "", redacted) == redact("123456789") != "123456789"
+
+
+def test_session_identifiers_are_redacted_however_short(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), "key")
+    recording = Recording()
+    recording.turn.update(
+        message="tax id 12/34, DUNS 1234",
+        session={"state": "COLLECTING", "session": {"TaxpayerId": "12/34", "DUNSNumber": None},
+                 "batch": [{"DUNSNumber": "1234"}]}
+    )
+
+    record = recorder.build("test", recording, 200, 0, 0, [])
+
+    assert "12/34" not in record["message"] and "1234" not in record["message"]
+    assert record["session"]["session"]["TaxpayerId"] in record["message"]
+    assert record["session"]["batch"][0]["DUNSNumber"] in record["message"]
+
+
+def test_same_value_gets_the_same_pseudonym_everywhere():
+    redact = Redactor("key")
+
+    record = redact({"message": "DUNS 123456789", "session": {"DUNSNumber": "123456789"}})
+
+    assert record["message"] == "DUNS " + record["session"]["DUNSNumber"]
+    assert Redactor("other key")("123456789") != record["session"]["DUNSNumber"]
+
+
+def test_emails_are_replaced():
+    redacted = Redactor("key")("Contact jane.doe@acme.com")
+
+    assert "jane" not in redacted
+    assert redacted.endswith("@example.com")
+
+
+def recording_app(path):
+    app = FastAPI()
+    app.add_middleware(TrafficRecorderMiddleware, app_name="test",
+                       recorder=TrafficRecorder(str(path), "key"))
+
+    @app.post("/supplier-agent")
+    def turn(username: str = Depends(authenticate_user)):
+        record_turn(sessionId="s-1", message="DUNS 123456789", fromState="INIT",
+                    toState="INIT", reply={"reply": "ok", "sessionId": "s-1"})
+        return {"reply": "ok"}
+
+    return TestClient(app)
+
+
+def test_turns_are_appended_redacted(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    client = recording_app(path)
+    client.auth = ("test", "test")
+
+    client.post("/supplier-agent")
+    client.post("/supplier-agent")
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2
+    assert records[0]["message"] != "DUNS 123456789"
+    assert records[0]["reply"] == {"reply": "ok"}
+    assert (records[0]["status"], records[0]["app"]) == (200, "test")
+
+
+def test_rejected_requests_are_not_recorded(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+
+    assert recording_app(path).post("/supplier-agent").status_code == 401
+    assert not path.exists()
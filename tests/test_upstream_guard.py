@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from utils.upstream_guard import AdmissionLimiter, UpstreamGuard, UpstreamOverloaded
+
+
+def test_breaker_opens_after_repeated_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.times_opened == 1
+
+
+def test_breaker_lets_one_probe_through_after_the_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+
+    clock.advance(30)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_slow_call_is_cut_off_at_the_budget():
+    guard = UpstreamGuard("test", budget_seconds=0.05, max_in_flight=2, max_queue=2)
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "late"
+
+    assert asyncio.run(guard.run(slow)) is None
+    assert guard.metrics()["budget_exceeded"] == 1
+
+
+def test_open_breaker_short_circuits_without_calling():
+    guard = UpstreamGuard("test", budget_seconds=1, max_in_flight=2, max_queue=2,
+                          breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60))
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    asyncio.run(guard.run(failing))
+    assert asyncio.run(guard.run(failing)) is None
+
+    assert len(calls) == 1
+    assert guard.metrics()["breaker_state"] == OPEN
+    assert guard.metrics()["short_circuited"] == 1
+
+
+def test_limiter_sheds_once_the_queue_is_full():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=1, retry_after=3)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter:
+                await release.wait()
+
+        running = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.waiting) == (1, 1)
+
+        with pytest.raises(UpstreamOverloaded) as shed:
+            async with limiter:
+                pass
+
+        release.set()
+        await asyncio.gather(*running)
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert (shed.upstream, shed.retry_after) == ("test", 3)
+    assert limiter.metrics() == {"in_flight": 0, "max_in_flight": 1, "queued": 0, "shed": 1}
@@ -0,0 +1,223 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+from utils.upstream_guard import UpstreamOverloaded
+
+# Who a queued call belongs to ("session:<id>", "bulk:<id>", "outbox", ...);
+# waiting calls are granted round-robin across flows
+request_flow = ContextVar("request_flow", default="default")
+
+
+def parse_retry_after(value, now=None):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency window for one upstream that finds its own size.
+
+    AIMD: while calls keep the window full and come back fast, the window
+    grows by about one slot per window's worth of successes; a throttle
+    response (429/503) halves it, and latency well above the best recently
+    seen trims it. Decreases are spaced at least one typical round trip
+    apart, so a burst of throttles from one overload counts once. Near the
+    size that was last throttled the window grows fifty times slower, as
+    every overshoot costs a Retry-After pause.
+
+    A Retry-After pauses all dispatch until it passes. Waiting calls are
+    queued per request_flow and granted round-robin, so one bulk upload
+    cannot starve interactive sessions. Beyond `max_queue` waiters new
+    calls are refused with UpstreamOverloaded.
+    """
+
+    LATENCY_WINDOW = 100
+    BACKOFF = 0.5
+    LATENCY_BACKOFF = 0.9
+    PROBE_SLOWDOWN = 0.02
+
+    def __init__(self, name, initial, min_limit=1, max_limit=64, max_queue=50,
+                 retry_after=1, latency_tolerance=2.0, max_retry_after=60,
+                 clock=time.monotonic):
+        self.name = name
+        self.limit = float(initial)
+        self._min = min_limit
+        self._max = max_limit
+        self._max_queue = max_queue
+        self._retry_after = retry_after
+        self._tolerance = latency_tolerance
+        self._max_pause = max_retry_after
+        self._clock = clock
+
+        self._flows = OrderedDict()
+        # Latency floors are kept per kind of call; a batch POST and a
+        # lookup GET are not comparable
+        self._latencies = {}
+        self._typical = {}
+        self._smoothed = None
+        self._last_decrease = float("-inf")
+        self._throttled_at = float("inf")
+        self._paused_until = 0.0
+        self._resume = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.counters = {
+            "shed": 0,
+            "throttled": 0,
+            "paused": 0,
+            "increases": 0,
+            "decreases": 0,
+            "slow": 0
+        }
+
+    # ---------------- ADMISSION ----------------
+    def _free(self):
+        return self.in_flight < int(self.limit) and self._clock() >= self._paused_until
+
+    def check(self):
+        if self.waiting >= self._max_queue and not self._free():
+            self.counters["shed"] += 1
+            raise UpstreamOverloaded(self.name, self._retry_after)
+
+    async def acquire(self):
+        if not self.waiting and self._free():
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._flows.setdefault(request_flow.get(), deque()).append(waiter)
+        self.waiting += 1
+        # Nothing may be in flight to wake us (e.g. paused with an empty
+        # window), so make sure a resume is scheduled
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self._release_slot()
+            else:
+                self._forget(waiter)
+            raise
+
+    def _forget(self, waiter):
+        for flow, queue in self._flows.items():
+            if waiter in queue:
+                queue.remove(waiter)
+                self.waiting -= 1
+                if not queue:
+                    del self._flows[flow]
+                return
+
+    def _dispatch(self):
+        while self._flows and self._free():
+            flow, queue = next(iter(self._flows.items()))
+            waiter = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._flows.move_to_end(flow)
+            else:
+                del self._flows[flow]
+
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+        if self._flows and self._clock() < self._paused_until and self._resume is None:
+            loop = asyncio.get_running_loop()
+            self._resume = loop.call_later(
+                self._paused_until - self._clock(), self._resume_dispatch
+            )
+
+    def _resume_dispatch(self):
+        self._resume = None
+        self._dispatch()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    # ---------------- FEEDBACK ----------------
+    def _decrease(self, factor):
+        now = self._clock()
+        if now - self._last_decrease < (self._smoothed or 0):
+            return False
+        self._last_decrease = now
+        self.limit = max(self._min, self.limit * factor)
+        self.counters["decreases"] += 1
+        return True
+
+    def release(self, latency=None, kind=None, throttled=False, retry_after=None,
+                failed=False):
+        """
+        Return a slot with what the call saw: its latency and kind of call
+        (for the latency signal), whether the upstream throttled it and
+        the Retry-After it asked for, or that it failed outright.
+        """
+        saturated = self.in_flight >= int(self.limit)
+
+        if throttled:
+            self.counters["throttled"] += 1
+            before = self.limit
+            if self._decrease(self.BACKOFF):
+                self._throttled_at = before
+            if retry_after:
+                pause = min(retry_after, self._max_pause)
+                self._paused_until = max(self._paused_until, self._clock() + pause)
+                self.counters["paused"] += 1
+        elif failed:
+            # Timeouts and dropped connections are congestion too
+            self._decrease(self.BACKOFF)
+        elif latency is not None and self._slow(latency, kind):
+            self.counters["slow"] += 1
+            self._decrease(self.LATENCY_BACKOFF)
+        elif saturated and self.limit < self._max:
+            step = 1 / self.limit
+            if self.limit >= 0.9 * self._throttled_at:
+                step *= self.PROBE_SLOWDOWN
+            self.limit = min(self._max, self.limit + step)
+            self.counters["increases"] += 1
+
+        self._release_slot()
+
+    def _slow(self, latency, kind):
+        self._smoothed = latency if self._smoothed is None else (
+            0.9 * self._smoothed + 0.1 * latency
+        )
+        samples = self._latencies.get(kind)
+        if samples is None:
+            samples = self._latencies[kind] = deque(maxlen=self.LATENCY_WINDOW)
+            self._typical[kind] = latency
+        samples.append(latency)
+
+        # Judge the trend, not one unlucky call
+        typical = self._typical[kind] = 0.8 * self._typical[kind] + 0.2 * latency
+        return len(samples) > 10 and typical > min(samples) * self._tolerance
+
+    def metrics(self):
+        paused_for = max(0.0, self._paused_until - self._clock())
+        return {
+            "window": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.waiting,
+            "queued_flows": len(self._flows),
+            "paused_seconds": round(paused_for, 3),
+            "latency_floor_seconds": {
+                kind: round(min(samples), 4) for kind, samples in self._latencies.items()
+            },
+            **self.counters
+        }
@@ -1,6 +1,39 @@
 import base64
 
+from fastapi import HTTPException, Depends
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+
+from config.fusion_settings import get_settings
+from utils.metrics import stage_seconds
+
+security = HTTPBasic()
+
 def get_basic_auth_header(username, password):
     auth_str = f"{username}:{password}"
     encoded = base64.b64encode(auth_str.encode()).decode()
     return f"Basic {encoded}"
+
+
+def credentials_valid(username, password):
+    settings = get_settings()
+    return username == settings.agent_username and password == settings.agent_password
+
+
+def basic_auth_user(header):
+    """The user a raw `Authorization: Basic ...` header value authenticates, else None."""
+    scheme, _, encoded = header.partition(b" ")
+    if scheme.lower() != b"basic":
+        return None
+    try:
+        decoded = base64.b64decode(encoded.strip(), validate=True).decode()
+    except ValueError:
+        return None
+    username, _, password = decoded.partition(":")
+    return username if credentials_valid(username, password) else None
+
+
+def authenticate_user(credentials: HTTPBasicCredentials = Depends(security)):
+    with stage_seconds.time("auth"):
+        if credentials_valid(credentials.username, credentials.password):
+            return credentials.username
+    raise HTTPException(status_code=401, detail="Unauthorized")
@@ -0,0 +1,55 @@
+import hashlib
+import math
+import struct
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for `capacity` keys at `error_rate` false positives; "not
+    present" answers are always exact. Bits live in a bytearray so the
+    whole filter can be persisted with to_bytes()/from_bytes().
+    """
+
+    # One 32-bit slice of a blake2b digest per probe (so up to 2**32 bits)
+    MAX_HASHES = 16
+
+    def __init__(self, capacity, error_rate=0.01, bits=None, hashes=None):
+        self.size = bits or max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or min(
+            self.MAX_HASHES, max(1, round(self.size / capacity * math.log(2)))
+        )
+        self._bits = bytearray((self.size + 7) // 8)
+        self._unpack = struct.Struct(f"<{self.hashes}I").unpack
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.hashes).digest()
+        size = self.size
+        return [h % size for h in self._unpack(digest)]
+
+    def add(self, key):
+        """Set the key's bits; True if any was unset (the key is new)."""
+        bits, new = self._bits, False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        return new
+
+    def __contains__(self, key):
+        bits = self._bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def to_bytes(self):
+        return bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data, bits, hashes):
+        bloom = cls(capacity=1, bits=bits, hashes=hashes)
+        bloom._bits = bytearray(data)
+        return bloom
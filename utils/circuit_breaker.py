@@ -0,0 +1,73 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failures.
+
+    Once `reset_seconds` have passed, a single probe call is let through;
+    its outcome either closes the breaker again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30, clock=time.monotonic):
+        self._threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self._reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self._reset_seconds:
+                    return False
+                self._state = HALF_OPEN
+
+            # Half-open: one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+
+            if self._state == HALF_OPEN or self._failures >= self._threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def release(self):
+        # Call was abandoned (e.g. caller cancelled) without an outcome
+        with self._lock:
+            self._probe_in_flight = False
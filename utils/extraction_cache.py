@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config.fusion_settings import get_settings
+
+settings = get_settings()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(text):
+    # Retries and copy-pastes differ mostly in unicode forms and spacing;
+    # case is kept because it is part of the supplier name.
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of LLM extraction results.
+
+    Keys hash the normalized input together with the model name and the
+    request config (prompt, response schema, generation settings), so
+    editing any of them or switching models never serves a stale answer.
+    Entries live in an in-memory LRU and, when `path` is set, in a SQLite
+    file that survives restarts and is shared by workers.
+    """
+
+    def __init__(self, max_entries=settings.extraction_cache_size,
+                 ttl_seconds=settings.extraction_cache_ttl_seconds,
+                 path=settings.extraction_cache_path):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (expires_at, result), oldest first
+        self._entries = OrderedDict()
+        self._path = path
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " result TEXT NOT NULL"
+                ") WITHOUT ROWID"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(text, model, config):
+        digest = hashlib.sha256()
+        for part in (model, config, normalize_input(text)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._entries[key]
+
+        if self._path:
+            row = self._conn().execute(
+                "SELECT expires_at, result FROM extractions"
+                " WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+
+            if row is not None:
+                result = json.loads(row[1])
+                self._remember(key, row[0], result)
+                with self._lock:
+                    self.disk_hits += 1
+                return dict(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        expires_at = time.time() + self._ttl
+        self._remember(key, expires_at, dict(result))
+
+        if self._path:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO extractions (key, expires_at, result)"
+                " VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(result))
+            )
+
+    def _remember(self, key, expires_at, result):
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (self.hits + self.disk_hits) / lookups if lookups else 0.0
+                )
+            }
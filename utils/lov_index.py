@@ -0,0 +1,140 @@
+import heapq
+import re
+from collections import defaultdict
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_key(value):
+    # "U.S.A." -> "usa", "  United   States " -> "united states"
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub("", value.lower())).strip()
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, bound):
+    """Edit distance between a and b, or bound + 1 once it exceeds bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+
+    # Typos leave most of the word intact; drop the shared prefix and
+    # suffix so the DP only covers the few characters that differ
+    start, end_a, end_b = 0, len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return min(len(b), bound + 1)
+
+    # Only cells within `bound` of the diagonal can stay under the bound
+    too_far = bound + 1
+    previous = [j if j <= bound else too_far for j in range(len(a) + 1)]
+
+    for i in range(1, len(b) + 1):
+        cb = b[i - 1]
+        low, high = max(1, i - bound), min(len(a), i + bound)
+        current = [too_far] * (len(a) + 1)
+        if i <= bound:
+            current[0] = i
+
+        row_min = current[0]
+        left = current[low - 1]
+        for j in range(low, high + 1):
+            # Inlined min() of substitute / delete / insert
+            cost = previous[j - 1] + (a[j - 1] != cb)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if left + 1 < cost:
+                cost = left + 1
+            current[j] = left = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > bound:
+            return too_far
+        previous = current
+
+    return min(previous[-1], too_far)
+
+
+class LovIndex:
+    """
+    Resolves free-text values to one canonical LOV value.
+
+    Lookups try an exact match on the normalized key first, then use a
+    trigram inverted index to shortlist a handful of keys and confirm them
+    with a bounded edit distance. Only the shortlisted keys are compared,
+    so lookups stay fast as the LOV grows.
+    """
+
+    MAX_CANDIDATES = 8
+    MAX_DISTANCE = 2
+
+    def __init__(self, entries):
+        """entries: iterable of (alias or value, canonical value)"""
+        self._exact = {}
+        self._postings = defaultdict(list)
+
+        for alias, canonical in entries:
+            key = normalize_key(alias)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = canonical
+            for gram in trigrams(key):
+                self._postings[gram].append(key)
+
+    def __len__(self):
+        return len(self._exact)
+
+    def match(self, value):
+        """Return (canonical, confidence) or (None, 0.0)."""
+        if not isinstance(value, str):
+            return None, 0.0
+
+        key = normalize_key(value)
+        if not key:
+            return None, 0.0
+
+        canonical = self._exact.get(key)
+        if canonical is not None:
+            return canonical, 1.0
+
+        bound = min(self.MAX_DISTANCE, max(1, len(key) // 4))
+
+        grams = trigrams(key)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                overlap[candidate] += 1
+
+        # q-gram lemma: each edit destroys at most three trigrams, so a key
+        # within `bound` edits must share this many with the query
+        floor = max(1, len(grams) - 3 * bound)
+        shortlist = heapq.nlargest(
+            self.MAX_CANDIDATES,
+            (
+                (n, c) for c, n in overlap.items()
+                if n >= floor and abs(len(c) - len(key)) <= bound
+            )
+        )
+
+        best, best_distance = None, bound + 1
+        for _, candidate in shortlist:
+            distance = bounded_levenshtein(key, candidate, bound)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+
+        if best is None:
+            return None, 0.0
+
+        confidence = 1 - best_distance / max(len(key), len(best))
+        return self._exact[best], confidence
@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; from a cache hit to a slow Fusion POST
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_metrics = []
+_collectors = []
+
+# A list while a profiler records the current request; traced histograms
+# append (labels, seconds) to it
+stage_trace = ContextVar("stage_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    ) + "}"
+
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: an observation is one bisect and a few
+    increments, however many have been recorded.
+
+    Besides the Prometheus buckets it renders a `<name>_quantile` gauge
+    with p50/p95/p99 estimated from the buckets, for dashboards that do not
+    run histogram_quantile().
+    """
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, traced=False):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.traced = traced
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+        if self.traced:
+            trace = stage_trace.get()
+            if trace is not None:
+                trace.append((label_values, value))
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def quantile(self, q, *label_values):
+        """Estimate from the buckets, interpolating inside the one that holds q."""
+        with self._lock:
+            series = self._series.get(label_values)
+            counts = list(series[0]) if series else []
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted(
+                (label_values, list(counts), total)
+                for label_values, (counts, total) in self._series.items()
+            )
+
+        names = self.labels + ("le",)
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _labels(names, label_values + (_number(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_number(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+        yield f"# HELP {self.name}_quantile {self.help} (estimated quantiles)"
+        yield f"# TYPE {self.name}_quantile gauge"
+        names = self.labels + ("quantile",)
+        for label_values, _, _ in series:
+            for q in QUANTILES:
+                value = self.quantile(q, *label_values)
+                labels = _labels(names, label_values + (q,))
+                yield f"{self.name}_quantile{labels} {_number(value)}"
+
+
+@contextmanager
+def traced_stages():
+    """
+    The list this request's traced stage observations go to, shared with
+    any outer tracer (profiler, recorder); read from the length it had on
+    entry to get only your own.
+    """
+    trace = stage_trace.get()
+    if trace is not None:
+        yield trace
+        return
+
+    trace = []
+    token = stage_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        stage_trace.reset(token)
+
+
+def register_collector(collector):
+    """
+    `collector()` returns [(name, type, help, label names, {label values: value})]
+    read at scrape time from stats a module already keeps. Collectors may
+    report different series of the same metric.
+    """
+    _collectors.append(collector)
+
+
+def render_metrics():
+    """Everything registered, in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    collected = {}
+    for collector in _collectors:
+        for name, kind, help, label_names, values in collector():
+            if name not in collected:
+                collected[name] = (kind, help, label_names, {})
+            collected[name][3].update(values)
+
+    for name, (kind, help, label_names, values) in collected.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for label_values, value in values.items():
+            lines.append(f"{name}{_labels(label_names, label_values)} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- SHARED METRICS ----------------
+stage_seconds = Histogram(
+    "supplier_agent_stage_seconds",
+    "Time spent in each stage of a request",
+    labels=("stage",),
+    traced=True
+)
+state_transitions = Counter(
+    "supplier_agent_state_transitions_total",
+    "Conversation turns by state before and after the turn",
+    labels=("from_state", "to_state")
+)
+upstream_responses = Counter(
+    "supplier_agent_upstream_responses_total",
+    "Upstream calls by response code (\"error\" when no response came back)",
+    labels=("upstream", "code")
+)
+
+
+def cache_metrics(cache, lookups, hits):
+    """Collector rows for a cache: lookups by result and the hit ratio."""
+    total = sum(lookups.values())
+    return [
+        ("supplier_agent_cache_lookups_total", "counter",
+         "Cache lookups by result", ("cache", "result"),
+         {(cache, result): count for result, count in lookups.items()}),
+        ("supplier_agent_cache_hit_ratio", "gauge",
+         "Share of cache lookups answered from the cache", ("cache",),
+         {(cache,): hits / total if total else 0.0})
+    ]
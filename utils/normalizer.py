@@ -1,46 +1,61 @@
+from config.fusion_settings import LOV_ALIASES
+from lov_cache import lov_cache
+from utils.metrics import stage_seconds
+
+FUSION_TAX_ORG_TYPE = LOV_ALIASES["TaxOrganizationType"]
+FUSION_SUPPLIER_TYPE = LOV_ALIASES["SupplierType"]
+FUSION_COUNTRY = LOV_ALIASES["TaxpayerCountry"]
+
+# Fuzzy matches below this are left for the user (or validator) to fix
+MIN_LOV_CONFIDENCE = 0.8
+
+
+def normalize(value, mapping):
+    if not value:
+        return None
+    key = value.strip().lower()
+    return mapping.get(key)
+
+
+def normalize_lov_value(field, value):
+    canonical, confidence = lov_cache.match(field, value)
+    return canonical if confidence >= MIN_LOV_CONFIDENCE else None
+
+
+@stage_seconds.time("normalization")
+def normalize_lov_fields(session: dict, fields=None) -> dict:
+    """
+    Replace free-text LOV answers ("U.S.A.", "Corporations") with the
+    canonical Fusion value; unrecognised values are left for validation.
+    Only `fields` are looked at when given.
+    """
+    fuzzy = lov_cache.fuzzy
+    for field in fuzzy if fields is None else [f for f in fields if f in fuzzy]:
+        canonical = normalize_lov_value(field, session.get(field))
+        if canonical:
+            session[field] = canonical
+    return session
+
+
 def normalize_supplier_payload(payload: dict) -> dict:
     """
     Normalize LLM output to Oracle Fusion LOV-compliant values
     """
 
-    FUSION_TAX_ORG_TYPE = {
-        "corporation": "Corporation",
-        "corp": "Corporation",
-        "company": "Corporation"
-    }
-
-    FUSION_SUPPLIER_TYPE = {
-        "services": "Services",
-        "service": "Services",
-        "provided services": "Services"
-    }
-
-    FUSION_COUNTRY = {
-        "us": "United States",
-        "usa": "United States",
-        "united states": "United States"
-    }
-
-    def normalize(value, mapping):
-        if not value:
-            return None
-        key = value.strip().lower()
-        return mapping.get(key)
-
     # 🔒 FORCE Fusion-approved values
-    payload["TaxOrganizationType"] = normalize(
-        payload.get("TaxOrganizationType"),
-        FUSION_TAX_ORG_TYPE
+    payload["TaxOrganizationType"] = normalize_lov_value(
+        "TaxOrganizationType",
+        payload.get("TaxOrganizationType")
     )
 
-    payload["SupplierType"] = normalize(
-        payload.get("SupplierType"),
-        FUSION_SUPPLIER_TYPE
+    payload["SupplierType"] = normalize_lov_value(
+        "SupplierType",
+        payload.get("SupplierType")
     )
 
-    payload["TaxpayerCountry"] = normalize(
-        payload.get("TaxpayerCountry"),
-        FUSION_COUNTRY
+    payload["TaxpayerCountry"] = normalize_lov_value(
+        "TaxpayerCountry",
+        payload.get("TaxpayerCountry")
     )
 
     # Defaults
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+from config.fusion_settings import get_settings
+from utils.auth import basic_auth_user
+from utils.metrics import traced_stages
+
+settings = get_settings()
+
+PROFILE_HEADER = b"x-profile"
+
+# The profile of the request being handled, if it is being profiled
+current_profile = ContextVar("current_profile", default=None)
+
+# One profile at a time: samples cover the whole event loop thread
+_busy = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds and counts
+    each distinct stack, root first, in the folded format flamegraph.pl,
+    speedscope and inferno read ("a;b;c 12").
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._done = threading.Event()
+        self.stacks = Counter()
+
+    def run(self):
+        while not self._done.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_qualname} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+class RequestProfile:
+    def __init__(self, path):
+        self.id = f"{int(time.time())}-{uuid.uuid4().hex[:12]}"
+        self.path = path
+        # (labels, seconds) stage observations, filled while recording
+        self.stages = []
+        self.notes = {}
+        self.started = time.time()
+        self._sampler = StackSampler(threading.get_ident(), settings.profile_interval_seconds)
+
+    def start(self):
+        self._sampler.start()
+
+    def finish(self, status):
+        stacks = self._sampler.stop()
+        elapsed = time.time() - self.started
+        meta = {
+            "id": self.id,
+            "path": self.path,
+            "status": status,
+            "started": self.started,
+            "seconds": elapsed,
+            "interval_seconds": settings.profile_interval_seconds,
+            "samples": sum(stacks.values()),
+            "stages": [
+                {"stage": labels[0] if labels else None, "seconds": seconds}
+                for labels, seconds in self.stages
+            ],
+            **self.notes
+        }
+        return meta, stacks
+
+
+def profile_note(**notes):
+    """Attach context (session id, state, ...) to the current profile, if any."""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.notes.update(notes)
+
+
+def write_profile(meta, stacks, directory=settings.profile_dir,
+                  max_files=settings.profile_max_files):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, meta["id"])
+
+    with open(base + ".folded", "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(base + ".json", "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    # Keep only the newest `max_files` profiles
+    profiles = sorted(
+        (entry.stat().st_mtime, entry.name[:-len(".json")])
+        for entry in os.scandir(directory) if entry.name.endswith(".json")
+    )
+    for _, old in profiles[:-max(1, max_files)]:
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except FileNotFoundError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests to `paths` that send `X-Profile: 1`, or fall in the
+    profile_sample_rate sample, and answers them with an X-Profile-Id
+    header naming the files written under profile_dir: `<id>.folded`
+    stacks plus `<id>.json` with the stage timings and whatever the
+    endpoint attached with profile_note().
+
+    Only requests carrying the agent's credentials are profiled, so
+    anonymous callers cannot fill profile_dir or hold the profiling slot.
+    Stacks are sampled from the event loop thread, so other requests
+    running at the same time show up too; a profile is only taken while
+    no other one is running. Installed only when PROFILING_ENABLED, so it
+    costs nothing otherwise.
+    """
+
+    def __init__(self, app, paths=("/supplier-agent",)):
+        self.app = app
+        self.paths = tuple(paths)
+
+    def _wanted(self, scope):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return False
+        headers = dict(scope["headers"])
+        if basic_auth_user(headers.get(b"authorization", b"")) is None:
+            return False
+        requested = headers.get(PROFILE_HEADER)
+        if requested is not None:
+            return requested.strip().lower() in (b"1", b"true", b"yes")
+        rate = settings.profile_sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if not self._wanted(scope) or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["path"])
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode())
+                ]
+            await send(message)
+
+        profile_token = current_profile.set(profile)
+        try:
+            with traced_stages() as trace:
+                start = len(trace)
+                profile.start()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    current_profile.reset(profile_token)
+                    profile.stages = trace[start:]
+                    meta, stacks = profile.finish(status)
+        finally:
+            _busy.release()
+
+        try:
+            await asyncio.to_thread(write_profile, meta, stacks)
+        except OSError:
+            logging.exception("Could not write profile %s", profile.id)
@@ -0,0 +1,151 @@
+import re
+
+from config.fusion_settings import SUPPLIER_FIELDS
+from utils.normalizer import (
+    FUSION_TAX_ORG_TYPE,
+    FUSION_SUPPLIER_TYPE,
+    FUSION_COUNTRY,
+    normalize
+)
+
+FIELD_ALIASES = {
+    field: spec["labels"] for field, spec in SUPPLIER_FIELDS.items() if "labels" in spec
+}
+
+# Words that may be left over once every field is consumed
+FILLER_WORDS = {
+    "a", "an", "and", "the", "with", "for", "of", "its", "it", "is", "are",
+    "please", "create", "new", "add", "set", "up", "supplier", "details",
+    "hi", "hello", "thanks", "thank", "you", "ok", "okay"
+}
+
+
+def _alternation(words):
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+_KEY_TO_FIELD = {
+    alias: field
+    for field, aliases in FIELD_ALIASES.items()
+    for alias in aliases
+}
+
+KEY_PATTERN = re.compile(
+    rf"(?<![\w-])(?P<key>{_alternation(_KEY_TO_FIELD)})(?![\w-])"
+    r"\s*(?P<sep>[:=#]|is\b)?\s*",
+    re.IGNORECASE
+)
+
+# A labelled value only counts if it has the shape Fusion expects
+VALUE_PATTERNS = {
+    "DUNSNumber": re.compile(r"\d{2}-?\d{3}-?\d{4}(?![\d-])"),
+    "TaxpayerId": re.compile(r"\d{2}-\d{7,8}(?![\d-])"),
+    "TaxpayerCountry": re.compile(
+        rf"(?:{_alternation(FUSION_COUNTRY)})(?!\w)", re.IGNORECASE
+    ),
+    "TaxOrganizationType": re.compile(
+        rf"(?:{_alternation(FUSION_TAX_ORG_TYPE)})(?!\w)", re.IGNORECASE
+    ),
+    "SupplierType": re.compile(
+        rf"(?:{_alternation(FUSION_SUPPLIER_TYPE)})(?!\w)", re.IGNORECASE
+    )
+}
+
+VALUE_NORMALIZERS = {
+    "DUNSNumber": lambda v: v.replace("-", ""),
+    "TaxpayerId": lambda v: v,
+    "TaxpayerCountry": lambda v: normalize(v, FUSION_COUNTRY),
+    "TaxOrganizationType": lambda v: normalize(v, FUSION_TAX_ORG_TYPE),
+    "SupplierType": lambda v: normalize(v, FUSION_SUPPLIER_TYPE)
+}
+
+# Identifiers are distinctive enough to pick up without a label
+UNLABELLED_PATTERNS = {
+    "TaxpayerId": re.compile(r"(?<![\d-])\d{2}-\d{7,8}(?![\d-])"),
+    "DUNSNumber": re.compile(r"(?<![\d-])\d{9}(?![\d-])")
+}
+
+# Supplier names run to the end of the clause, but keep "Acme, Inc."
+SUPPLIER_END = re.compile(
+    r"[;\n]|,(?!\s*(?:inc|llc|ltd|limited|corp|co|gmbh|plc|llp|lp|ag|s\.?a)\b)",
+    re.IGNORECASE
+)
+
+# Free-text that reads like a sentence rather than a name is left to the LLM
+SENTENCE_WORDS = {
+    "they", "them", "their", "based", "located", "who", "which", "that",
+    "is", "are", "was", "from", "in", "at", "should", "will", "would"
+}
+MAX_NAME_WORDS = 8
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def _strip_spans(text, spans):
+    pieces, cursor = [], 0
+    for start, end in spans:
+        pieces.append(text[cursor:start])
+        cursor = end
+    pieces.append(text[cursor:])
+    return " ".join(pieces)
+
+
+def extract_with_rules(text: str):
+    """
+    Pull supplier fields out of structured text without an LLM.
+
+    Returns (fields, complete). `complete` is True only when every
+    meaningful word of the message was accounted for, so nothing is left
+    that an LLM could still extract.
+    """
+    fields = {}
+    consumed = []
+
+    matches = [
+        m for m in KEY_PATTERN.finditer(text)
+        # A bare "supplier" is too common a word to treat as a label
+        if m.group("sep") or _KEY_TO_FIELD[m.group("key").lower()] != "Supplier"
+    ]
+
+    for i, match in enumerate(matches):
+        field = _KEY_TO_FIELD[match.group("key").lower()]
+        if field in fields:
+            continue
+
+        limit = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        value_text = text[match.end():limit]
+
+        if field == "Supplier":
+            end = SUPPLIER_END.search(value_text)
+            length = end.start() if end else len(value_text)
+            value = value_text[:length].strip().strip("\"'").strip()
+            words = WORD.findall(value.lower())
+            if len(words) > MAX_NAME_WORDS or SENTENCE_WORDS.intersection(words):
+                continue
+        else:
+            found = VALUE_PATTERNS[field].match(value_text)
+            if not found:
+                continue
+            length = found.end()
+            value = VALUE_NORMALIZERS[field](found.group())
+
+        if value:
+            fields[field] = value
+            consumed.append((match.start(), match.end() + length))
+
+    residual = _strip_spans(text, consumed)
+
+    for field, pattern in UNLABELLED_PATTERNS.items():
+        if field in fields:
+            continue
+        found = pattern.findall(residual)
+        if len(found) == 1:
+            fields[field] = found[0]
+            residual = pattern.sub(" ", residual)
+
+    leftover = [
+        w for w in WORD.findall(residual.lower())
+        if w not in FILLER_WORDS
+    ]
+
+    return fields, not leftover
@@ -15,3 +15,8 @@ def merge_session(session, extracted):
 
 def get_missing_fields(session):
     return [f for f in REQUIRED_FIELDS if not session.get(f)]
+
+
+def reset_session(active_session, **state):
+    active_session.clear()
+    active_session.update(state or {"state": "INIT"})
@@ -0,0 +1,264 @@
+import marshal
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config.fusion_settings import get_settings
+
+settings = get_settings()
+
+# Bump when the layout of a stored conversation changes
+CODEC_VERSION = 1
+
+
+class SessionConflict(Exception):
+    """Another turn saved the same session after we loaded it."""
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def encode_conversation(conversation):
+    # Conversations only hold str/bool/None/dict/list values, which marshal
+    # writes far more compactly (and faster) than JSON or pickle.
+    return bytes((CODEC_VERSION,)) + marshal.dumps(conversation, 4)
+
+
+def decode_conversation(blob):
+    if not blob or blob[0] != CODEC_VERSION:
+        return None
+    return marshal.loads(blob[1:])
+
+
+class _Shard:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # session_id -> (expires_at, version, blob), oldest access first
+        self.entries = OrderedDict()
+
+
+class SessionStore:
+    """
+    In-process conversation store keyed by sessionId.
+
+    Sessions are spread over shards that each hold their own lock, so
+    concurrent turns on different conversations rarely contend. Every shard
+    keeps its entries in access order, which makes both idle-TTL expiry and
+    LRU eviction a pop from the front of the shard.
+
+    Conversations are stored encoded, so every load hands out a private copy
+    and racing turns are caught by the version check in save().
+    """
+
+    def __init__(self, shards=settings.session_shards,
+                 max_entries=settings.session_max_entries,
+                 ttl_seconds=settings.session_ttl_seconds, clock=time.monotonic):
+        shard_count = 1
+        while shard_count < max(1, shards):
+            shard_count *= 2
+
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._mask = shard_count - 1
+        self._shard_capacity = max(1, -(-max_entries // shard_count))
+        self._ttl = ttl_seconds
+        self._clock = clock
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) & self._mask]
+
+    def _evict(self, shard, now):
+        entries = shard.entries
+
+        # Expired entries are always at the front: TTL is idle-based and
+        # every access moves an entry to the back.
+        while entries:
+            expires_at = next(iter(entries.values()))[0]
+            if expires_at > now:
+                break
+            entries.popitem(last=False)
+
+        while len(entries) > self._shard_capacity:
+            entries.popitem(last=False)
+
+    def load(self, session_id):
+        if not session_id:
+            return None, 0
+
+        shard = self._shard(session_id)
+        now = self._clock()
+
+        with shard.lock:
+            entry = shard.entries.get(session_id)
+            if entry is None:
+                return None, 0
+
+            expires_at, version, blob = entry
+            if expires_at <= now:
+                del shard.entries[session_id]
+                return None, 0
+
+            shard.entries[session_id] = (now + self._ttl, version, blob)
+            shard.entries.move_to_end(session_id)
+
+        return decode_conversation(blob), version
+
+    def save(self, session_id, conversation, version):
+        blob = encode_conversation(conversation)
+        shard = self._shard(session_id)
+        now = self._clock()
+
+        with shard.lock:
+            entry = shard.entries.get(session_id)
+            current = entry[1] if entry and entry[0] > now else 0
+            if current != version:
+                raise SessionConflict(session_id)
+
+            shard.entries[session_id] = (now + self._ttl, version + 1, blob)
+            shard.entries.move_to_end(session_id)
+            self._evict(shard, now)
+
+        return version + 1
+
+    def delete(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.entries.pop(session_id, None)
+
+    def purge_expired(self):
+        now = self._clock()
+        for shard in self._shards:
+            with shard.lock:
+                self._evict(shard, now)
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+
+class SQLiteSessionStore:
+    """
+    Conversation store shared by every worker process on the host.
+
+    Uses one SQLite file in WAL mode so readers never block the writer, and
+    a version column for optimistic concurrency: save() only succeeds if the
+    row still carries the version the turn started from.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path=settings.session_db_path,
+                 max_entries=settings.session_max_entries,
+                 ttl_seconds=settings.session_ttl_seconds):
+        self._path = path
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " data BLOB NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at"
+            " ON sessions (expires_at)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(
+                self._path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, session_id):
+        if not session_id:
+            return None, 0
+
+        row = self._conn().execute(
+            "SELECT version, data FROM sessions"
+            " WHERE id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+
+        if row is None:
+            return None, 0
+
+        return decode_conversation(row[1]), row[0]
+
+    def save(self, session_id, conversation, version):
+        blob = encode_conversation(conversation)
+        now = time.time()
+        conn = self._conn()
+
+        if version == 0:
+            # New (or expired) session: claim the row unless a live one exists
+            cursor = conn.execute(
+                "INSERT INTO sessions (id, version, expires_at, data)"
+                " VALUES (?, 1, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET"
+                " version = 1, expires_at = excluded.expires_at,"
+                " data = excluded.data"
+                " WHERE sessions.expires_at <= ?",
+                (session_id, now + self._ttl, blob, now)
+            )
+        else:
+            cursor = conn.execute(
+                "UPDATE sessions SET version = version + 1,"
+                " expires_at = ?, data = ?"
+                " WHERE id = ? AND version = ? AND expires_at > ?",
+                (now + self._ttl, blob, session_id, version, now)
+            )
+
+        if cursor.rowcount != 1:
+            raise SessionConflict(session_id)
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+        return version + 1
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge_expired(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+        # expires_at moves forward on every save, so it doubles as LRU order
+        conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            " SELECT id FROM sessions ORDER BY expires_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self._max_entries,)
+        )
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(backend=settings.session_backend):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return SessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
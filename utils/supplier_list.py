@@ -0,0 +1,111 @@
+import re
+
+from utils.rule_extractor import FIELD_ALIASES, KEY_PATTERN, UNLABELLED_PATTERNS
+
+# A table header names its columns and carries no identifiers
+_HEADER = re.compile(r"[^\d\n]*[|,;\t][^\d\n]*")
+# A table or CSV row: one line of delimited cells
+_ROW = re.compile(r"[^\n]*[|,;\t][^\n]*")
+# Markdown table rule under the header: | --- | :---: |
+_RULE = re.compile(r"[\s|:+-]*-[\s|:+-]*")
+_BLANK_LINES = re.compile(r"\n\s*\n")
+_LETTER = re.compile(r"[^\W\d_]")
+
+_LABEL_TO_FIELD = {
+    label: field for field, labels in FIELD_ALIASES.items() for label in labels
+}
+
+
+def labelled_field(line):
+    """The field a `Label: value` line gives, else None."""
+    match = KEY_PATTERN.match(line)
+    if not match or match.group("sep") not in (":", "=", "#"):
+        return None
+    return _LABEL_TO_FIELD[match.group("key").lower()]
+
+
+def group_fields(lines):
+    """
+    Lines with `Label: value` lines joined to the entry above them, so a
+    supplier typed one field per line (under its name or not) is one
+    entry. A label already in the entry starts the next supplier.
+    """
+    entries, entry, labels = [], [], set()
+    for line in lines:
+        field = labelled_field(line)
+        if entry and (field is None or field in labels):
+            entries.append("\n".join(entry))
+            entry, labels = [], set()
+        entry.append(line)
+        if field:
+            labels.add(field)
+    if entry:
+        entries.append("\n".join(entry))
+    return entries
+
+
+def split_entries(text):
+    """
+    (header, entries) for a pasted list or table. Blank-line separated
+    blocks are one supplier each; without blank lines every line is, bar
+    runs of `Label: value` lines (see group_fields).
+    """
+    if _BLANK_LINES.search(text.strip()):
+        entries = [block.strip() for block in _BLANK_LINES.split(text)]
+    else:
+        lines = [line.strip() for line in text.splitlines()]
+        entries = group_fields([
+            line for line in lines if line and not _RULE.fullmatch(line)
+        ])
+    entries = [e for e in entries if e and not _RULE.fullmatch(e)]
+
+    header = None
+    if len(entries) > 1 and _HEADER.fullmatch(entries[0]):
+        header = entries.pop(0)
+    return header, entries
+
+
+def _identified(entry):
+    return any(pattern.search(entry) for pattern in UNLABELLED_PATTERNS.values())
+
+
+def _named(entry):
+    """A labelled supplier name, or a first line that opens with one."""
+    lines = entry.splitlines()
+    if any(labelled_field(line) == "Supplier" for line in lines):
+        return True
+
+    first = lines[0]
+    if KEY_PATTERN.match(first):
+        return False
+    starts = [m.start() for p in UNLABELLED_PATTERNS.values() for m in p.finditer(first)]
+    return bool(_LETTER.search(first[:min(starts, default=len(first))]))
+
+
+def looks_like_supplier_list(text):
+    """
+    Two or more entries that each carry a DUNS number or taxpayer id and
+    are a supplier of their own: a table or CSV row, or an entry with a
+    name. One supplier typed a field per line is a single entry.
+    """
+    header, entries = split_entries(text)
+    suppliers = sum(
+        1 for entry in entries
+        if _identified(entry)
+        and (header is not None or _ROW.fullmatch(entry) or _named(entry))
+    )
+    return suppliers >= 2
+
+
+def chunk_entries(entries, max_chars):
+    """Group entries into chunks of about `max_chars`, never splitting one."""
+    chunks, current, size = [], [], 0
+    for entry in entries:
+        if current and size + len(entry) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += len(entry) + 1
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,232 @@
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from config.fusion_settings import get_settings
+from utils.metrics import traced_stages
+
+settings = get_settings()
+
+# Digit groups split by spaces, dots or hyphens ("123-45-6789",
+# "12 345 6789") are one number. Numbers with this many digits are
+# identifiers (taxpayer ids, DUNS, phone and account numbers); shorter
+# ones are kept so years and codes still read.
+_DIGIT_GROUPS = r"\d+(?:[ .-]\d+)*"
+MIN_IDENTIFIER_DIGITS = 5
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_NON_DIGITS = re.compile(r"\D")
+
+# Session fields whose values are redacted wherever they appear, however
+# short or oddly written
+IDENTIFIER_FIELDS = ("TaxpayerId", "DUNSNumber")
+
+# The turn being recorded, if any
+current_recording = ContextVar("current_recording", default=None)
+
+
+def identifier_pattern(identifiers=()):
+    """
+    Numbers to redact: the digits of each of `identifiers` with or without
+    separators between them, then any long enough digit groups.
+    """
+    known = sorted({
+        r"[ ./-]?".join(digits)
+        for digits in (_NON_DIGITS.sub("", str(value)) for value in identifiers)
+        if digits
+    }, key=len, reverse=True)
+    return re.compile(
+        rf"(?<!\d)(?P<known>{'|'.join(known) or '(?!)'})(?!\d)|{_DIGIT_GROUPS}"
+    )
+
+
+_DEFAULT_PATTERN = identifier_pattern()
+
+
+def session_identifiers(value):
+    """Values of IDENTIFIER_FIELDS anywhere in a recorded session."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k in IDENTIFIER_FIELDS and isinstance(v, (str, int)):
+                yield v
+            else:
+                yield from session_identifiers(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from session_identifiers(v)
+
+
+class Redactor:
+    """
+    Pseudonymizes identifiers in recorded text, keeping their shape.
+
+    The digits of each number are replaced by a keyed hash of them, and
+    its separators are kept, so a taxpayer id still looks like
+    "12-3456789". The hash only depends on the digits, so the same value
+    maps to the same pseudonym in the message, the Gemini answer and the
+    session however it was written. Replayed turns then validate and
+    extract exactly as the originals did. Email addresses become
+    user<hash>@example.com.
+    """
+
+    def __init__(self, key=None):
+        self._key = (key or os.urandom(32).hex()).encode()
+
+    def _digest(self, value):
+        return hmac.new(self._key, value.encode(), "sha256").digest()
+
+    def _digits(self, match):
+        value = match.group()
+        digits = _NON_DIGITS.sub("", value)
+        if match.group("known") is None and len(digits) < MIN_IDENTIFIER_DIGITS:
+            return value
+        hashed = "".join(str(b % 10) for b in self._digest(digits))
+        hashed = iter((hashed * (len(digits) // len(hashed) + 1))[:len(digits)])
+        return "".join(next(hashed) if c.isdigit() else c for c in value)
+
+    def _email(self, match):
+        return f"user{self._digest(match.group()).hex()[:8]}@example.com"
+
+    def __call__(self, value, identifiers=()):
+        """`value` redacted; `identifiers` are redacted too, whatever their length."""
+        pattern = identifier_pattern(identifiers) if identifiers else _DEFAULT_PATTERN
+        return self._walk(value, pattern)
+
+    def _walk(self, value, pattern):
+        if isinstance(value, str):
+            return pattern.sub(self._digits, _EMAIL.sub(self._email, value))
+        if isinstance(value, dict):
+            return {k: self._walk(v, pattern) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._walk(v, pattern) for v in value]
+        return value
+
+
+class Recording:
+    def __init__(self):
+        self.turn = {}
+        self.upstream = []
+
+
+def record_turn(**fields):
+    """Attach turn details (session id, message, states, reply) to the current recording."""
+    recording = current_recording.get()
+    if recording is not None:
+        recording.turn.update(fields)
+
+
+def record_upstream(upstream, request, status, body, seconds=None, **extra):
+    """Note an upstream answer seen during the current recorded turn."""
+    recording = current_recording.get()
+    if recording is not None:
+        recording.upstream.append({
+            "upstream": upstream,
+            "request": request,
+            "status": status,
+            "seconds": seconds,
+            "body": body,
+            **extra
+        })
+
+
+class TrafficRecorder:
+    def __init__(self, path=settings.traffic_record_path,
+                 redaction_key=settings.traffic_redaction_key):
+        self._path = path
+        self._redact = Redactor(redaction_key)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path, "a", buffering=1)
+            self._file.write(line)
+
+    def build(self, app_name, recording, status, started, seconds, stages):
+        turn = recording.turn
+        identifiers = list(session_identifiers(turn.get("session")))
+
+        def redact(value):
+            return self._redact(value, identifiers)
+
+        return {
+            "at": started,
+            "app": app_name,
+            "status": status,
+            "seconds": seconds,
+            "sessionId": turn.get("sessionId"),
+            "newSession": turn.get("newSession"),
+            "fromState": turn.get("fromState"),
+            "toState": turn.get("toState"),
+            "message": redact(turn.get("message")),
+            "reply": redact({
+                k: v for k, v in (turn.get("reply") or {}).items() if k != "sessionId"
+            }),
+            "session": redact(turn.get("session")),
+            "stages": [
+                {"stage": labels[0] if labels else None, "seconds": value}
+                for labels, value in stages
+            ],
+            "upstream": redact(recording.upstream)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TrafficRecorderMiddleware:
+    """
+    Appends every turn on `paths` to traffic_record_path as one JSON line:
+    session id, redacted message, states before and after, reply, stage
+    timings and the upstream answers seen during the turn (see
+    benchmarks/replay.py). Installed only when a path is configured.
+    """
+
+    def __init__(self, app, app_name, paths=("/supplier-agent",), recorder=None):
+        self.app = app
+        self.app_name = app_name
+        self.paths = tuple(paths)
+        self.recorder = recorder or TrafficRecorder()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        recording = Recording()
+        status = None
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = current_recording.set(recording)
+        started = time.time()
+        with traced_stages() as trace:
+            start = len(trace)
+            try:
+                await self.app(scope, receive, send_status)
+            finally:
+                current_recording.reset(token)
+                stages = trace[start:]
+
+        # Requests rejected before the turn ran (auth, bad body) are not turns
+        if not recording.turn:
+            return
+        try:
+            self.recorder.write(self.recorder.build(
+                self.app_name, recording, status, started, time.time() - started, stages
+            ))
+        except (OSError, TypeError, ValueError):
+            logging.exception("Could not record turn")
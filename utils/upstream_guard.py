@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from utils.circuit_breaker import CircuitBreaker
+
+
+class UpstreamOverloaded(Exception):
+    """Too many requests are already queued for this upstream."""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} is overloaded")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Caps concurrent calls to one upstream and bounds the queue behind it.
+
+    When `limit` calls are running and `max_queue` more are already waiting,
+    new callers are refused straight away with UpstreamOverloaded instead
+    of queueing until their client gives up.
+    """
+
+    def __init__(self, name, limit, max_queue, retry_after=1):
+        self.name = name
+        self.limit = limit
+        self._slots = asyncio.Semaphore(limit)
+        self._max_queue = max_queue
+        self._retry_after = retry_after
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def check(self):
+        if self._slots.locked() and self.waiting >= self._max_queue:
+            self.shed += 1
+            raise UpstreamOverloaded(self.name, self._retry_after)
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def __aenter__(self):
+        self.check()
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def metrics(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.limit,
+            "queued": self.waiting,
+            "shed": self.shed
+        }
+
+
+class UpstreamGuard:
+    """
+    Runs calls to a slow upstream under a latency budget.
+
+    - at most `max_in_flight` calls run at once, with at most `max_queue`
+      waiting behind them (beyond that run() raises UpstreamOverloaded)
+    - a circuit breaker skips the upstream after repeated failures
+    - with `hedge` on, a second attempt starts once the first has taken
+      longer than the recent p95, and the first answer wins
+
+    run() returns None whenever the upstream could not answer in time
+    (budget spent, breaker open, error); callers supply the fallback.
+    """
+
+    LATENCY_WINDOW = 200
+    MIN_HEDGE_SAMPLES = 20
+
+    def __init__(self, name, budget_seconds, max_in_flight, max_queue,
+                 breaker=None, hedge=False, retry_after=1):
+        self.name = name
+        self._budget = budget_seconds
+        self._limiter = AdmissionLimiter(name, max_in_flight, max_queue, retry_after)
+        self._breaker = breaker or CircuitBreaker()
+        self._hedge = hedge
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+        self.counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "budget_exceeded": 0,
+            "short_circuited": 0,
+            "hedged": 0,
+            "hedge_wins": 0
+        }
+
+    def p95(self):
+        if len(self._latencies) < self.MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def metrics(self):
+        return {
+            "breaker_state": self._breaker.state,
+            "breaker_opened": self._breaker.times_opened,
+            **self._limiter.metrics(),
+            "p95_seconds": self.p95(),
+            **self.counters
+        }
+
+    async def _attempt(self, call):
+        await self._limiter.acquire()
+        started = time.perf_counter()
+        try:
+            result = await call()
+            self._latencies.append(time.perf_counter() - started)
+            return result
+        finally:
+            self._limiter.release()
+
+    async def run(self, call, budget_seconds=None):
+        self._limiter.check()
+        self.counters["calls"] += 1
+
+        if not self._breaker.allow():
+            self.counters["short_circuited"] += 1
+            return None
+
+        deadline = time.monotonic() + (budget_seconds or self._budget)
+        primary = asyncio.create_task(self._attempt(call))
+        attempts = [primary]
+        settled = False
+
+        try:
+            hedge_delay = self.p95() if self._hedge else None
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(
+                    attempts, timeout=min(hedge_delay, deadline - time.monotonic())
+                )
+                if not done and time.monotonic() < deadline:
+                    self.counters["hedged"] += 1
+                    attempts.append(asyncio.create_task(self._attempt(call)))
+
+            while attempts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                done, _ = await asyncio.wait(
+                    attempts, timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+
+                for task in done:
+                    attempts.remove(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.counters["hedge_wins"] += 1
+                        self.counters["succeeded"] += 1
+                        self._breaker.record_success()
+                        settled = True
+                        return task.result()
+                    logging.warning(
+                        "%s call failed: %s", self.name, task.exception()
+                    )
+
+            if attempts:
+                self.counters["budget_exceeded"] += 1
+            else:
+                self.counters["failed"] += 1
+            self._breaker.record_failure()
+            settled = True
+            return None
+
+        finally:
+            for task in attempts:
+                task.cancel()
+            if not settled:
+                self._breaker.release()